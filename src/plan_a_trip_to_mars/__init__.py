@@ -1,5 +1,31 @@
 """Initialise the main module."""
 
-from importlib.metadata import version
 
-__version__ = version(__package__)
+def __getattr__(name: str) -> str:
+    """Look up `__version__` the first time it is asked for.
+
+    Reading the metadata of the installed package is slow compared to the rest of the
+    import, so it is not done until the version is needed.
+
+    Parameters
+    ----------
+    name : str
+        The name of the attribute.
+
+    Returns
+    -------
+    str
+        The version of the package.
+
+    Raises
+    ------
+    AttributeError
+        If the attribute is not `__version__`.
+    """
+    if name == "__version__":
+        from importlib.metadata import version  # noqa: PLC0415
+
+        globals()["__version__"] = version(__package__)
+        return globals()["__version__"]
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -1,12 +1,37 @@
 """Main script which we use to run our space flight program."""
 
-from plan_a_trip_to_mars import __version__
+import sys
+from collections.abc import Sequence
 
+import plan_a_trip_to_mars
 
-def main() -> None:
-    """Do something clever."""
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Do something clever.
+
+    With the sub-command `run`, scenarios are simulated without any interaction. See
+    `plan-a-trip-to-mars run --help`. With `bench`, the speed of the simulation is
+    measured, see `plan-a-trip-to-mars bench --help`.
+
+    Parameters
+    ----------
+    argv : Sequence[str] | None
+        The command line arguments, without the program name. Defaults to the
+        arguments given to the script.
+    """
+    args = sys.argv[1:] if argv is None else list(argv)
+    if args[:1] == ["run"]:
+        from plan_a_trip_to_mars import batch  # noqa: PLC0415
+
+        batch.main(args[1:])
+        return
+    if args[:1] == ["bench"]:
+        from plan_a_trip_to_mars import bench  # noqa: PLC0415
+
+        bench.main(args[1:])
+        return
     print("Hello, World!")
-    print(f"This is plan-a-trip-to-mars, version {__version__}")
+    print(f"This is plan-a-trip-to-mars, version {plan_a_trip_to_mars.__version__}")
 
 
 if __name__ == "__main__":
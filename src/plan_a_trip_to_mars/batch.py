@@ -0,0 +1,286 @@
+"""Run scenarios without any interaction, for example on a server or in a pipeline.
+
+The runner is available as the `run` sub-command of the main script::
+
+    plan-a-trip-to-mars run Mayhem --steps 1e6 --out run.npz --no-render
+
+Matplotlib is only imported when an animation is rendered, so with `--no-render` the
+scenarios can be run on machines without a display or a plotting backend.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import pathlib
+import time
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+
+from plan_a_trip_to_mars import registry, scenarios, trajectory
+
+
+@dataclass
+class RunStats:
+    """Container for the timing of a finished run.
+
+    Attributes
+    ----------
+    scenario : str
+        Name of the scenario.
+    iterations : int
+        The number of iterations simulated, not counting those before the checkpoint
+        the run was resumed from.
+    steps : int
+        The number of integration steps taken, which is larger than the number of
+        iterations when adaptive steps are used. Also not counting those before the
+        checkpoint.
+    samples : int
+        The number of recorded positions of each object.
+    wall_time : float
+        The time it took to run the simulation, in seconds.
+    out : str
+        Where the trajectories were written.
+    """
+
+    scenario: str
+    iterations: int
+    steps: int
+    samples: int
+    wall_time: float
+    out: str
+
+    @property
+    def iterations_per_second(self) -> float:
+        """The speed of the simulation."""
+        return self.iterations / self.wall_time if self.wall_time else float("inf")
+
+
+def get_scenario(name: str) -> type[scenarios.BigScenario]:
+    """Find a scenario class by its name.
+
+    Third-party scenarios registered as entry points are found as well, see
+    `plan_a_trip_to_mars.registry`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the scenario, for example "Mayhem".
+
+    Returns
+    -------
+    type[scenarios.BigScenario]
+        The scenario class.
+    """
+    return registry.load(name)
+
+
+def run_scenario(  # noqa: PLR0913
+    name: str,
+    out: pathlib.Path,
+    steps: float | None = None,
+    *,
+    render: bool = False,
+    quiet: bool = False,
+    profile: bool = False,
+    checkpoint_every: int | None = None,
+    resume: bool = False,
+) -> RunStats:
+    """Run a scenario and write its trajectories and timing to disk.
+
+    The trajectories are saved as a NumPy `.npz` archive with the arrays `traces`
+    (samples, N, 2), `times` (seconds), `names`, `masses`, `spi` and `stride`, together
+    with the timing of the run. If `out` has the suffix `.trj`, the trajectories are
+    instead streamed to a trajectory file while the scenario runs, see
+    `plan_a_trip_to_mars.trajectory`.
+
+    Parameters
+    ----------
+    name : str
+        The name of the scenario class.
+    out : pathlib.Path
+        Where to write the trajectories.
+    steps : float | None
+        The number of iterations to simulate. Defaults to the `total_time` of the
+        scenario.
+    render : bool
+        If True, the animation is also saved next to `out`, as mp4 if ffmpeg is
+        available and as gif otherwise.
+    quiet : bool
+        If True, anything the scenario prints while running is thrown away.
+    profile : bool
+        If True, the time spent in each part of the simulation is printed after the
+        run.
+    checkpoint_every : int | None
+        If given, the state of the universe is saved every `checkpoint_every`
+        iterations, next to `out`, see `checkpoint_path`.
+    resume : bool
+        If True, and a checkpoint of an earlier run exists next to `out`, the run
+        carries on from it.
+
+    Returns
+    -------
+    RunStats
+        The timing of the run.
+    """
+    sim = get_scenario(name)()
+    if steps is not None:
+        sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=steps)
+    sim.setup()
+    out.parent.mkdir(parents=True, exist_ok=True)
+    stream = out.suffix == trajectory.SUFFIX
+    checkpoint = checkpoint_path(out)
+    if resume and checkpoint.exists():
+        sim.my_uni.load_checkpoint(checkpoint)
+    # Only the iterations of this process count towards its speed
+    first_time, first_steps = sim.my_uni.time, sim.my_uni.steps
+    redirect = contextlib.redirect_stdout(None) if quiet else contextlib.nullcontext()
+    with redirect:
+        start = time.perf_counter()
+        sim.run_simulation(
+            out if stream else None,
+            profile=profile,
+            checkpoint=checkpoint if checkpoint_every else None,
+            checkpoint_every=checkpoint_every or 0,
+        )
+        wall_time = time.perf_counter() - start
+    if profile and sim.my_uni.stats is not None:
+        print(f"{name}:\n{sim.my_uni.stats.summary()}")
+    my_uni = sim.my_uni
+    stats = RunStats(
+        scenario=name,
+        iterations=int(my_uni.time - first_time),
+        steps=my_uni.steps - first_steps,
+        samples=my_uni.trace.size,
+        wall_time=wall_time,
+        out=str(out),
+    )
+    if not stream:
+        np.savez(
+            out,
+            traces=my_uni.trace.data,
+            times=my_uni.trace.times * my_uni.spi,
+            names=np.array([obj.name for obj in my_uni.objects]),
+            masses=my_uni.mass,
+            spi=my_uni.spi,
+            stride=my_uni.trace.stride,
+            **{k: v for k, v in dataclasses.asdict(stats).items() if k != "out"},
+        )
+    if render:
+        import matplotlib as mpl  # noqa: PLC0415
+
+        mpl.use("Agg")
+        from matplotlib import animation  # noqa: PLC0415
+
+        suffix = ".mp4" if animation.writers.is_available("ffmpeg") else ".gif"
+        sim.save_animation(out.with_suffix(suffix), trace=True)
+    return stats
+
+
+def checkpoint_path(out: pathlib.Path) -> pathlib.Path:
+    """Give the checkpoint file of a run that writes its trajectories to `out`.
+
+    Parameters
+    ----------
+    out : pathlib.Path
+        Where the trajectories of the run are written.
+
+    Returns
+    -------
+    pathlib.Path
+        The checkpoint, in the same directory.
+    """
+    return out.with_name(f"{out.stem}.checkpoint.npz")
+
+
+def _output_path(out: pathlib.Path, name: str, *, several: bool) -> pathlib.Path:
+    """Give each scenario its own output file when several are run at once."""
+    return out.with_stem(f"{out.stem}_{name}") if several else out
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Parse the command line and run the scenarios.
+
+    Parameters
+    ----------
+    argv : Sequence[str] | None
+        The command line arguments, without the program name.
+    """
+    parser = argparse.ArgumentParser(
+        prog="plan-a-trip-to-mars run",
+        description="Run scenarios without any interaction.",
+    )
+    parser.add_argument("scenarios", nargs="+", help="names of the scenarios to run")
+    parser.add_argument(
+        "--steps", type=float, help="number of iterations, overrides the scenario"
+    )
+    parser.add_argument(
+        "--out",
+        type=pathlib.Path,
+        default=pathlib.Path("data/run.npz"),
+        help="where to write the trajectories. A .trj file is written while the "
+        "simulation runs. With several scenarios, the name of each scenario is added "
+        "to the file name (default: data/run.npz)",
+    )
+    parser.add_argument(
+        "--no-render",
+        dest="render",
+        action="store_false",
+        help="do not save an animation, and never import matplotlib",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="number of scenarios to run at once"
+    )
+    parser.add_argument(
+        "--quiet", action="store_true", help="hide what the scenarios print"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time spent in each part of the simulation",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        metavar="N",
+        help="save the state every N iterations, next to the output file",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="carry on from the checkpoint of an earlier run, if there is one",
+    )
+    args = parser.parse_args(argv)
+    for name in args.scenarios:
+        try:
+            get_scenario(name)
+        except ValueError as e:
+            parser.error(str(e))
+
+    several = len(args.scenarios) > 1
+    jobs = [
+        (name, _output_path(args.out, name, several=several)) for name in args.scenarios
+    ]
+    run = partial(
+        run_scenario,
+        steps=args.steps,
+        render=args.render,
+        quiet=args.quiet,
+        profile=args.profile,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+    )
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(run, *zip(*jobs, strict=True)))
+    else:
+        results = [run(n, o) for n, o in jobs]
+    for r in results:
+        print(
+            f"{r.scenario}: {r.iterations} iterations ({r.steps} steps) in "
+            f"{r.wall_time:.2f} s, {r.iterations_per_second:.0f} iterations/s, "
+            f"{r.samples} samples written to {r.out}"
+        )
@@ -0,0 +1,410 @@
+"""Benchmarks of the speed and memory use of the simulation and the animation.
+
+The benchmarks are available as the `bench` sub-command of the main script::
+
+    plan-a-trip-to-mars bench --out bench.json
+    plan-a-trip-to-mars bench --baseline bench.json --tolerance 0.2
+
+Each benchmark gives one or more results, which are written as JSON together with a
+description of the machine they were measured on. When a baseline from an earlier run
+is given, every result is compared to it, and the command fails if any of them got
+worse by more than the tolerance. Baselines are only meaningful on the machine they
+were measured on, so none are stored with the code.
+"""
+
+import argparse
+import contextlib
+import dataclasses
+import datetime
+import functools
+import itertools
+import json
+import os
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from plan_a_trip_to_mars import __version__, scenarios
+from plan_a_trip_to_mars import universe as uni
+from plan_a_trip_to_mars.misc import precode2 as pre
+
+if TYPE_CHECKING:
+    from plan_a_trip_to_mars.misc.animate import AnimatedScatter
+
+# The scenarios whose speed is measured
+SCENARIOS = ("Simpel", "Mayhem", "Jerk")
+# The numbers of bodies in the synthetic universes
+SIZES = (2, 10, 100, 1000, 10000)
+QUICK_SIZES = (2, 10, 100)
+# The number of iterations the scenarios are run for at a time
+BLOCK = 100
+# The shortest time each measurement should take, in seconds
+MIN_TIME = 0.5
+
+
+@dataclass
+class Result:
+    """Container for one measured number.
+
+    Attributes
+    ----------
+    name : str
+        What was measured, for example "steps_per_second/Mayhem".
+    value : float
+        The measured value.
+    unit : str
+        The unit of the value.
+    higher_is_better : bool
+        Whether a larger value is an improvement.
+    """
+
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+
+    def change(self, baseline: float) -> float:
+        """Give the relative improvement over a baseline.
+
+        Parameters
+        ----------
+        baseline : float
+            The value of the same result in an earlier run.
+
+        Returns
+        -------
+        float
+            The improvement as a fraction of the baseline. Negative values are
+            regressions.
+        """
+        if baseline == 0:
+            return 0.0
+        change = (self.value - baseline) / baseline
+        return change if self.higher_is_better else -change
+
+
+def _timed(step: Callable[[], None], min_time: float) -> tuple[int, float]:
+    """Call a function until it has run for at least `min_time` seconds."""
+    n = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_time or n == 0:
+        step()
+        n += 1
+    return n, elapsed
+
+
+def _scenario_block(sim: scenarios.BigScenario) -> None:
+    """Run a scenario for another block of iterations, with its observers."""
+    sim.SIM_CONSTS = dataclasses.replace(
+        sim.SIM_CONSTS, total_time=sim.my_uni.time + BLOCK
+    )
+    sim.run_simulation()
+
+
+def bench_scenarios(min_time: float = MIN_TIME) -> list[Result]:
+    """Measure how many iterations per second each scenario runs at.
+
+    Parameters
+    ----------
+    min_time : float
+        The shortest time to run each scenario, in seconds.
+
+    Returns
+    -------
+    list[Result]
+        The speed of each scenario.
+    """
+    results = []
+    for name in SCENARIOS:
+        sim = getattr(scenarios, name)()
+        sim.setup()
+        with contextlib.redirect_stdout(None):
+            n, elapsed = _timed(functools.partial(_scenario_block, sim), min_time)
+        results.append(
+            Result(f"steps_per_second/{name}", n * BLOCK / elapsed, "steps/s")
+        )
+    return results
+
+
+def synthetic_universe(n: int, solver: str = "direct", seed: int = 0) -> uni.Universe:
+    """Create a universe of equally heavy bodies, spread at random.
+
+    Parameters
+    ----------
+    n : int
+        The number of bodies.
+    solver : str
+        The gravity solver of the universe.
+    seed : int
+        Seed of the random positions and velocities.
+
+    Returns
+    -------
+    uni.Universe
+        The universe, ready to move.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.normal(0, 1e11, (n, 2))
+    vel = rng.normal(0, 1e3, (n, 2))
+    my_uni = uni.Universe(spi=3600, solver=solver)
+    my_uni.add_object(
+        *(
+            uni.Planet(f"{i}", 1e24, pos=pre.Vector2D(*p), vel=pre.Vector2D(*v))
+            for i, (p, v) in enumerate(zip(pos.tolist(), vel.tolist(), strict=True))
+        )
+    )
+    my_uni.set_trace_stride(10**9)
+    my_uni.ready()
+    return my_uni
+
+
+def bench_scaling(
+    sizes: Sequence[int] = SIZES, min_time: float = MIN_TIME
+) -> list[Result]:
+    """Measure the speed of synthetic universes of growing size, with each solver.
+
+    Parameters
+    ----------
+    sizes : Sequence[int]
+        The numbers of bodies.
+    min_time : float
+        The shortest time to run each universe, in seconds.
+
+    Returns
+    -------
+    list[Result]
+        The speed for each size and solver.
+    """
+    results = []
+    for solver in ("direct", "barnes-hut"):
+        for n in sizes:
+            my_uni = synthetic_universe(n, solver)
+            steps, elapsed = _timed(functools.partial(my_uni.step_many, 1), min_time)
+            results.append(
+                Result(f"steps_per_second/{solver}/N={n}", steps / elapsed, "steps/s")
+            )
+    return results
+
+
+def bench_memory(steps: int = 2000) -> list[Result]:
+    """Measure the memory the trace takes, and all memory allocated per step.
+
+    Parameters
+    ----------
+    steps : int
+        The number of iterations of `Mayhem` to run.
+
+    Returns
+    -------
+    list[Result]
+        The size of the trace per iteration, and the peak of the memory allocated
+        while running, per iteration.
+    """
+    sim = scenarios.Mayhem()
+    sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=steps)
+    sim.setup()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(None):
+            sim.run_simulation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return [
+        Result(
+            "trace_bytes_per_step/Mayhem",
+            sim.my_uni.trace.nbytes / steps,
+            "B/step",
+            higher_is_better=False,
+        ),
+        Result(
+            "peak_bytes_per_step/Mayhem", peak / steps, "B/step", higher_is_better=False
+        ),
+    ]
+
+
+def bench_animation(frames: int = 200, min_time: float = MIN_TIME) -> list[Result]:
+    """Measure how many frames per second the animation draws, with the Agg backend.
+
+    Parameters
+    ----------
+    frames : int
+        The number of samples in the animated run.
+    min_time : float
+        The shortest time to draw frames for, in seconds.
+
+    Returns
+    -------
+    list[Result]
+        The frame rate, with and without the trace of each object.
+    """
+    import matplotlib as mpl  # noqa: PLC0415
+
+    mpl.use("Agg")
+    import matplotlib.pyplot as plt  # noqa: PLC0415
+
+    sim = scenarios.Mayhem()
+    stride = sim.SIM_CONSTS.trace_stride or 1
+    sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=frames * stride)
+    sim.setup()
+    with contextlib.redirect_stdout(None):
+        sim.run_simulation()
+    results = []
+    for trace in (False, True):
+        anim = sim.create_animation(trace=trace)
+        anim.setup_plot()
+        n, elapsed = _timed(
+            functools.partial(_draw_frame, anim, itertools.cycle(range(frames))),
+            min_time,
+        )
+        anim.ani.pause()
+        plt.close(anim.fig)
+        label = "with_trace" if trace else "no_trace"
+        results.append(Result(f"frames_per_second/{label}", n / elapsed, "frames/s"))
+    return results
+
+
+def _draw_frame(anim: "AnimatedScatter", frames: Iterator[int]) -> None:
+    """Draw the next frame of an animation onto its canvas."""
+    idx = next(frames)
+    anim.draw(anim.frame(idx), idx)
+    anim.fig.canvas.draw()
+
+
+def metadata() -> dict[str, object]:
+    """Describe the machine and software the benchmarks are run with.
+
+    Returns
+    -------
+    dict[str, object]
+        The versions of Python, NumPy and this package, and the platform and CPU.
+    """
+    return {
+        "timestamp": datetime.datetime.now(datetime.UTC).isoformat(),
+        "version": __version__,
+        "python": sys.version,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(
+    results: Sequence[Result], baseline: dict[str, dict], tolerance: float
+) -> list[str]:
+    """Find the results that got worse than the baseline allows.
+
+    Parameters
+    ----------
+    results : Sequence[Result]
+        The new results.
+    baseline : dict[str, dict]
+        The results of an earlier run, by name, as written to JSON.
+    tolerance : float
+        How much worse than the baseline a result may get, as a fraction.
+
+    Returns
+    -------
+    list[str]
+        A description of each regression.
+    """
+    regressions = []
+    for r in results:
+        if r.name not in baseline:
+            continue
+        old = baseline[r.name]["value"]
+        if r.change(old) < -tolerance:
+            regressions.append(
+                f"{r.name}: {r.value:.4g} {r.unit}, baseline {old:.4g} {r.unit}"
+            )
+    return regressions
+
+
+def run(*, quick: bool = False, animation: bool = True) -> list[Result]:
+    """Run every benchmark.
+
+    Parameters
+    ----------
+    quick : bool
+        If True, only small universes are measured, for a short time each.
+    animation : bool
+        If False, the animation is not measured, and matplotlib is never imported.
+
+    Returns
+    -------
+    list[Result]
+        The results of all benchmarks.
+    """
+    min_time = 0.05 if quick else MIN_TIME
+    results = [
+        *bench_scenarios(min_time),
+        *bench_scaling(QUICK_SIZES if quick else SIZES, min_time),
+        *bench_memory(200 if quick else 2000),
+    ]
+    if animation:
+        results.extend(bench_animation(20 if quick else 200, min_time))
+    return results
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Parse the command line and run the benchmarks.
+
+    Parameters
+    ----------
+    argv : Sequence[str] | None
+        The command line arguments, without the program name.
+    """
+    parser = argparse.ArgumentParser(
+        prog="plan-a-trip-to-mars bench",
+        description="Measure the speed and memory use of the simulation.",
+    )
+    parser.add_argument("--out", type=pathlib.Path, help="where to write the JSON")
+    parser.add_argument(
+        "--baseline", type=pathlib.Path, help="JSON of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="how much worse than the baseline a result may be (default: 0.2)",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="small universes and short measurements"
+    )
+    parser.add_argument(
+        "--no-animation",
+        dest="animation",
+        action="store_false",
+        help="do not measure the animation, and never import matplotlib",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, animation=args.animation)
+    report = {
+        "metadata": metadata(),
+        "results": {
+            r.name: {k: v for k, v in dataclasses.asdict(r).items() if k != "name"}
+            for r in results
+        },
+    }
+    baseline = json.loads(args.baseline.read_text())["results"] if args.baseline else {}
+    for r in results:
+        line = f"{r.name}: {r.value:.4g} {r.unit}"
+        if r.name in baseline:
+            line += f" ({r.change(baseline[r.name]['value']):+.1%})"
+        print(line)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2))
+    if regressions := compare(results, baseline, args.tolerance):
+        print("Regressions:", *regressions, sep="\n  ")
+        sys.exit(1)
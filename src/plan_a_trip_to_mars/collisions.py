@@ -0,0 +1,238 @@
+"""Detection of collisions between objects that have a radius.
+
+Collisions are turned on with `Universe.set_collisions`, and only objects with a
+radius larger than zero can be hit. Two objects collide when their distance becomes
+smaller than the sum of their radii at any moment during a step. Within a step, the
+objects are assumed to move in straight lines, so that fast objects that pass through
+each other between two steps are caught as well.
+
+Looking at every pair of objects would take time that grows with the square of their
+number. Instead, the plane is divided into a uniform grid of square cells that are
+larger than the reach of any collision within a step, and only objects in neighbouring
+cells are compared. The cells are found through a hash of their coordinates, so that
+the grid needs no bounds, and the objects are only sorted again when one of them moves
+to another cell.
+
+What happens at a collision is decided by the policy:
+
+- `stop`: The simulation stops, as at a terminal event.
+- `merge`: The two objects become one, with the sum of their masses and momenta and
+  the volume of both. The lighter one rides along with the other from then on.
+- `bounce`: The objects bounce off each other, losing some of their speed along the
+  line between them if the restitution is less than one.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+POLICIES = ("stop", "merge", "bounce")
+# Multipliers that spread the cell coordinates over the hash keys
+HASH_X = 73856093
+HASH_Y = 19349663
+# The cells of the grid around a cell, itself included
+NEIGHBOURS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+
+@dataclass
+class Collision:
+    """Container for a collision found while the universe moved.
+
+    Attributes
+    ----------
+    a, b : str
+        The names of the two objects.
+    time : float
+        The time of the first contact, in iterations.
+    pos : np.ndarray
+        The positions of the two objects at the first contact, shape (2, 2).
+    policy : str
+        What was done about it.
+    """
+
+    a: str
+    b: str
+    time: float
+    pos: np.ndarray
+    policy: str
+
+
+class SpatialHash:
+    """A uniform grid over the plane, to find the objects close to some of them.
+
+    The grid only grows its cells when the reach asked for is larger than a cell, so
+    that the objects keep their cells from one step to the next, and the sort order of
+    the previous step can be reused.
+    """
+
+    def __init__(self) -> None:
+        self.cell = 0.0
+        self._keys = np.empty(0, dtype=np.int64)
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted = np.empty(0, dtype=np.int64)
+
+    @staticmethod
+    def _hash(cells: np.ndarray) -> np.ndarray:
+        """Give the hash key of cells, shape (..., 2), wrapping around on overflow."""
+        with np.errstate(over="ignore"):
+            return (cells[..., 0] * HASH_X) ^ (cells[..., 1] * HASH_Y)
+
+    def pairs(
+        self, pos: np.ndarray, reach: float, query: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Find the objects that may be within reach of some of them.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            The positions of all objects, shape (N, 2).
+        reach : float
+            The largest distance between two objects that should be found.
+        query : np.ndarray
+            The indices of the objects to find the neighbours of.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The indices of the pairs, a query object and an object in a neighbouring
+            cell, which is not the query object itself. Some may be farther away than
+            the reach.
+        """
+        if reach > self.cell:
+            # Leave room to grow, so that the grid is not rebuilt at every step
+            self.cell = 2 * reach
+            self._keys = np.empty(0, dtype=np.int64)
+        keys = self._hash(np.floor(pos / self.cell).astype(np.int64))
+        if len(keys) != len(self._keys):
+            self._order = np.argsort(keys, kind="stable")
+        elif not np.array_equal(keys, self._keys):
+            # Most objects are still in the same cell, so the order is nearly sorted
+            self._order = self._order[np.argsort(keys[self._order], kind="stable")]
+        self._keys = keys
+        self._sorted = keys[self._order]
+        around = np.floor(pos[query] / self.cell).astype(np.int64)
+        near = self._hash(around[:, np.newaxis, :] + NEIGHBOURS).ravel()
+        lo = np.searchsorted(self._sorted, near, side="left")
+        hi = np.searchsorted(self._sorted, near, side="right")
+        counts = hi - lo
+        first = np.repeat(np.repeat(query, len(NEIGHBOURS)), counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = self._order[np.repeat(lo, counts) + offset]
+        keep = first != second
+        return first[keep], second[keep]
+
+
+def first_contact(
+    d0: np.ndarray, d1: np.ndarray, reach: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Find when pairs of objects moving in straight lines first come within reach.
+
+    Parameters
+    ----------
+    d0 : np.ndarray
+        The vector from the first to the second object of each pair at the start of
+        the step, shape (P, 2).
+    d1 : np.ndarray
+        The same vector at the end of the step, shape (P, 2).
+    reach : np.ndarray
+        The distance of contact, the sum of the radii, shape (P,).
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Whether each pair touches during the step, and the time of the first contact
+        as a fraction of the step. A pair that already touches at the start has its
+        contact at zero.
+    """
+    delta = d1 - d0
+    a = np.einsum("ij,ij->i", delta, delta)
+    b = 2 * np.einsum("ij,ij->i", d0, delta)
+    c = np.einsum("ij,ij->i", d0, d0) - reach * reach
+    disc = b * b - 4 * a * c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(c <= 0, 0.0, (-b - np.sqrt(disc)) / (2 * a))
+    hit = (c <= 0) | ((a > 0) & (disc >= 0) & (s >= 0) & (s <= 1))
+    return hit, np.where(hit, s, np.inf)
+
+
+class Collider:
+    """Look for collisions between objects with a radius after every step.
+
+    Parameters
+    ----------
+    policy : str
+        What to do at a collision, one of "stop", "merge" or "bounce".
+    restitution : float
+        The fraction of the speed along the line between two objects that is kept
+        when they bounce. One is a perfectly elastic bounce.
+
+    Attributes
+    ----------
+    radius : np.ndarray
+        The radius of every object, shape (N,).
+    alive : np.ndarray
+        False for the objects that were merged into another, shape (N,).
+    host : np.ndarray
+        The object each merged object rides along with, or -1, shape (N,).
+    collisions : list[Collision]
+        The collisions found so far, in the order they happened.
+    """
+
+    def __init__(self, policy: str = "stop", restitution: float = 1.0) -> None:
+        if policy not in POLICIES:
+            msg = f"The collision policy must be one of {POLICIES}, was '{policy}'."
+            raise ValueError(msg)
+        self.policy = policy
+        self.restitution = restitution
+        self.radius = np.zeros(0)
+        self.alive = np.ones(0, dtype=bool)
+        self.host = np.zeros(0, dtype=int)
+        self.collisions: list[Collision] = []
+        self._grid = SpatialHash()
+
+    def bind(self, radius: np.ndarray) -> None:
+        """Set the radii of the objects of a universe that is made ready.
+
+        Parameters
+        ----------
+        radius : np.ndarray
+            The radius of every object and test particle, shape (N,).
+        """
+        self.radius = np.asarray(radius, dtype=float)
+        self.alive = np.ones(len(radius), dtype=bool)
+        self.host = np.full(len(radius), -1)
+
+    def find(
+        self, before: np.ndarray, after: np.ndarray
+    ) -> list[tuple[float, int, int]]:
+        """Find the collisions during a step.
+
+        Parameters
+        ----------
+        before : np.ndarray
+            The positions of all objects at the start of the step, shape (N, 2).
+        after : np.ndarray
+            The positions at the end of the step, shape (N, 2).
+
+        Returns
+        -------
+        list[tuple[float, int, int]]
+            The time of the first contact as a fraction of the step, and the two
+            objects, for every collision, earliest first.
+        """
+        solid = np.flatnonzero(self.alive & (self.radius > 0))
+        if not len(solid):
+            return []
+        moved = np.hypot(*(after - before)[self.alive].T).max()
+        reach = 2 * (self.radius[solid].max() + moved)
+        first, second = self._grid.pairs(before, reach, solid)
+        # Pairs of two solid objects are found from both sides, so keep one of them
+        keep = self.alive[second] & ((self.radius[second] == 0) | (first < second))
+        first, second = first[keep], second[keep]
+        hit, s = first_contact(
+            before[second] - before[first],
+            after[second] - after[first],
+            self.radius[first] + self.radius[second],
+        )
+        found = sorted(zip(s[hit], first[hit], second[hit], strict=True))
+        return [(float(t), int(i), int(j)) for t, i, j in found]
@@ -6,6 +6,8 @@ Those values that are not present in the `astropy` library are found at:
     https://nssdc.gsfc.nasa.gov/planetary/factsheet/moonfact.html
 """
 
+from dataclasses import dataclass
+
 # PHYSICAL CONSTANTS
 
 # Gravitational constant
@@ -37,3 +39,48 @@ D_jupiter = 5.2 * AU
 V_earth = 29.78e3
 V_mars = 24.07e3
 V_jupiter = 13.07e3
+
+
+# SIMULATION CONSTANTS
+
+
+@dataclass
+class SimulationConstants:
+    """Container for all constants needed during simulation.
+
+    All times are with respect to seconds.
+
+    Attributes
+    ----------
+    size : float
+        The width and height of the universe.
+    fps : int
+        The number of frames-per-second. Useful to speed up the simulation.
+    total_time : float
+        The total time the simulation should run.
+    time_scale : float
+        Scale the time so that it is presented in a different unit, for example going
+        from seconds to days would be `3600 * 24`.
+    unit : str
+        The time unit, for example year, second, day, etc.
+    trace_stride : int | None
+        The number of iterations between each recorded position of the objects. Only
+        the recorded positions are animated. Defaults to `fps`.
+    trace_memory : int | None
+        The most memory the trace may take, in bytes. The recent positions are then
+        kept at full resolution and older ones ever coarser, so that very long runs fit
+        in memory. Defaults to keeping every recorded position.
+    """
+
+    size: float = 3 * AU
+    fps: int = 24
+    total_time: float = 5e4
+    time_scale: float = 1
+    unit: str = ""
+    trace_stride: int | None = None
+    trace_memory: int | None = None
+
+    def __post_init__(self) -> None:
+        """Fall back to recording one position per frame."""
+        if self.trace_stride is None:
+            self.trace_stride = self.fps
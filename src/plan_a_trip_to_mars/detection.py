@@ -0,0 +1,431 @@
+"""Detection of events that depend on the state of the universe, such as a close approach.
+
+An event is described declaratively by a `Condition`: a function of the positions and
+velocities of all objects that changes sign when the event happens. The conditions are
+added to a universe with `Universe.add_condition`. While the universe moves, the state
+at every iteration is collected in a buffer, and each condition is evaluated on the
+whole buffer at once. Between the two iterations where a sign change is found, the
+moment of the event is located by root-finding on a cubic interpolation of the path.
+
+A condition can be `terminal`, which stops the simulation as soon as it is found. The
+terminal conditions are therefore also evaluated on the last two states at every
+iteration, so that the run stops at the end of the iteration the event happened in.
+
+Example
+-------
+Stop when the rocket comes within 1e7 m of Mars, and note every opposition of Mars::
+
+    my_uni.add_condition(
+        Distance("Rocket", "Mars", 1e7, terminal=True),
+        Alignment("Sun", "Earth", "Mars", name="opposition"),
+    )
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import numpy as np
+
+# The number of iterations collected before the conditions are evaluated
+CHUNK = 64
+# Stop refining the time of an event when it is known to this fraction of an iteration
+TOLERANCE = 1e-9
+MAX_REFINEMENTS = 50
+
+
+@dataclass
+class Crossing:
+    """Container for an event found while the universe moved.
+
+    Attributes
+    ----------
+    name : str
+        The name of the condition that was met.
+    time : float
+        The time of the event, in iterations.
+    pos : np.ndarray
+        The interpolated positions of all objects at the event, shape (N, 2).
+    vel : np.ndarray
+        The interpolated velocities of all objects at the event, shape (N, 2).
+    terminal : bool
+        Whether the event stopped the simulation.
+    """
+
+    name: str
+    time: float
+    pos: np.ndarray
+    vel: np.ndarray
+    terminal: bool = False
+
+
+class Condition(ABC):
+    """Abstract base class of the events to look for.
+
+    Parameters
+    ----------
+    *bodies : str
+        The names of the objects the condition depends on.
+    name : str | None
+        The name given to the events. Defaults to the name of the class.
+    direction : int
+        1 to only find the condition going from negative to positive, -1 for positive
+        to negative, or 0 for both.
+    terminal : bool
+        If True, the simulation stops at the first event.
+    """
+
+    def __init__(
+        self,
+        *bodies: str,
+        name: str | None = None,
+        direction: int = 0,
+        terminal: bool = False,
+    ) -> None:
+        self.bodies = bodies
+        self.name = type(self).__name__ if name is None else name
+        self.direction = direction
+        self.terminal = terminal
+        self._idx: tuple[int, ...] = ()
+
+    def bind(self, names: list[str]) -> None:
+        """Look up the objects of the condition in a universe.
+
+        Parameters
+        ----------
+        names : list[str]
+            The names of all objects in the universe, in order.
+
+        Raises
+        ------
+        ValueError
+            If an object of the condition is not in the universe.
+        """
+        missing = [b for b in self.bodies if b not in names]
+        if missing:
+            msg = f"The condition '{self.name}' refers to unknown objects {missing}."
+            raise ValueError(msg)
+        self._idx = tuple(names.index(b) for b in self.bodies)
+
+    @abstractmethod
+    def value(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        """Evaluate the condition, which changes sign when the event happens.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            Positions of all objects at K times, shape (K, N, 2).
+        vel : np.ndarray
+            Velocities of all objects at K times, shape (K, N, 2).
+
+        Returns
+        -------
+        np.ndarray
+            The value at each time, shape (K,).
+        """
+
+    def valid(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:  # noqa: ARG002
+        """Tell at which times a sign change counts as an event.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            Positions of all objects at K times, shape (K, N, 2).
+        vel : np.ndarray
+            Velocities of all objects at K times, shape (K, N, 2).
+
+        Returns
+        -------
+        np.ndarray
+            True where a sign change counts, shape (K,). By default always.
+        """
+        return np.ones(len(pos), dtype=bool)
+
+
+class Distance(Condition):
+    """The distance between two objects passes a threshold.
+
+    By default, only coming closer than the threshold is an event.
+
+    Parameters
+    ----------
+    a, b : str
+        The names of the two objects.
+    threshold : float
+        The distance, in meters.
+    name, direction, terminal
+        See `Condition`. The direction defaults to -1.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        a: str,
+        b: str,
+        threshold: float,
+        *,
+        name: str | None = None,
+        direction: int = -1,
+        terminal: bool = False,
+    ) -> None:
+        super().__init__(a, b, name=name, direction=direction, terminal=terminal)
+        self.threshold = threshold
+
+    def value(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:  # noqa: ARG002
+        """Give the distance minus the threshold."""
+        a, b = self._idx
+        d = pos[:, b] - pos[:, a]
+        return np.hypot(d[:, 0], d[:, 1]) - self.threshold
+
+
+class Alignment(Condition):
+    """Three objects lie on a straight line, with the middle one between the others.
+
+    For example, `Alignment("Sun", "Earth", "Mars")` is an opposition of Mars.
+
+    Parameters
+    ----------
+    a, b, c : str
+        The names of the three objects, with `b` in the middle.
+    name, direction, terminal
+        See `Condition`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        a: str,
+        b: str,
+        c: str,
+        *,
+        name: str | None = None,
+        direction: int = 0,
+        terminal: bool = False,
+    ) -> None:
+        super().__init__(a, b, c, name=name, direction=direction, terminal=terminal)
+
+    def _arms(self, pos: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        a, b, c = self._idx
+        return pos[:, a] - pos[:, b], pos[:, c] - pos[:, b]
+
+    def value(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:  # noqa: ARG002
+        """Give the sine of the angle between the other two objects, seen from `b`."""
+        u, w = self._arms(pos)
+        cross = u[:, 0] * w[:, 1] - u[:, 1] * w[:, 0]
+        return cross / (np.hypot(u[:, 0], u[:, 1]) * np.hypot(w[:, 0], w[:, 1]))
+
+    def valid(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:  # noqa: ARG002
+        """Only count the sign changes where the other two are on opposite sides."""
+        u, w = self._arms(pos)
+        return np.einsum("ij,ij->i", u, w) < 0
+
+
+class RadialVelocity(Condition):
+    """An object stops moving towards or away from another.
+
+    Going from negative to positive is the closest approach, for example the periapsis
+    of an orbit, and going from positive to negative is the farthest point.
+
+    Parameters
+    ----------
+    body : str
+        The name of the moving object.
+    centre : str
+        The name of the object the motion is measured relative to.
+    name, direction, terminal
+        See `Condition`.
+    """
+
+    def __init__(
+        self,
+        body: str,
+        centre: str,
+        *,
+        name: str | None = None,
+        direction: int = 0,
+        terminal: bool = False,
+    ) -> None:
+        super().__init__(
+            body, centre, name=name, direction=direction, terminal=terminal
+        )
+
+    def value(self, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+        """Give the relative position dotted with the relative velocity."""
+        b, c = self._idx
+        return np.einsum("ij,ij->i", pos[:, b] - pos[:, c], vel[:, b] - vel[:, c])
+
+
+def _sign_changes(cond: Condition, pos: np.ndarray, vel: np.ndarray) -> np.ndarray:
+    """Find the states `k` after which a condition changes sign in its direction.
+
+    Parameters
+    ----------
+    cond : Condition
+        The condition to evaluate.
+    pos, vel : np.ndarray
+        The positions and velocities of all objects at K times, shape (K, N, 2).
+
+    Returns
+    -------
+    np.ndarray
+        The indices `k` of the events between the states `k` and `k + 1`.
+    """
+    g = cond.value(pos, vel)
+    ok = cond.valid(pos, vel)
+    ok = ok[:-1] & ok[1:]
+    rise = (g[:-1] < 0) & (g[1:] >= 0)
+    fall = (g[:-1] > 0) & (g[1:] <= 0)
+    if cond.direction > 0:
+        return np.flatnonzero(ok & rise)
+    if cond.direction < 0:
+        return np.flatnonzero(ok & fall)
+    return np.flatnonzero(ok & (rise | fall))
+
+
+class Detector:
+    """Evaluate conditions in bulk on the states of a moving universe.
+
+    Attributes
+    ----------
+    conditions : list[Condition]
+        The events to look for.
+    crossings : list[Crossing]
+        The events found so far, in the order they happened.
+    stopped : Crossing | None
+        The terminal event that stopped the simulation, if any.
+    """
+
+    def __init__(self) -> None:
+        self.conditions: list[Condition] = []
+        self.crossings: list[Crossing] = []
+        self.stopped: Crossing | None = None
+        self._times = np.empty(0)
+        self._pos = np.empty((0, 0, 2))
+        self._vel = np.empty((0, 0, 2))
+        self._size = 0
+
+    def push(self, time: float, pos: np.ndarray, vel: np.ndarray) -> bool:
+        """Add the state at one time, and look for events once a chunk is collected.
+
+        Parameters
+        ----------
+        time : float
+            The current time, in iterations.
+        pos : np.ndarray
+            The positions of all objects, shape (N, 2).
+        vel : np.ndarray
+            The velocities of all objects, shape (N, 2).
+
+        Returns
+        -------
+        bool
+            True if a terminal event was found, and the simulation should stop.
+        """
+        if self._size and self._times[self._size - 1] == time:
+            # The same time again, for example after a kick, so keep the newer state
+            self._pos[self._size - 1] = pos
+            self._vel[self._size - 1] = vel
+            return False
+        if len(self._times) != CHUNK + 1 or self._pos.shape[1] != len(pos):
+            self._times = np.empty(CHUNK + 1)
+            self._pos = np.empty((CHUNK + 1, *pos.shape))
+            self._vel = np.empty((CHUNK + 1, *vel.shape))
+            self._size = 0
+        self._times[self._size] = time
+        self._pos[self._size] = pos
+        self._vel[self._size] = vel
+        self._size += 1
+        if self._size == CHUNK + 1:
+            return self.check()
+        return self._ended() and self.check()
+
+    def check(self) -> bool:
+        """Look for events in the states collected so far.
+
+        The last state is kept, so that events between it and the next one are found.
+
+        Returns
+        -------
+        bool
+            True if a terminal event was found, and the simulation should stop.
+        """
+        n = self._size
+        if n < 2:  # noqa: PLR2004
+            return False
+        times, pos, vel = self._times[:n], self._pos[:n], self._vel[:n]
+        found: list[tuple[int, Condition]] = []
+        for cond in self.conditions:
+            found.extend((int(k), cond) for k in _sign_changes(cond, pos, vel))
+        crossings = sorted(
+            (self._locate(cond, k) for k, cond in found), key=lambda c: c.time
+        )
+        for crossing in crossings:
+            self.crossings.append(crossing)
+            if crossing.terminal:
+                self.stopped = crossing
+                break
+        # Keep the last state to compare the next chunk with
+        self._times[0], self._pos[0], self._vel[0] = times[-1], pos[-1], vel[-1]
+        self._size = 1
+        return self.stopped is not None
+
+    def _ended(self) -> bool:
+        """Tell whether a terminal condition changed sign since the state before."""
+        n = self._size
+        if n < 2:  # noqa: PLR2004
+            return False
+        pos, vel = self._pos[n - 2 : n], self._vel[n - 2 : n]
+        return any(
+            len(_sign_changes(cond, pos, vel))
+            for cond in self.conditions
+            if cond.terminal
+        )
+
+    def _locate(self, cond: Condition, k: int) -> Crossing:
+        """Find the time of an event between the states `k` and `k + 1`.
+
+        The positions are interpolated with the cubic Hermite polynomial through the
+        positions and velocities at both ends, and the condition is solved on it with
+        the Illinois variant of regula falsi.
+        """
+        t0, t1 = self._times[k], self._times[k + 1]
+        dt = t1 - t0
+        p0, p1 = self._pos[k], self._pos[k + 1]
+        v0, v1 = self._vel[k] * dt, self._vel[k + 1] * dt
+
+        def state(s: float) -> tuple[np.ndarray, np.ndarray]:
+            s2, s3 = s * s, s * s * s
+            pos = (
+                (2 * s3 - 3 * s2 + 1) * p0
+                + (s3 - 2 * s2 + s) * v0
+                + (3 * s2 - 2 * s3) * p1
+                + (s3 - s2) * v1
+            )
+            vel = (
+                (6 * s2 - 6 * s) * p0
+                + (3 * s2 - 4 * s + 1) * v0
+                + (6 * s - 6 * s2) * p1
+                + (3 * s2 - 2 * s) * v1
+            ) / dt
+            return pos, vel
+
+        def g(s: float) -> float:
+            pos, vel = state(s)
+            return float(cond.value(pos[np.newaxis], vel[np.newaxis])[0])
+
+        a, b = 0.0, 1.0
+        ga, gb = g(a), g(b)
+        for _ in range(MAX_REFINEMENTS):
+            if gb == ga or b - a == 0:
+                break
+            s = (a * gb - b * ga) / (gb - ga)
+            gs = g(s)
+            if gs == 0:
+                a = b = s
+                break
+            if gs * gb < 0:
+                a, ga = b, gb
+            else:
+                ga /= 2
+            b, gb = s, gs
+            if abs(b - a) < TOLERANCE:
+                break
+        pos, vel = state(b)
+        return Crossing(cond.name, float(t0 + b * dt), pos, vel, cond.terminal)
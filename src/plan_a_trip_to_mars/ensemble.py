@@ -0,0 +1,262 @@
+"""Simulate many copies of a universe at once, as one array computation.
+
+When many universes only differ in their initial conditions or kicks, for example in a
+Monte Carlo study of how precise a launch must be, running each of them in a loop of
+its own spends most of the time in the Python interpreter. An `Ensemble` instead stacks
+the state of all M members into arrays of shape (M, N, 2), and moves every member one
+step forward with a single call to the force and integration kernels.
+
+All members must have the same number of objects and the same 'spi'. The direct
+gravity solver is used, and every member takes the same fixed step. Test particles pull
+on nothing, like in a single universe, so only the objects with a mass are summed over.
+Planets on rails and collisions are not supported.
+"""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from plan_a_trip_to_mars.config import G
+from plan_a_trip_to_mars.events import EventScheduler
+from plan_a_trip_to_mars.scenarios import BigScenario
+from plan_a_trip_to_mars.sweep import Variant, make_variant
+from plan_a_trip_to_mars.traces import TraceRecorder
+from plan_a_trip_to_mars.universe import Universe
+
+
+@dataclass
+class KickBatch:
+    """All kicks given at the same time, across the members of an ensemble.
+
+    Attributes
+    ----------
+    member : np.ndarray
+        The member each kick belongs to.
+    body : np.ndarray
+        The object within the member that is kicked.
+    angle : np.ndarray
+        The angle of each kick, in degrees.
+    speed : np.ndarray
+        The change in speed, or factor, of each kick.
+    multiply : np.ndarray
+        Whether each kick scales the speed instead of adding to it.
+    static : np.ndarray
+        Whether the angle of each kick is relative to the grid of the universe.
+    """
+
+    member: np.ndarray
+    body: np.ndarray
+    angle: np.ndarray
+    speed: np.ndarray
+    multiply: np.ndarray
+    static: np.ndarray
+
+
+def batched_field(targets: np.ndarray, pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """Sum the gravitational acceleration at some points from the bodies of each member.
+
+    Like `gravity.field`, a body at the same position as a target, usually the target
+    itself, is skipped.
+
+    Parameters
+    ----------
+    targets : np.ndarray
+        The points to find the acceleration at, shape (M, T, 2).
+    pos : np.ndarray
+        Positions of the bodies that pull, shape (M, S, 2).
+    mass : np.ndarray
+        Masses of the bodies that pull, shape (M, S).
+
+    Returns
+    -------
+    np.ndarray
+        The acceleration at every target, shape (M, T, 2).
+    """
+    dist = pos[:, np.newaxis, :, :] - targets[:, :, np.newaxis, :]
+    r2 = np.einsum("mijk,mijk->mij", dist, dist)
+    r2[r2 == 0] = np.inf
+    weight = mass[:, np.newaxis, :] * r2**-1.5
+    return G * np.einsum("mij,mijk->mik", weight, dist)
+
+
+class Ensemble:
+    """A stack of universes that are simulated together.
+
+    Parameters
+    ----------
+    universes : Sequence[Universe]
+        The members of the ensemble. They must be ready, and not moved yet. The
+        integrator and trace stride of the first member are used for all.
+    total_time : float | None
+        The expected number of iterations, used to size the trace buffer.
+
+    Raises
+    ------
+    ValueError
+        If the members differ in their objects or 'spi', or if they have planets on
+        rails or collisions.
+
+    Attributes
+    ----------
+    pos : np.ndarray
+        Positions of all objects in all members, shape (M, N, 2).
+    vel : np.ndarray
+        Velocities, in meters per iteration, shape (M, N, 2).
+    mass : np.ndarray
+        Masses, shape (M, N).
+    pull : np.ndarray
+        The masses the objects pull with, zero for test particles, shape (M, N).
+    time : float
+        The number of iterations simulated so far.
+    trace : TraceRecorder
+        The positions of all members, with samples of shape (M, N, 2).
+    events : EventScheduler
+        The kicks that have not been given yet, grouped by time.
+    """
+
+    def __init__(
+        self, universes: Sequence[Universe], total_time: float | None = None
+    ) -> None:
+        first = universes[0]
+        if any(
+            len(u.objects) != len(first.objects) or u.spi != first.spi
+            for u in universes
+        ):
+            msg = "All members of an ensemble need the same objects and 'spi'."
+            raise ValueError(msg)
+        if any(u._rails is not None or u.collider is not None for u in universes):  # noqa: SLF001
+            msg = (
+                "Members of an ensemble can not have planets on rails, cached planets "
+                "or collisions."
+            )
+            raise ValueError(msg)
+        self.names = [obj.name for obj in first.objects]
+        self._spi = first.spi
+        self._integrator = type(first.integrator)()
+        self.pos = np.stack([u.pos for u in universes])
+        self.vel = np.stack([u.vel for u in universes])
+        self.mass = np.stack([u.mass for u in universes])
+        self.pull = np.stack([u._pull for u in universes])  # noqa: SLF001
+        # Only the objects with a mass in some member pull, so sum over those alone
+        self._sources = np.flatnonzero(self.pull.any(axis=0))
+        self.time = 0.0
+        self.trace = TraceRecorder(self.pos.shape[:2], first.trace.stride, total_time)
+        self.events: EventScheduler[KickBatch] = EventScheduler()
+        self._collect_kicks(universes)
+
+    @classmethod
+    def from_scenario(
+        cls,
+        scenario: type[BigScenario],
+        variants: Sequence[Variant],
+        steps: float | None = None,
+    ) -> "Ensemble":
+        """Create one member per variant of a scenario.
+
+        Parameters
+        ----------
+        scenario : type[BigScenario]
+            The scenario class.
+        variants : Sequence[Variant]
+            Overrides of the class attributes of the scenario for each member, as used
+            by `plan_a_trip_to_mars.sweep`.
+        steps : float | None
+            The number of iterations to simulate, if different from the scenario.
+
+        Returns
+        -------
+        Ensemble
+            The ensemble, ready to run.
+        """
+        sims = [make_variant(scenario, v, steps) for v in variants]
+        return cls([s.my_uni for s in sims], sims[0].SIM_CONSTS.total_time)
+
+    def _collect_kicks(self, universes: Sequence[Universe]) -> None:
+        """Group the pending kicks of all members by the time they happen."""
+        by_time: dict[float, list[tuple]] = {}
+        for m, u in enumerate(universes):
+            for time, (rocket, k) in u.events.pending():
+                by_time.setdefault(time, []).append(
+                    (m, u.objects.index(rocket), k.angle, k.speed, k.multiply, k.static)
+                )
+        for time, rows in by_time.items():
+            cols = list(zip(*rows, strict=True))
+            self.events.push(
+                time,
+                KickBatch(
+                    member=np.array(cols[0]),
+                    body=np.array(cols[1]),
+                    angle=np.radians(cols[2]),
+                    speed=np.array(cols[3], dtype=float),
+                    multiply=np.array(cols[4], dtype=bool),
+                    static=np.array(cols[5], dtype=bool),
+                ),
+            )
+
+    def run(self, iterations: int) -> None:
+        """Move every member forward the given number of iterations.
+
+        Parameters
+        ----------
+        iterations : int
+            The number of iterations.
+        """
+        stop = int(self.time) + iterations
+        while self.time < stop:
+            # A kick at time t is given at the end of iteration t
+            chunk_end = min(stop, self.events.next_time() + 1)
+            while self.time < chunk_end:
+                self.trace.record(self.time, self.pos)
+                self._integrator.step(self.pos, self.vel, self._accelerate, 1.0)
+                self.time += 1
+            for batch in self.events.pop_due(self.time - 1):
+                self._kick(batch)
+
+    def member_trace(self, member: int) -> np.ndarray:
+        """Get the recorded positions of one member.
+
+        Parameters
+        ----------
+        member : int
+            The index of the member.
+
+        Returns
+        -------
+        np.ndarray
+            The positions, shape (samples, N, 2).
+        """
+        return self.trace.data[:, member]
+
+    def _accelerate(self, pos: np.ndarray, frac: float = 0.0) -> np.ndarray:  # noqa: ARG002
+        """Calculate the acceleration in meters per iteration squared."""
+        src = self._sources
+        return batched_field(pos, pos[:, src], self.pull[:, src]) * self._spi**2
+
+    def _kick(self, batch: KickBatch) -> None:
+        """Give every kick in the batch, in the same way as `Rocket.apply_kick`."""
+        vel = self.vel[batch.member, batch.body]
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        moving = (speed > 0) & ~batch.static
+        direction = np.where(
+            moving[:, np.newaxis],
+            vel / np.where(moving, speed, 1)[:, np.newaxis],
+            [1, 0],
+        )
+        cos, sin = np.cos(batch.angle), np.sin(batch.angle)
+        scaled = np.where(
+            batch.multiply[:, np.newaxis],
+            vel,
+            direction * batch.speed[:, np.newaxis] * self._spi,
+        )
+        rotated = np.column_stack(
+            [
+                scaled[:, 0] * cos - scaled[:, 1] * sin,
+                scaled[:, 0] * sin + scaled[:, 1] * cos,
+            ]
+        )
+        self.vel[batch.member, batch.body] = np.where(
+            batch.multiply[:, np.newaxis],
+            rotated * batch.speed[:, np.newaxis],
+            vel + rotated,
+        )
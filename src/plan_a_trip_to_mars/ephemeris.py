@@ -0,0 +1,147 @@
+"""Tables of the paths of the planets, cached on disk and shared between runs.
+
+When the same scenario is run again and again with different rocket manoeuvres, the
+planets move the same way every time, as long as the rockets do not pull on them. With
+`Universe.set_ephemeris`, the planets are simulated once on their own, and their
+positions, velocities and accelerations at every iteration are stored in a table on
+disk. The name of the file is a hash of everything the paths depend on: the initial
+state and mass of each planet, the 'spi', the gravity solver and the integrator. Later
+runs memory map the table, and put the planets on it like on rails, so that only the
+rockets are integrated.
+
+Between two iterations, the table is interpolated with the quintic Hermite polynomial
+through the position, velocity and acceleration at both ends.
+"""
+
+import hashlib
+import json
+import pathlib
+
+import numpy as np
+
+SUFFIX = ".eph.npy"
+
+
+def key(description: dict[str, object]) -> str:
+    """Hash the description of the planets and the universe they move in.
+
+    Parameters
+    ----------
+    description : dict[str, object]
+        Everything the paths of the planets depend on, as JSON compatible values.
+
+    Returns
+    -------
+    str
+        The hash, as hexadecimal digits.
+    """
+    raw = json.dumps(description, sort_keys=True).encode()
+    return hashlib.sha256(raw).hexdigest()
+
+
+def load(path: pathlib.Path) -> np.ndarray | None:
+    """Memory map a cached table.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The file of the table.
+
+    Returns
+    -------
+    np.ndarray | None
+        The read-only table, shape (samples, K, 3, 2), or None if there is none.
+    """
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+def save(path: pathlib.Path, table: np.ndarray) -> None:
+    """Store a table, replacing any shorter table of the same planets in one go.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        The file of the table.
+    table : np.ndarray
+        The table, shape (samples, K, 3, 2).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.partial")
+    with partial.open("wb") as f:
+        np.save(f, table)
+    partial.replace(path)
+
+
+class Ephemeris:
+    """Interpolate the positions and velocities of planets in a table.
+
+    Parameters
+    ----------
+    table : np.ndarray
+        The position, velocity and acceleration of each of the K planets at every
+        iteration, shape (samples, K, 3, 2), in SI units.
+    spi : float
+        The number of seconds per iteration, which is the time between two samples.
+    """
+
+    def __init__(self, table: np.ndarray, spi: float) -> None:
+        self.table = table
+        self.spi = spi
+
+    @property
+    def iterations(self) -> int:
+        """The number of iterations the table covers."""
+        return len(self.table) - 1
+
+    def state(self, t: float) -> tuple[np.ndarray, np.ndarray]:
+        """Give the positions and velocities of the planets.
+
+        Parameters
+        ----------
+        t : float
+            The time, in seconds.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The positions and velocities, each shape (K, 2).
+
+        Raises
+        ------
+        ValueError
+            If the time is outside of the table.
+        """
+        s = t / self.spi
+        if not 0 <= s <= self.iterations:
+            msg = (
+                f"The ephemeris covers {self.iterations} iterations, but was asked for "
+                f"iteration {s}. Give a longer span to 'set_ephemeris()'."
+            )
+            raise ValueError(msg)
+        i = min(int(s), self.iterations - 1)
+        u = s - i
+        if u == 0:
+            return np.array(self.table[i, :, 0]), np.array(self.table[i, :, 1])
+        (p0, v0, a0), (p1, v1, a1) = np.moveaxis(self.table[i : i + 2], 2, 1)
+        h = self.spi
+        u2, u3 = u * u, u * u * u
+        u4, u5 = u3 * u, u3 * u2
+        pos = (
+            (1 - 10 * u3 + 15 * u4 - 6 * u5) * p0
+            + (u - 6 * u3 + 8 * u4 - 3 * u5) * h * v0
+            + (u2 - 3 * u3 + 3 * u4 - u5) / 2 * h * h * a0
+            + (10 * u3 - 15 * u4 + 6 * u5) * p1
+            + (-4 * u3 + 7 * u4 - 3 * u5) * h * v1
+            + (u3 - 2 * u4 + u5) / 2 * h * h * a1
+        )
+        vel = (
+            (-30 * u2 + 60 * u3 - 30 * u4) * p0 / h
+            + (1 - 18 * u2 + 32 * u3 - 15 * u4) * v0
+            + (2 * u - 9 * u2 + 12 * u3 - 5 * u4) / 2 * h * a0
+            + (30 * u2 - 60 * u3 + 30 * u4) * p1 / h
+            + (-12 * u2 + 28 * u3 - 15 * u4) * v1
+            + (3 * u2 - 8 * u3 + 5 * u4) / 2 * h * a1
+        )
+        return pos, vel
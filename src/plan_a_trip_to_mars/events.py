@@ -0,0 +1,151 @@
+"""Scheduling of the events and observers that are due at given times in a simulation."""
+
+import heapq
+import itertools
+import math
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+
+
+class EventScheduler[T]:
+    """A priority queue of events, ordered by the time they should happen.
+
+    Events can be added in any order. Events at the same time are handed out in the
+    order they were added.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, int, T]] = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        """Return the number of events that have not happened yet."""
+        return len(self._heap)
+
+    def push(self, time: float, event: T) -> None:
+        """Add an event.
+
+        Parameters
+        ----------
+        time : float
+            The simulation time when the event should happen.
+        event : T
+            The event itself.
+        """
+        heapq.heappush(self._heap, (time, next(self._counter), event))
+
+    def next_time(self) -> float:
+        """Get the time of the next event.
+
+        Returns
+        -------
+        float
+            The time of the earliest event, or infinity if there are no events left.
+        """
+        return self._heap[0][0] if self._heap else math.inf
+
+    def pop_due(self, time: float) -> Iterator[T]:
+        """Remove and hand out every event that should have happened by `time`.
+
+        Parameters
+        ----------
+        time : float
+            The current simulation time.
+
+        Yields
+        ------
+        T
+            The events that are due, earliest first.
+        """
+        while self._heap and self._heap[0][0] <= time:
+            yield heapq.heappop(self._heap)[2]
+
+    def pending(self) -> list[tuple[float, T]]:
+        """List the events that have not happened yet, in the order they will happen.
+
+        Returns
+        -------
+        list[tuple[float, T]]
+            Pairs of the time and the event.
+        """
+        return [(t, e) for t, _, e in sorted(self._heap)]
+
+
+@dataclass
+class Observer:
+    """Container for a function that is called every so often while a scenario runs.
+
+    Attributes
+    ----------
+    callback : Callable[[int], object]
+        The function, called with the time step that was just simulated.
+    stride : int | None
+        The number of time steps between two calls.
+    interval : float | None
+        The simulation time between two calls, in seconds, used if `stride` is None.
+    offset : int
+        The time step within each stride to call it at. Zero calls it at the first time
+        step, and `stride - 1` when the time reached is a multiple of the stride.
+    """
+
+    callback: Callable[[int], object]
+    stride: int | None = None
+    interval: float | None = None
+    offset: int = 0
+
+    def every(self, spi: int) -> int:
+        """Give the number of time steps between two calls.
+
+        Parameters
+        ----------
+        spi : int
+            The number of seconds per time step of the universe.
+
+        Returns
+        -------
+        int
+            The stride, at least one.
+        """
+        if self.stride is not None:
+            return max(1, self.stride)
+        assert self.interval is not None  # noqa: S101
+        return max(1, round(self.interval / spi))
+
+
+@dataclass
+class Due:
+    """Container for a callback of a running scenario, and when it is due next.
+
+    Attributes
+    ----------
+    step : int
+        The next time step to call it at.
+    every : int
+        The number of time steps between two calls.
+    callback : Callable[[int], object]
+        The function, called with the time step that was just simulated.
+    """
+
+    step: int
+    every: int
+    callback: Callable[[int], object]
+
+
+def first_due(start: int, stride: int, offset: int = 0) -> int:
+    """Find the first time step from `start` that is `offset` past a multiple of `stride`.
+
+    Parameters
+    ----------
+    start : int
+        The earliest time step.
+    stride : int
+        The number of time steps between two calls.
+    offset : int
+        The time step within each stride.
+
+    Returns
+    -------
+    int
+        The time step.
+    """
+    return start + (offset - start) % stride
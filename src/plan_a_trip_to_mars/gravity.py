@@ -0,0 +1,474 @@
+"""Solvers for the gravitational acceleration between all bodies in a universe.
+
+Every solver takes the positions and masses of all bodies as arrays and returns the
+acceleration each body feels from all the others, in meters per second squared.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+
+from plan_a_trip_to_mars.config import G
+
+type Solver = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Number of times the root cell of the quadtree may be split in four
+MAX_DEPTH = 21
+# Up to this many bodies, a loop over the pairs in plain Python is faster than numpy,
+# whose calls each cost about a microsecond whatever the size of the arrays
+SMALL_N = 8
+
+
+@dataclass
+class ForceError:
+    """Container for the error of an approximate solver relative to the direct sum.
+
+    Attributes
+    ----------
+    mean : float
+        The mean relative error of the acceleration over all bodies.
+    rms : float
+        The root-mean-square of the relative error.
+    max : float
+        The largest relative error of any body.
+    """
+
+    mean: float
+    rms: float
+    max: float
+
+
+def direct_sum(pos: np.ndarray, mass: np.ndarray, block: int = 512) -> np.ndarray:
+    """Sum the gravitational acceleration on each body from all other bodies.
+
+    All pairs are evaluated with array broadcasting. To keep the memory use bounded for
+    large numbers of bodies, the targets are handled in blocks of `block` rows at a time.
+    A few bodies, up to `SMALL_N`, are summed in a loop over the pairs instead, which
+    avoids the fixed cost of the array calls.
+
+    Parameters
+    ----------
+    pos : np.ndarray
+        Positions of the bodies, shape (N, 2).
+    mass : np.ndarray
+        Masses of the bodies, shape (N,).
+    block : int
+        The number of target bodies to evaluate at once.
+
+    Returns
+    -------
+    np.ndarray
+        The acceleration of every body, shape (N, 2).
+    """
+    if len(pos) <= SMALL_N:
+        return _pair_loop(pos, mass)
+    acc = np.empty_like(pos)
+    for start in range(0, len(pos), block):
+        stop = min(start + block, len(pos))
+        # Distance vectors from each target in the block to every body
+        dist = pos[np.newaxis, :, :] - pos[start:stop, np.newaxis, :]
+        r2 = np.einsum("ijk,ijk->ij", dist, dist)
+        # A body does not pull on itself
+        r2[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        weight = mass * r2**-1.5
+        acc[start:stop] = G * np.einsum("ij,ijk->ik", weight, dist)
+    return acc
+
+
+def _pair_loop(pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """Sum the acceleration of a few bodies over each pair once, with Python floats."""
+    xy = pos.tolist()
+    m = mass.tolist()
+    acc = [[0.0, 0.0] for _ in xy]
+    for i, (xi, yi) in enumerate(xy):
+        for j in range(i + 1, len(xy)):
+            dx = xy[j][0] - xi
+            dy = xy[j][1] - yi
+            r2 = dx * dx + dy * dy
+            f = G / (r2 * r2**0.5)
+            acc[i][0] += m[j] * f * dx
+            acc[i][1] += m[j] * f * dy
+            acc[j][0] -= m[i] * f * dx
+            acc[j][1] -= m[i] * f * dy
+    return np.array(acc)
+
+
+def field(
+    targets: np.ndarray, pos: np.ndarray, mass: np.ndarray, block: int = 512
+) -> np.ndarray:
+    """Sum the gravitational acceleration at some points from all bodies.
+
+    This is cheaper than `direct_sum` when the acceleration is only needed at a few of
+    the bodies, or when only a few of them have any mass. A body at the same position
+    as a target, usually the target itself, is skipped.
+
+    Parameters
+    ----------
+    targets : np.ndarray
+        The points to find the acceleration at, shape (M, 2).
+    pos : np.ndarray
+        Positions of the bodies that pull, shape (N, 2).
+    mass : np.ndarray
+        Masses of the bodies that pull, shape (N,).
+    block : int
+        The number of targets to evaluate at once.
+
+    Returns
+    -------
+    np.ndarray
+        The acceleration at every target, shape (M, 2).
+    """
+    acc = np.empty_like(targets)
+    for start in range(0, len(targets), block):
+        stop = min(start + block, len(targets))
+        dist = pos[np.newaxis, :, :] - targets[start:stop, np.newaxis, :]
+        r2 = np.einsum("ijk,ijk->ij", dist, dist)
+        r2[r2 == 0] = np.inf
+        weight = mass * r2**-1.5
+        acc[start:stop] = G * np.einsum("ij,ijk->ik", weight, dist)
+    return acc
+
+
+def potential_energy(pos: np.ndarray, mass: np.ndarray, block: int = 512) -> float:
+    """Sum the gravitational potential energy over all pairs of bodies.
+
+    Parameters
+    ----------
+    pos : np.ndarray
+        Positions of the bodies, shape (N, 2).
+    mass : np.ndarray
+        Masses of the bodies, shape (N,).
+    block : int
+        The number of bodies to evaluate at once.
+
+    Returns
+    -------
+    float
+        The total potential energy, in joule.
+    """
+    energy = 0.0
+    for start in range(0, len(pos), block):
+        stop = min(start + block, len(pos))
+        dist = pos[np.newaxis, :, :] - pos[start:stop, np.newaxis, :]
+        r = np.sqrt(np.einsum("ijk,ijk->ij", dist, dist))
+        # Only count each pair once
+        r[np.arange(len(pos)) <= np.arange(start, stop)[:, np.newaxis]] = np.inf
+        energy -= G * float(mass[start:stop] @ (1 / r) @ mass)
+    return energy
+
+
+def free_fall_time(pos: np.ndarray, mass: np.ndarray, block: int = 512) -> float:
+    """Find the shortest free-fall time of any pair of bodies.
+
+    The free-fall time of a pair is the time scale `sqrt(r^3 / (G (m_1 + m_2)))` on
+    which their mutual pull changes their motion, and is short for close encounters.
+
+    Parameters
+    ----------
+    pos : np.ndarray
+        Positions of the bodies, shape (N, 2).
+    mass : np.ndarray
+        Masses of the bodies, shape (N,).
+    block : int
+        The number of bodies to evaluate at once.
+
+    Returns
+    -------
+    float
+        The shortest free-fall time, in seconds. Infinite if no pair pulls on another.
+    """
+    shortest = np.inf
+    for start in range(0, len(pos), block):
+        stop = min(start + block, len(pos))
+        dist = pos[np.newaxis, :, :] - pos[start:stop, np.newaxis, :]
+        r2 = np.einsum("ijk,ijk->ij", dist, dist)
+        gm = G * (mass[start:stop, np.newaxis] + mass)
+        r2[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        with np.errstate(divide="ignore"):
+            shortest = min(shortest, float(np.sqrt((r2**1.5 / gm).min())))
+    return shortest
+
+
+@dataclass
+class QuadTree:
+    """A quadtree over a set of bodies, stored as flat arrays with one row per node.
+
+    The bodies are sorted along a Morton (Z-order) curve, so that the bodies inside any
+    node are a contiguous range of the sorted order. Nodes are stored level by level,
+    and the children of a node are a contiguous range of the next level.
+
+    Attributes
+    ----------
+    order : np.ndarray
+        Indices that sort the bodies along the Morton curve.
+    com : np.ndarray
+        Centre of mass of each node, shape (M, 2).
+    mass : np.ndarray
+        Total mass of each node, shape (M,).
+    size : np.ndarray
+        Side length of each node, shape (M,).
+    start : np.ndarray
+        First body (in sorted order) inside each node.
+    stop : np.ndarray
+        One past the last body (in sorted order) inside each node.
+    first_child : np.ndarray
+        Index of the first child of each node.
+    n_child : np.ndarray
+        Number of children of each node. Leaves have none.
+    """
+
+    order: np.ndarray
+    com: np.ndarray
+    mass: np.ndarray
+    size: np.ndarray
+    start: np.ndarray
+    stop: np.ndarray
+    first_child: np.ndarray
+    n_child: np.ndarray
+
+    @classmethod
+    def build(
+        cls, pos: np.ndarray, mass: np.ndarray, max_depth: int = MAX_DEPTH
+    ) -> "QuadTree":
+        """Build the tree over the given bodies.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            Positions of the bodies, shape (N, 2).
+        mass : np.ndarray
+            Masses of the bodies, shape (N,).
+        max_depth : int
+            The deepest level of the tree. Bodies that still share a cell at this level
+            are kept together in one leaf.
+
+        Returns
+        -------
+        QuadTree
+            The tree with all its nodes.
+        """
+        n = len(pos)
+        lo = pos.min(axis=0)
+        span = float((pos.max(axis=0) - lo).max()) or 1.0
+        cells = np.minimum(
+            ((pos - lo) / span * 2**max_depth).astype(np.int64), 2**max_depth - 1
+        )
+        keys = _morton(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+        keys, p, m = keys[order], pos[order], mass[order]
+
+        starts, stops, sizes, parents = [np.array([0])], [np.array([n])], [], []
+        prefixes = [np.array([0])]
+        sizes.append(np.array([span]))
+        offset = 1
+        # Bodies that live in a node with more than one body must be split further
+        active = np.arange(n) if n > 1 else np.arange(0)
+        for level in range(1, max_depth + 1):
+            if not len(active):
+                break
+            prefix = keys[active] >> 2 * (max_depth - level)
+            new = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            first, last = active[new], active[np.r_[new[1:], len(active)] - 1] + 1
+            prev_offset = offset - len(prefixes[-1])
+            parents.append(
+                prev_offset + np.searchsorted(prefixes[-1], prefix[new] >> 2)
+            )
+            prefixes.append(prefix[new])
+            starts.append(first)
+            stops.append(last)
+            sizes.append(np.full(len(new), span / 2**level))
+            offset += len(new)
+            split = last - first > 1
+            _, active = _expand(first[split], first[split], last[split])
+
+        start, stop = np.concatenate(starts), np.concatenate(stops)
+        first_child = np.zeros(len(start), dtype=np.int64)
+        n_child = np.zeros(len(start), dtype=np.int64)
+        if parents:
+            parent = np.concatenate(parents)
+            ids, first_idx, counts = np.unique(
+                parent, return_index=True, return_counts=True
+            )
+            first_child[ids] = first_idx + 1
+            n_child[ids] = counts
+
+        # Mass and centre of mass, summed separately over the bodies of each node
+        node_mass = _range_sum(m, start, stop)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            com = np.where(
+                node_mass[:, np.newaxis] > 0,
+                _range_sum(m[:, np.newaxis] * p, start, stop)
+                / node_mass[:, np.newaxis],
+                # Massless nodes get their geometric centre, they pull on nothing
+                _range_sum(p, start, stop) / (stop - start)[:, np.newaxis],
+            )
+        return cls(
+            order=order,
+            com=com,
+            mass=node_mass,
+            size=np.concatenate(sizes),
+            start=start,
+            stop=stop,
+            first_child=first_child,
+            n_child=n_child,
+        )
+
+
+def barnes_hut(pos: np.ndarray, mass: np.ndarray, theta: float = 0.5) -> np.ndarray:
+    """Approximate the gravitational acceleration using a Barnes-Hut quadtree.
+
+    A node of the tree is treated as a single point mass at its centre of mass when its
+    size divided by the distance to the body is smaller than the opening angle `theta`.
+    Otherwise, its children are inspected in turn. The tree is walked for all bodies
+    at once, one level at a time, so that the work is done by NumPy rather than in a
+    Python loop over the bodies.
+
+    Parameters
+    ----------
+    pos : np.ndarray
+        Positions of the bodies, shape (N, 2).
+    mass : np.ndarray
+        Masses of the bodies, shape (N,).
+    theta : float
+        The opening angle. Zero gives the direct sum, larger values are faster but
+        less accurate.
+
+    Returns
+    -------
+    np.ndarray
+        The acceleration of every body, shape (N, 2).
+    """
+    n = len(pos)
+    tree = QuadTree.build(pos, mass)
+    p = pos[tree.order]
+    acc = np.zeros((n, 2))
+    # Each pair in the frontier is a target body (in sorted order) and a node
+    tgt, node = np.arange(n), np.zeros(n, dtype=np.int64)
+    while len(tgt):
+        keep = tree.mass[node] > 0
+        tgt, node = tgt[keep], node[keep]
+        dist = tree.com[node] - p[tgt]
+        r = np.hypot(dist[:, 0], dist[:, 1])
+        inside = (tree.start[node] <= tgt) & (tgt < tree.stop[node])
+        leaf = tree.n_child[node] == 0
+        far = ~inside & (leaf | (tree.size[node] < theta * r))
+        _accumulate(acc, tgt[far], tree.mass[node[far]], dist[far], r[far])
+
+        # A leaf that holds the target together with other bodies (only possible at
+        # the deepest level) is summed body by body.
+        shared = inside & leaf & (tree.stop[node] - tree.start[node] > 1)
+        if shared.any():
+            t, src = _expand(
+                tgt[shared], tree.start[node[shared]], tree.stop[node[shared]]
+            )
+            src, t = src[src != t], t[src != t]
+            d = p[src] - p[t]
+            _accumulate(acc, t, mass[tree.order[src]], d, np.hypot(d[:, 0], d[:, 1]))
+
+        opened = ~far & ~leaf
+        tgt, node = _expand(
+            tgt[opened],
+            tree.first_child[node[opened]],
+            tree.first_child[node[opened]] + tree.n_child[node[opened]],
+        )
+    out = np.empty_like(acc)
+    out[tree.order] = acc
+    return out
+
+
+def force_error(approx: np.ndarray, exact: np.ndarray) -> ForceError:
+    """Compare the accelerations from an approximate solver to the direct sum.
+
+    Parameters
+    ----------
+    approx : np.ndarray
+        Accelerations from the approximate solver, shape (N, 2).
+    exact : np.ndarray
+        Accelerations from the direct sum, shape (N, 2).
+
+    Returns
+    -------
+    ForceError
+        The mean, root-mean-square and largest relative error.
+    """
+    norm = np.hypot(exact[:, 0], exact[:, 1])
+    diff = approx - exact
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = np.where(norm > 0, np.hypot(diff[:, 0], diff[:, 1]) / norm, 0.0)
+    return ForceError(
+        mean=float(rel.mean()),
+        rms=float(np.sqrt((rel**2).mean())),
+        max=float(rel.max()),
+    )
+
+
+def get_solver(name: str, theta: float = 0.5) -> Solver:
+    """Look up a solver by name.
+
+    Parameters
+    ----------
+    name : str
+        Either "direct" or "barnes-hut".
+    theta : float
+        The opening angle used by the Barnes-Hut solver.
+
+    Returns
+    -------
+    Solver
+        A function from positions and masses to accelerations.
+
+    Raises
+    ------
+    ValueError
+        If there is no solver with the given name.
+    """
+    match name:
+        case "direct":
+            return direct_sum
+        case "barnes-hut":
+            return partial(barnes_hut, theta=theta)
+        case _:
+            msg = f"Unknown solver '{name}'. Choose between 'direct' and 'barnes-hut'."
+            raise ValueError(msg)
+
+
+def _morton(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Interleave the bits of the integer cell coordinates into Morton keys."""
+    return _spread(x) | (_spread(y) << 1)
+
+
+def _spread(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the lower 32 bits of `v`."""
+    v = v & 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    return (v | (v << 1)) & 0x5555555555555555
+
+
+def _expand(
+    owner: np.ndarray, first: np.ndarray, stop: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Pair each owner with every index in its range `first` to `stop`."""
+    counts = stop - first
+    owners = np.repeat(owner, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owners, np.repeat(first, counts) + offsets
+
+
+def _range_sum(values: np.ndarray, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """Sum `values` over each of the index ranges `start` to `stop`."""
+    padded = np.concatenate([values, np.zeros((1, *values.shape[1:]))])
+    return np.add.reduceat(padded, np.column_stack([start, stop]).ravel(), axis=0)[::2]
+
+
+def _accumulate(
+    acc: np.ndarray, tgt: np.ndarray, mass: np.ndarray, dist: np.ndarray, r: np.ndarray
+) -> None:
+    """Add the pull of point masses at distance `dist` to the targets."""
+    weight = G * mass / r**3
+    acc[:, 0] += np.bincount(tgt, weights=weight * dist[:, 0], minlength=len(acc))
+    acc[:, 1] += np.bincount(tgt, weights=weight * dist[:, 1], minlength=len(acc))
@@ -0,0 +1,199 @@
+"""Integration schemes that move the objects of a universe forward in time.
+
+All schemes work in the units used inside the universe: positions are in meters, time
+is counted in iterations and velocities are in meters per iteration. A step of length
+`h` therefore moves the universe `h` iterations forward, and the acceleration function
+must return meters per iteration squared. Besides the positions, the acceleration
+function is given the time within the step it is evaluated at, as a fraction of `h`, so
+that objects whose path is known in advance can be placed where they are at that time.
+
+The positions and velocities are updated in place, and are always synchronised at the
+end of a step. This means that instant changes to the velocity between two steps, like
+the kicks given to a rocket, are handled correctly by every scheme.
+"""
+
+import itertools
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+
+import numpy as np
+
+type Acceleration = Callable[[np.ndarray, float], np.ndarray]
+
+# Coefficients of the fourth order Yoshida composition of leapfrog steps
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = -(2 ** (1 / 3)) * _W1
+_YOSHIDA_C = (_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2)
+_YOSHIDA_D = (_W1, _W0, _W1)
+# The time within the step of each force evaluation, as a fraction of the step
+_YOSHIDA_T = tuple(itertools.accumulate(_YOSHIDA_C[:3]))
+
+
+class Integrator(ABC):
+    """Abstract base class for the integration schemes.
+
+    Attributes
+    ----------
+    order : int
+        The order of the global error of the scheme.
+    evaluations : int
+        The number of times the acceleration is computed per step.
+    """
+
+    order: int
+    evaluations: int
+
+    @abstractmethod
+    def step(
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        """Move the positions and velocities one step forward, in place.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            Positions, shape (N, 2).
+        vel : np.ndarray
+            Velocities, shape (N, 2).
+        accel : Acceleration
+            Function giving the accelerations at the given positions, and at the given
+            fraction of the step.
+        h : float
+            The length of the step, in iterations.
+        """
+
+    def reset(self) -> None:  # noqa: B027
+        """Forget anything remembered from the previous step."""
+
+
+class Euler(Integrator):
+    """The first order semi-implicit (symplectic) Euler scheme.
+
+    The velocity is updated with the current acceleration before the position is moved
+    with the new velocity.
+    """
+
+    order = 1
+    evaluations = 1
+
+    def step(  # noqa: D102
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        vel += accel(pos, 0.0) * h
+        pos += vel * h
+
+
+class Leapfrog(Integrator):
+    """The second order drift-kick-drift leapfrog scheme."""
+
+    order = 2
+    evaluations = 1
+
+    def step(  # noqa: D102
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        pos += vel * (h / 2)
+        vel += accel(pos, 0.5) * h
+        pos += vel * (h / 2)
+
+
+class VelocityVerlet(Integrator):
+    """The second order kick-drift-kick (velocity Verlet) scheme.
+
+    The acceleration at the end of a step is remembered and re-used at the start of the
+    next, as long as the positions have not been changed in between.
+    """
+
+    order = 2
+    evaluations = 1
+
+    def __init__(self) -> None:
+        self._pos: np.ndarray | None = None
+        self._acc: np.ndarray = np.zeros((0, 2))
+
+    def reset(self) -> None:  # noqa: D102
+        self._pos = None
+
+    def step(  # noqa: D102
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        if self._pos is None or not np.array_equal(self._pos, pos):
+            self._acc = accel(pos, 0.0)
+        vel += self._acc * (h / 2)
+        pos += vel * h
+        self._acc = accel(pos, 1.0)
+        vel += self._acc * (h / 2)
+        self._pos = pos.copy()
+
+
+class Yoshida4(Integrator):
+    """The fourth order symplectic scheme of Yoshida, built from three leapfrog steps."""
+
+    order = 4
+    evaluations = 3
+
+    def step(  # noqa: D102
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        for c, d, t in zip(_YOSHIDA_C, _YOSHIDA_D, _YOSHIDA_T, strict=False):
+            pos += vel * (c * h)
+            vel += accel(pos, t) * (d * h)
+        pos += vel * (_YOSHIDA_C[-1] * h)
+
+
+class RungeKutta4(Integrator):
+    """The classic fourth order Runge-Kutta scheme.
+
+    This scheme is not symplectic, so the energy will slowly drift over long runs, but
+    it is very accurate over a few orbits.
+    """
+
+    order = 4
+    evaluations = 4
+
+    def step(  # noqa: D102
+        self, pos: np.ndarray, vel: np.ndarray, accel: Acceleration, h: float
+    ) -> None:
+        k1x, k1v = vel, accel(pos, 0.0)
+        k2x = vel + k1v * (h / 2)
+        k2v = accel(pos + k1x * (h / 2), 0.5)
+        k3x = vel + k2v * (h / 2)
+        k3v = accel(pos + k2x * (h / 2), 0.5)
+        k4x = vel + k3v * h
+        k4v = accel(pos + k3x * h, 1.0)
+        pos += (k1x + 2 * k2x + 2 * k3x + k4x) * (h / 6)
+        vel += (k1v + 2 * k2v + 2 * k3v + k4v) * (h / 6)
+
+
+INTEGRATORS: dict[str, type[Integrator]] = {
+    "euler": Euler,
+    "leapfrog": Leapfrog,
+    "verlet": VelocityVerlet,
+    "yoshida4": Yoshida4,
+    "rk4": RungeKutta4,
+}
+
+
+def get_integrator(name: str) -> Integrator:
+    """Create an integrator from its name.
+
+    Parameters
+    ----------
+    name : str
+        One of "euler", "leapfrog", "verlet", "yoshida4" or "rk4".
+
+    Returns
+    -------
+    Integrator
+        A new instance of the integration scheme.
+
+    Raises
+    ------
+    ValueError
+        If there is no integrator with the given name.
+    """
+    try:
+        return INTEGRATORS[name]()
+    except KeyError as e:
+        msg = f"Unknown integrator '{name}'. Choose between {', '.join(INTEGRATORS)}."
+        raise ValueError(msg) from e
@@ -0,0 +1,221 @@
+"""Analytic Kepler orbits, for planets that are put on rails instead of integrated.
+
+A planet on rails is at an exact position for any time, computed from the elements of
+its orbit around another planet, however long the steps of the simulation are. It
+still pulls on the objects that are integrated, but nothing pulls on it.
+
+All quantities in this module are in SI units: meters, seconds and meters per second.
+Angles are given in degrees, as everywhere else in the universe.
+"""
+
+from dataclasses import dataclass
+from typing import Self
+
+import numpy as np
+
+# Solve Kepler's equation to this accuracy in the eccentric anomaly, in radians
+TOLERANCE = 1e-13
+MAX_ITERATIONS = 50
+
+
+@dataclass
+class Orbit:
+    """Container for the elements of an elliptic orbit in the plane.
+
+    Attributes
+    ----------
+    a : float
+        The semi-major axis, in meters.
+    e : float
+        The eccentricity, from zero (a circle) up to, but not including, one.
+    periapsis : float
+        The angle from the x-axis to the closest point of the orbit, in degrees.
+    mean_anomaly : float
+        The mean anomaly at time zero, in degrees. Zero is at the periapsis.
+    retrograde : bool
+        If True, the orbit goes clockwise. The orbit is then the mirror image, in the
+        x-axis, of the anti-clockwise orbit with the same elements.
+    """
+
+    a: float
+    e: float = 0.0
+    periapsis: float = 0.0
+    mean_anomaly: float = 0.0
+    retrograde: bool = False
+
+    def __post_init__(self) -> None:
+        """Check that the orbit is elliptic."""
+        if self.a <= 0 or not 0 <= self.e < 1:
+            msg = (
+                "Only elliptic orbits are supported, with a positive semi-major axis "
+                f"and an eccentricity in [0, 1). Got a={self.a}, e={self.e}."
+            )
+            raise ValueError(msg)
+
+    @classmethod
+    def from_state(cls, pos: np.ndarray, vel: np.ndarray, mu: float) -> Self:
+        """Find the orbit through a position with a velocity.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            The position relative to the centre of the orbit, shape (2,).
+        vel : np.ndarray
+            The velocity relative to the centre, shape (2,).
+        mu : float
+            The gravitational parameter, G times the mass of the centre and the body.
+
+        Returns
+        -------
+        Self
+            The orbit, with time zero at the given state.
+
+        Raises
+        ------
+        ValueError
+            If the body is not bound to the centre.
+        """
+        (x, y), (vx, vy) = pos, vel
+        retrograde = x * vy - y * vx < 0
+        if retrograde:
+            y, vy = -y, -vy
+        r = np.hypot(x, y)
+        v2 = vx * vx + vy * vy
+        if v2 / mu >= 2 / r:
+            msg = "The body is not bound to the centre, so it has no elliptic orbit."
+            raise ValueError(msg)
+        rv = x * vx + y * vy
+        ex = ((v2 - mu / r) * x - rv * vx) / mu
+        ey = ((v2 - mu / r) * y - rv * vy) / mu
+        e = float(np.hypot(ex, ey))
+        periapsis = np.arctan2(ey, ex) if e > 0 else 0.0
+        nu = np.arctan2(y, x) - periapsis
+        big_e = np.arctan2(np.sqrt(1 - e * e) * np.sin(nu), e + np.cos(nu))
+        mean = big_e - e * np.sin(big_e)
+        return cls(
+            float(1 / (2 / r - v2 / mu)),
+            e,
+            float(np.degrees(periapsis)),
+            float(np.degrees(mean)),
+            bool(retrograde),
+        )
+
+    def period(self, mu: float) -> float:
+        """Give the time of one revolution, in seconds.
+
+        Parameters
+        ----------
+        mu : float
+            The gravitational parameter, G times the mass of the centre and the body.
+
+        Returns
+        -------
+        float
+            The period.
+        """
+        return 2 * np.pi * np.sqrt(self.a**3 / mu)
+
+
+class Rails:
+    """Compute the positions and velocities of a group of planets on rails at once.
+
+    Each planet either moves on a Kepler orbit around another planet of the group, or,
+    without a centre, in a straight line with constant velocity.
+
+    Parameters
+    ----------
+    orbits : list[Orbit | None]
+        The orbit of each planet, or None for a straight line.
+    centres : list[int]
+        The index within the group of the centre of each orbit, or -1 for none. A
+        centre must come before the planets orbiting it.
+    mu : np.ndarray
+        The gravitational parameter of each orbit, shape (K,).
+    pos : np.ndarray
+        The position at time zero of the planets without a centre, shape (K, 2).
+    vel : np.ndarray
+        The velocity of the planets without a centre, shape (K, 2).
+    """
+
+    def __init__(
+        self,
+        orbits: list[Orbit | None],
+        centres: list[int],
+        mu: np.ndarray,
+        pos: np.ndarray,
+        vel: np.ndarray,
+    ) -> None:
+        elements = [o or Orbit(1.0) for o in orbits]
+        self._kepler = np.array([o is not None for o in orbits])
+        self._centre = np.array(centres, dtype=int)
+        self._a = np.array([o.a for o in elements])
+        self._e = np.array([o.e for o in elements])
+        self._b = self._a * np.sqrt(1 - self._e**2)
+        self._w = np.radians([o.periapsis for o in elements])
+        self._m0 = np.radians([o.mean_anomaly for o in elements])
+        self._n = np.sqrt(mu / self._a**3)
+        self._sign = np.array([-1.0 if o.retrograde else 1.0 for o in elements])
+        self._pos0 = np.asarray(pos, dtype=float)
+        self._vel0 = np.asarray(vel, dtype=float)
+        # Add the centres level by level, so that a moon follows its planet
+        depth = np.zeros(len(orbits), dtype=int)
+        for i, c in enumerate(centres):
+            depth[i] = 0 if c < 0 else depth[c] + 1
+        self._levels = [np.flatnonzero(depth == d) for d in range(1, depth.max() + 1)]
+
+    def state(self, t: float) -> tuple[np.ndarray, np.ndarray]:
+        """Give the positions and velocities of the planets.
+
+        Parameters
+        ----------
+        t : float
+            The time, in seconds.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The positions and velocities, each shape (K, 2).
+        """
+        mean = self._m0 + self._n * t
+        big_e = solve_kepler(mean, self._e)
+        cos_e, sin_e = np.cos(big_e), np.sin(big_e)
+        rate = self._n / (1 - self._e * cos_e)
+        # In the frame of the orbit, with the periapsis along the x-axis
+        x, y = self._a * (cos_e - self._e), self._sign * self._b * sin_e
+        vx, vy = -self._a * sin_e * rate, self._sign * self._b * cos_e * rate
+        w = self._sign * self._w
+        cos_w, sin_w = np.cos(w), np.sin(w)
+        pos = np.column_stack([x * cos_w - y * sin_w, x * sin_w + y * cos_w])
+        vel = np.column_stack([vx * cos_w - vy * sin_w, vx * sin_w + vy * cos_w])
+        line = ~self._kepler
+        pos[line] = self._pos0[line] + self._vel0[line] * t
+        vel[line] = self._vel0[line]
+        for level in self._levels:
+            pos[level] += pos[self._centre[level]]
+            vel[level] += vel[self._centre[level]]
+        return pos, vel
+
+
+def solve_kepler(mean: np.ndarray, e: np.ndarray) -> np.ndarray:
+    """Solve Kepler's equation `E - e sin(E) = M` for the eccentric anomaly.
+
+    Parameters
+    ----------
+    mean : np.ndarray
+        The mean anomaly M, in radians.
+    e : np.ndarray
+        The eccentricity.
+
+    Returns
+    -------
+    np.ndarray
+        The eccentric anomaly E, in radians.
+    """
+    mean = np.remainder(mean, 2 * np.pi)
+    big_e = np.where(e < 0.8, mean, np.pi)  # noqa: PLR2004
+    for _ in range(MAX_ITERATIONS):
+        step = (big_e - e * np.sin(big_e) - mean) / (1 - e * np.cos(big_e))
+        big_e = big_e - step
+        if np.all(np.abs(step) < TOLERANCE):
+            break
+    return big_e
@@ -0,0 +1,184 @@
+"""Watch a simulation while it runs, instead of after it is done.
+
+The scenario runs in a background thread, and an observer copies the positions of the
+objects into a bounded queue every few iterations. The animation takes one frame from
+the queue each time it draws, and keeps the frames it has taken in a `TracePyramid`, so
+that the run can be replayed when it is done, in bounded memory however long it runs.
+When the queue is full, the simulation
+waits for the animation to catch up, so that it never runs far ahead and the memory of
+the queue stays bounded. The simulation and the drawing thus overlap, and a run takes
+about as long as the slower of the two, instead of their sum.
+
+Most of the time of a step is spent in numpy, which lets other threads run, so a thread
+is enough to keep the animation smooth without copying the universe to another process.
+"""
+
+import queue
+import threading
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from plan_a_trip_to_mars.events import Observer
+from plan_a_trip_to_mars.traces import TracePyramid
+
+if TYPE_CHECKING:
+    from plan_a_trip_to_mars.scenarios import BigScenario
+
+# Check this often, in seconds, whether the animation was closed while the queue is full
+POLL = 0.1
+# The memory the kept frames may take, in bytes, when the scenario sets no trace memory
+MAX_BYTES = 2**26
+
+
+class _Cancelled(Exception):  # noqa: N818
+    """Raised in the simulation thread to stop a run that nobody watches any more."""
+
+
+class LiveFeed:
+    """Run a scenario in a background thread, and hand out its frames in order.
+
+    Parameters
+    ----------
+    sim : BigScenario
+        The scenario, after `setup`.
+    every : int | None
+        Send a frame every `every` iterations. Defaults to the trace stride, so that the
+        frames are the samples of the trace.
+    maxsize : int
+        The number of frames the simulation may be ahead of the animation.
+    max_bytes : int | None
+        The memory the kept frames may take, in bytes. Defaults to the trace memory of
+        the scenario, or `MAX_BYTES` if it has none.
+
+    Attributes
+    ----------
+    names : list[str]
+        The names of the objects.
+    pos : np.ndarray
+        The positions of the last frame taken, shape (N, 2).
+    time : float
+        The simulation time of the last frame taken, in seconds.
+    finished : bool
+        Whether every frame of the run has been taken from the queue.
+    """
+
+    def __init__(
+        self,
+        sim: "BigScenario",
+        every: int | None = None,
+        maxsize: int = 64,
+        max_bytes: int | None = None,
+    ) -> None:
+        my_uni = sim.my_uni
+        self.sim = sim
+        self.names = [obj.name for obj in my_uni.objects]
+        self.every = my_uni.trace.stride if every is None else every
+        self.finished = False
+        self._n = len(self.names)
+        self._spi = my_uni.spi
+        self.pos = np.array(my_uni.pos[: self._n])
+        self.time = my_uni.time * self._spi
+        self._queue: queue.Queue[tuple[float, np.ndarray] | None] = queue.Queue(maxsize)
+        self._closed = threading.Event()
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        # The frames taken so far, older ones ever sparser
+        if max_bytes is None:
+            max_bytes = sim.SIM_CONSTS.trace_memory or MAX_BYTES
+        self._frames = TracePyramid(self._n, self.every, max_bytes)
+        # The state before the run is the first frame
+        self._queue.put((my_uni.time, self.pos))
+
+    @property
+    def samples(self) -> np.ndarray:
+        """A copy of the positions of the frames kept so far, shape (frames, N, 2)."""
+        return self._frames.data
+
+    @property
+    def times(self) -> np.ndarray:
+        """The simulation time of the frames kept so far, in seconds."""
+        return self._frames.times * self._spi
+
+    def start(self) -> None:
+        """Start the simulation in the background."""
+        # Sent when the time reached is on the stride, like the samples of the trace
+        self.sim.observers.append(
+            Observer(self._send, self.every, offset=self.every - 1)
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Stop the simulation if it is still running, and wait for it."""
+        self._closed.set()
+        # The universe checks this after every iteration
+        self.sim.my_uni.interrupt()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def pull(self, *, block: bool = False) -> bool:
+        """Take the next frame from the queue, if there is one.
+
+        Parameters
+        ----------
+        block : bool
+            Wait for a frame if the simulation has not sent it yet.
+
+        Returns
+        -------
+        bool
+            True if a frame was taken, which is then in `pos` and `time`.
+
+        Raises
+        ------
+        RuntimeError
+            If the simulation failed. The error of the simulation is the cause.
+        """
+        if self.finished:
+            return False
+        try:
+            item = self._queue.get(block=block)
+        except queue.Empty:
+            return False
+        if item is None:
+            self.finished = True
+            if self._error is not None:
+                msg = "The simulation stopped with an error."
+                raise RuntimeError(msg) from self._error
+            return False
+        time, self.pos = item
+        self.time = time * self._spi
+        self._frames.record(time, self.pos)
+        return True
+
+    def _put(self, item: tuple[float, np.ndarray] | None) -> None:
+        """Wait for room in the queue, unless the feed is closed meanwhile."""
+        while True:
+            try:
+                self._queue.put(item, timeout=POLL)
+            except queue.Full:
+                if self._closed.is_set():
+                    raise _Cancelled from None
+            else:
+                return
+
+    def _send(self, _: int) -> None:
+        """Send the current positions, as an observer of the scenario."""
+        if self._closed.is_set():
+            raise _Cancelled
+        my_uni = self.sim.my_uni
+        self._put((my_uni.time, np.array(my_uni.pos[: self._n])))
+
+    def _work(self) -> None:
+        """Run the scenario, and mark the end of the frames."""
+        try:
+            self.sim.run_simulation()
+        except _Cancelled:
+            return
+        except Exception as error:  # noqa: BLE001
+            # Handed to the animation, which raises it in the main thread
+            self._error = error
+        try:
+            self._put(None)
+        except _Cancelled:
+            return
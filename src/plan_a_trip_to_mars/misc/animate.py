@@ -5,45 +5,100 @@ modified to accept input.
 """
 
 from collections.abc import Generator
-from dataclasses import dataclass
 from itertools import cycle
+from typing import TYPE_CHECKING
 
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib import animation
 from matplotlib.collections import PathCollection
+from matplotlib.lines import Line2D
 from matplotlib.text import Text
 
-import plan_a_trip_to_mars.config as cf
-from plan_a_trip_to_mars.universe import Planet, Rocket
+from plan_a_trip_to_mars.config import SimulationConstants
+from plan_a_trip_to_mars.trajectory import Trajectory
 
+if TYPE_CHECKING:
+    from plan_a_trip_to_mars.live import LiveFeed
 
-@dataclass
-class SimulationConstants:
-    """Container for all constants needed during simulation.
+__all__ = ["AnimatedScatter", "LiveScatter", "SimulationConstants", "pick_points"]
 
-    All times are with respect to seconds.
+# The most points each level of detail of the traces is drawn with, however long the run
+MAX_POINTS = 2048
+# The number of samples looked at in one go when picking the points to draw
+CHUNK = 2**16
 
-    Attributes
-    ----------
-    size : float
-        The width and height of the universe.
-    fps : int
-        The number of frames-per-second. Useful to speed up the simulation.
-    total_time : float
-        The total time the simulation should run.
-    time_scale : float
-        Scale the time so that it is presented in a different unit, for example going
-        from seconds to days would be `3600 * 24`.
-    unit : str
-        The time unit, for example year, second, day, etc.
+
+class _Thinned:
+    """The candidate points of one level of detail, of which every `every`-th is kept.
+
+    When more than `budget` points are kept, every other one is dropped and `every` is
+    doubled, so that the points stay evenly spread over the candidates.
     """
 
-    size: float = 3 * cf.AU
-    fps: int = 24
-    total_time: float = 5e4
-    time_scale: float = 1
-    unit: str = ""
+    def __init__(self, budget: int) -> None:
+        self.budget = budget
+        self.every = 1
+        self.kept = np.empty(0, dtype=int)
+        self._seen = 0
+
+    def add(self, candidates: np.ndarray) -> None:
+        """Add the next candidates, in increasing order."""
+        order = self._seen + np.arange(len(candidates))
+        self._seen += len(candidates)
+        self.kept = np.concatenate([self.kept, candidates[order % self.every == 0]])
+        while len(self.kept) > self.budget:
+            self.kept = self.kept[::2]
+            self.every *= 2
+
+
+def pick_points(
+    samples: np.ndarray, times: np.ndarray, pixel: float, budget: int = MAX_POINTS
+) -> np.ndarray:
+    """Pick the samples to draw the traces of a run with.
+
+    A sample is a candidate when an object is in another pixel than in the sample
+    before, so objects that stand still add no points. The candidates are grouped into
+    levels of detail by the time since the sample before, rounded to a power of two,
+    which sets the levels of a `TracePyramid` apart. Each level is thinned to at most
+    `budget` points, so the number of points drawn is bounded however long the run is.
+    The samples are read in chunks, so a trajectory file is never loaded as a whole.
+
+    Parameters
+    ----------
+    samples : np.ndarray
+        The recorded positions of all objects, shape (samples, N, 2).
+    times : np.ndarray
+        The time of each sample.
+    pixel : float
+        The width of a pixel, in meters.
+    budget : int
+        The most points of each level of detail.
+
+    Returns
+    -------
+    np.ndarray
+        The indices of the samples, in increasing order.
+    """
+    levels: dict[int, _Thinned] = {}
+    before: tuple[np.ndarray, np.ndarray] | None = None
+    for start in range(0, len(samples), CHUNK):
+        cells = np.floor(np.asarray(samples[start : start + CHUNK]) / pixel)
+        time = np.asarray(times[start : start + CHUNK], dtype=float)
+        if before is None:
+            # The first sample is always drawn, in the level of the sample after it
+            gap = time[1:2] - time[:1] if len(time) > 1 else np.ones(1)
+            before = (cells[:1] + np.inf, time[:1] - gap)
+        moved = np.any(cells != np.concatenate([before[0], cells[:-1]]), axis=(1, 2))
+        _, level = np.frexp(time - np.concatenate([before[1], time[:-1]]))
+        before = (cells[-1:], time[-1:])
+        idx = np.flatnonzero(moved)
+        for key in np.unique(level[idx]).tolist():
+            picked = start + idx[level[idx] == key]
+            levels.setdefault(key, _Thinned(budget)).add(picked)
+    return np.sort(
+        np.concatenate([np.empty(0, dtype=int)] + [t.kept for t in levels.values()])
+    )
 
 
 class AnimatedScatter:
@@ -51,25 +106,70 @@ class AnimatedScatter:
 
     Parameters
     ----------
-    objs : list[Planet | Rocket]
-        List of Planets and/or Rockets.
+    traces : np.ndarray
+        The recorded positions of all objects, with shape (samples, N, 2), for example
+        `Universe.trace.data`. Each sample is drawn as one frame.
+    names : list[str]
+        The name of each of the N objects.
     simulation_constants : SimulationConstants
+    times : np.ndarray | None
+        The simulation time of each sample, in seconds. Defaults to the sample number.
+    seed : int | None
+        Seed of the random colours of the objects.
     """
 
     def __init__(
         self,
-        objs: list[Planet | Rocket],
+        traces: np.ndarray,
+        names: list[str],
         simulation_constants: SimulationConstants,
+        times: np.ndarray | None = None,
+        seed: int | None = None,
     ) -> None:
+        self._setup(names, simulation_constants, seed)
+        self.samples = traces
+        self.times = np.arange(len(traces)) if times is None else times
+        self.num_pts = cycle(range(len(traces)))
+        self.colors = self._drift(self._rng.random(self.num_objs), len(traces))
+        self._make_figure(save_count=len(traces))
+
+    def _setup(
+        self,
+        names: list[str],
+        simulation_constants: SimulationConstants,
+        seed: int | None,
+    ) -> None:
+        """Set up everything that does not depend on the samples."""
         self.sim_consts = simulation_constants
         self.show_trace = False
-        self.num_objs = len(objs)
-        self.num_pts = cycle(np.arange(len(objs[0].trace)))
-        self.points = objs
-        self.names = [obj.name for obj in self.points]
-        self.prepeare_data()
+        self.max_points = MAX_POINTS
+        self.names = names
+        self.num_objs = len(names)
+        self._rng = np.random.default_rng(seed)
+        self._frame = np.empty((self.num_objs, 4))
+        self._frame[:, 2] = 0.1
         self.stream = self.data_stream()
 
+    def _drift(self, start: np.ndarray, frames: int) -> np.ndarray:
+        """Let the colour of each object drift randomly from frame to frame.
+
+        Parameters
+        ----------
+        start : np.ndarray
+            The colours before the first of the frames, shape (N,).
+        frames : int
+            The number of frames.
+
+        Returns
+        -------
+        np.ndarray
+            The colours of the frames, shape (frames, N).
+        """
+        steps = 0.02 * (self._rng.random((frames, self.num_objs)) - 0.5)
+        return start + np.cumsum(steps, axis=0)
+
+    def _make_figure(self, save_count: int | None) -> None:
+        """Set up the figure, and the animation that plays in it."""
         # Set-up the figure and axes...
         self.fig, self.ax = plt.subplots(figsize=(10, 10))
         self.ax.set_facecolor("k")
@@ -85,24 +185,55 @@ class AnimatedScatter:
             interval=5,
             init_func=self.setup_plot,
             blit=True,
-            save_count=int(self.sim_consts.total_time / self.sim_consts.fps),
+            save_count=save_count,
+            cache_frame_data=save_count is not None,
         )
 
-    def setup_plot(self) -> list[PathCollection | Text]:
+    @classmethod
+    def from_trajectory(
+        cls, trajectory: Trajectory, simulation_constants: SimulationConstants
+    ) -> "AnimatedScatter":
+        """Replay a run that was streamed to a trajectory file.
+
+        The samples are read from the file as they are drawn.
+
+        Parameters
+        ----------
+        trajectory : Trajectory
+            The recorded run, from `Trajectory.open`.
+        simulation_constants : SimulationConstants
+
+        Returns
+        -------
+        AnimatedScatter
+            The animation.
+        """
+        return cls(
+            trajectory.traces,
+            trajectory.names,
+            simulation_constants,
+            times=trajectory.times,
+        )
+
+    def setup_plot(self) -> list[PathCollection | Line2D | Text]:
         """Make the initial drawing of the scatter plot."""
         data, _ = next(self.stream)
         x, y, s, c = data.T
 
-        # Draw all objects as a scatter plot
+        # Draw all objects as a scatter plot. The size of the markers never changes.
         self.scat = self.ax.scatter(
             x, y, c=c, s=0, vmin=0, vmax=1, cmap="jet", edgecolor="w"
         )
-        # Draw their trace
+        self.scat.set_sizes(300 * abs(s) ** 1.5 + 100)
+        # Draw their trace. The lines are given views of the positions picked for the
+        # zoom level, so that nothing is copied as the traces grow.
+        self.lines = (
+            [self.ax.plot(x_, y_)[0] for x_, y_ in zip(x, y, strict=True)]
+            if self.show_trace
+            else []
+        )
         if self.show_trace:
-            self.traces = []
-            for j, (x_, y_) in enumerate(zip(x, y, strict=False)):
-                self.traces.append(np.array([x_, y_]))
-                setattr(self, f"line_{j}", self.ax.plot(x_, y_)[0])
+            self._prepare_traces()
         # Add text that display the simulation time
         self.txt = [
             self.ax.text(
@@ -116,8 +247,8 @@ class AnimatedScatter:
         ]
         # Add text that show the name of each object
         self.txt.extend(
-            self.ax.text(x[j], y[j], "", va="bottom", ha="center", c="w")
-            for j, _ in enumerate(self.names)
+            self.ax.text(x[j], y[j], n, va="bottom", ha="center", c="w")
+            for j, n in enumerate(self.names)
         )
         # Define simulation area
         self.ax.axis(
@@ -130,71 +261,244 @@ class AnimatedScatter:
         )
 
         # For FuncAnimation's sake, we need to return the artist we'll be using
-        # Note that it expects a sequence of artists, thus the trailing comma.
-        returns = [self.scat]
-        if self.show_trace:
-            returns.extend(getattr(self, f"line_{j}") for j in range(len(x)))
-        return [*returns, *self.txt]
+        return [self.scat, *self.lines, *self.txt]
+
+    def frame(self, idx: int) -> np.ndarray:
+        """Get the position, size and colour of every object in a frame.
+
+        The same array is filled in for every frame, so it must be used before the next
+        frame is asked for.
+
+        Parameters
+        ----------
+        idx : int
+            The number of the frame, which is the index of the sample.
+
+        Returns
+        -------
+        np.ndarray
+            The columns x, y, size and colour, shape (N, 4).
+        """
+        self._frame[:, :2] = self.samples[idx]
+        self._frame[:, 3] = self.colors[idx]
+        return self._frame
+
+    def level_of_detail(self) -> np.ndarray:
+        """Pick the samples to draw the traces with, from the zoom level.
+
+        The width of a pixel follows from the size of the universe that is shown, and
+        at most `max_points` samples are drawn for each level of detail. See
+        `pick_points`.
+
+        Returns
+        -------
+        np.ndarray
+            The indices of the samples, in increasing order.
+        """
+        return pick_points(self.samples, self.times, self._pixel(), self.max_points)
+
+    def _pixel(self) -> float:
+        """Give the width of a pixel of the figure, in meters."""
+        return 2 * self.sim_consts.size / (self.fig.get_figwidth() * self.fig.dpi)
+
+    def _prepare_traces(self) -> None:
+        """Pick the positions the traces are drawn with, before the first frame."""
+        self._detail = self.level_of_detail()
+        self._detail_path = self.samples[self._detail]
 
-    def prepeare_data(self) -> None:
-        """Prepare data for the data stream.
+    def trace_path(self, idx: int) -> np.ndarray:
+        """Get the positions to draw the traces with, up to a frame.
 
-        A list is filled with iterator objects, such that calling next on one of them
-        reveal the next point in the trace that should be drawn on screen.
+        Parameters
+        ----------
+        idx : int
+            The number of the frame.
+
+        Returns
+        -------
+        np.ndarray
+            A view of the positions picked by `level_of_detail`, shape (points, N, 2).
         """
-        self.p_list: list[cycle[tuple[float, float]]] = []
-        self.p_list.extend(cycle(obj.trace) for obj in self.points)
+        return self._detail_path[: np.searchsorted(self._detail, idx, side="right")]
 
-    def data_stream(self) -> Generator[tuple[np.ndarray, np.ndarray]]:
+    def data_stream(self) -> Generator[tuple[np.ndarray, int]]:
         """Create the data stream that should be animated."""
-        s, c = np.random.default_rng().random((self.num_objs, 2)).T
         while True:
-            xy = np.array([next(pair) for pair in self.p_list])
-            s = 0.1 * np.ones_like(xy[:, 0])
-            c += 0.02 * (np.random.default_rng().random(self.num_objs) - 0.5)
-            yield np.c_[xy[:, 0], xy[:, 1], s, c], next(self.num_pts)
+            idx = next(self.num_pts)
+            yield self.frame(idx), idx
 
-    def update(self, _: int) -> list[PathCollection | Text]:
+    def update(self, _: int) -> list[PathCollection | Line2D | Text]:
         """Update the scatter plot."""
         data, idx = next(self.stream)
+        return self.draw(data, idx)
+
+    def draw(self, data: np.ndarray, idx: int) -> list[PathCollection | Line2D | Text]:
+        """Move the artists to a frame.
+
+        Parameters
+        ----------
+        data : np.ndarray
+            The frame, from `frame`.
+        idx : int
+            The number of the frame.
+
+        Returns
+        -------
+        list[PathCollection | Line2D | Text]
+            The artists that changed.
+        """
         # Set x and y data ...
         self.scat.set_offsets(data[:, :2])
-        # Set sizes ...
-        self.scat.set_sizes(300 * abs(data[:, 2]) ** 1.5 + 100)
         # Set colours ...
         self.scat.set_array(data[:, 3])
-        # Draw traces ...
-        if self.show_trace:
-            # If we are back to the first time step, re-set the trace list.
-            if idx == 0:
-                self.traces = []
-                self.traces.extend(
-                    np.array([x_, y_])
-                    for x_, y_ in zip(data[:, 0], data[:, 1], strict=False)
-                )
-            # Otherwise, append the new positions to the trace.
-            else:
-                for j, (t, (x_, y_)) in enumerate(
-                    zip(self.traces, data[:, :2], strict=False)
-                ):
-                    self.traces[j] = np.c_[t, np.array([x_, y_])]
-                    line = getattr(self, f"line_{j}")
-                    line.set_data(self.traces[j][0, :], self.traces[j][1, :])
+        # Draw traces, as views of the positions up to the current one ...
+        if self.lines:
+            path = self.trace_path(idx)
+            for j, line in enumerate(self.lines):
+                line.set_data(path[:, j, 0], path[:, j, 1])
         # Set text position and update simulation time ...
-        for txt, x, y, n in zip(
-            self.txt[1:], data[:, 0], data[:, 1], self.names, strict=False
-        ):
-            txt.set_position((x, y))
-            txt.set_text(n)
+        for txt, xy in zip(self.txt[1:], data[:, :2], strict=True):
+            txt.set_position(xy)
         self.txt[0].set_text(
-            f"Time = {int(idx / self.sim_consts.time_scale)}{self.sim_consts.unit}"
+            f"Time = {int(self.times[idx] / self.sim_consts.time_scale)}"
+            f"{self.sim_consts.unit}"
         )
 
-        # We need to return the updated artists for FuncAnimation to draw. Note that it
-        # expects a sequence of artists, so if we only had one artist we would add a
-        # trailing comma:
-        # return [self.scat,]
-        returns = [self.scat]
-        if self.show_trace:
-            returns.extend(getattr(self, f"line_{j}") for j in range(len(self.points)))
-        return [*returns, *self.txt]
+        # We need to return the updated artists for FuncAnimation to draw
+        return [self.scat, *self.lines, *self.txt]
+
+
+class LiveScatter(AnimatedScatter):
+    """An animated scatter plot of a simulation that is still running.
+
+    Every frame of the animation takes the next frame from the feed. When the
+    simulation has not sent it yet, the last one is drawn again. Once the run is done,
+    it is replayed in a loop from the frames the feed kept, like with `AnimatedScatter`.
+
+    While the run goes on, the traces are drawn with at most `max_points` of its frames,
+    picked as they come in like `pick_points` does, so that neither the memory nor the
+    time to draw a frame grows with the length of the run.
+
+    Parameters
+    ----------
+    feed : LiveFeed
+        The frames of the simulation, see `plan_a_trip_to_mars.live`.
+    simulation_constants : SimulationConstants
+    seed : int | None
+        Seed of the random colours of the objects.
+    """
+
+    def __init__(
+        self,
+        feed: "LiveFeed",
+        simulation_constants: SimulationConstants,
+        seed: int | None = None,
+    ) -> None:
+        self.feed = feed
+        self._setup(feed.names, simulation_constants, seed)
+        self._replay = False
+        # The frames the traces are drawn with, then the last frame if it is not one of
+        # them. The buffers are made when the first frame comes in.
+        self.samples = self.times = self.colors = np.empty(0)
+        self._kept = 0
+        self._last = 0
+        # Every `_every`-th frame that moved a pixel is kept, counting with `_moved`
+        self._every = 1
+        self._moved = 0
+        self._cell = np.empty(0)
+        self._make_figure(save_count=None)
+
+    def _prepare_traces(self) -> None:
+        """Pick the positions the traces are drawn with, once the run is replayed."""
+        if self._replay:
+            super()._prepare_traces()
+
+    def trace_path(self, idx: int) -> np.ndarray:
+        """Get the positions to draw the traces with, up to a frame.
+
+        Parameters
+        ----------
+        idx : int
+            The number of the frame.
+
+        Returns
+        -------
+        np.ndarray
+            A view of the positions, shape (points, N, 2).
+        """
+        if self._replay:
+            return super().trace_path(idx)
+        return self.samples[: idx + 1]
+
+    def data_stream(self) -> Generator[tuple[np.ndarray, int]]:
+        """Create the data stream, following the simulation until it is done.
+
+        Yields
+        ------
+        tuple[np.ndarray, int]
+            The frame and its number.
+
+        Raises
+        ------
+        ValueError
+            If the simulation ended without sending a frame.
+        """
+        if not self._pull(block=True):
+            msg = "The simulation ended without sending a frame."
+            raise ValueError(msg)
+        while True:
+            yield self.frame(self._last), self._last
+            if not self._pull() and self.feed.finished:
+                break
+        samples = self.feed.samples
+        if not len(samples):
+            # No frame was on the stride, so there is nothing to replay
+            while True:
+                yield self.frame(self._last), self._last
+        self.samples = samples
+        self.times = self.feed.times
+        self.colors = self._drift(self.colors[0], len(samples))
+        self.num_pts = cycle(range(len(samples)))
+        self._replay = True
+        if self.lines:
+            self._prepare_traces()
+        yield from super().data_stream()
+
+    def _pull(self, *, block: bool = False) -> bool:
+        """Take the next frame from the feed, if there is one, and add it."""
+        if not self.feed.pull(block=block):
+            return False
+        if not len(self.samples):
+            size = self.max_points + 2
+            self.samples = np.empty((size, self.num_objs, 2))
+            self.times = np.empty(size)
+            self.colors = np.empty((size, self.num_objs))
+            color = self._rng.random(self.num_objs)
+        else:
+            color = self._drift(self.colors[self._last], 1)[0]
+        cell = np.floor(self.feed.pos / self._pixel())
+        moved = not np.array_equal(cell, self._cell)
+        self._cell = cell
+        # The frame goes after the kept ones, and is kept itself if it is picked
+        self._add(self._kept, color)
+        if moved:
+            if self._moved % self._every == 0:
+                self._kept += 1
+            self._moved += 1
+        if self._kept > self.max_points:
+            # Keep every other frame, and the last one after them
+            n = (self._kept + 1) // 2
+            self.samples[:n] = self.samples[: self._kept : 2]
+            self.times[:n] = self.times[: self._kept : 2]
+            self.colors[:n] = self.colors[: self._kept : 2]
+            self._kept = n
+            self._every *= 2
+            self._add(n, color)
+        return True
+
+    def _add(self, idx: int, color: np.ndarray) -> None:
+        """Put the frame just taken from the feed at an index, as the last frame."""
+        self.samples[idx] = self.feed.pos
+        self.times[idx] = self.feed.time
+        self.colors[idx] = color
+        self._last = idx
@@ -0,0 +1,312 @@
+"""Save animations by rendering the frames in parallel.
+
+Saving through `FuncAnimation.save` draws every frame, one after the other, in a single
+figure. Here the frames are instead split into short runs that are drawn by a pool of
+processes, each with its own figure and the Agg backend. The finished frames come back
+as raw RGBA images, in order, and are piped straight into ffmpeg (for mp4) or written
+frame by frame with Pillow (for gif), so that no more than a few chunks of frames are
+held in memory at a time.
+
+The workers map the recorded positions from a file, so each reads only the samples it
+draws. A run streamed to a trajectory file is mapped from that file, and any other run
+is written once to a temporary file first.
+"""
+
+import collections
+import contextlib
+import os
+import pathlib
+import subprocess
+import tempfile
+import warnings
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import IO, Any
+
+import numpy as np
+
+from plan_a_trip_to_mars.config import SimulationConstants
+
+# The number of frames each worker draws at a time
+CHUNK = 16
+
+# The animation drawn by a worker process, set up once in each worker
+_worker: dict[str, Any] = {}
+
+# Where a worker maps an array from: the file, the offset, the shape and the dtype
+type _Source = tuple[str, int, tuple[int, ...], str]
+
+
+def save_animation(  # noqa: PLR0913
+    path: str | pathlib.Path,
+    traces: np.ndarray,
+    names: list[str],
+    simulation_constants: SimulationConstants,
+    *,
+    times: np.ndarray | None = None,
+    trace: bool = False,
+    fps: int = 48,
+    workers: int | None = None,
+) -> None:
+    """Draw every sample of a run as one frame, and save them as a video.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Where to save the animation. The suffix decides the format, either `.mp4` or
+        `.gif`.
+    traces : np.ndarray
+        The recorded positions of all objects, shape (samples, N, 2).
+    names : list[str]
+        The name of each object.
+    simulation_constants : SimulationConstants
+    times : np.ndarray | None
+        The simulation time of each sample, in seconds.
+    trace : bool
+        Whether the trace of each object should be drawn.
+    fps : int
+        The frame rate of the saved animation.
+    workers : int | None
+        The number of processes that draw frames. Defaults to the number of CPUs.
+
+    Raises
+    ------
+    ValueError
+        If the format of the file is not supported.
+    """
+    path = pathlib.Path(path)
+    if path.suffix not in {".mp4", ".gif"}:
+        msg = f"Animations can be saved as mp4 or gif, not '{path.suffix}'."
+        raise ValueError(msg)
+    if not len(traces):
+        return
+    workers = workers or os.cpu_count() or 1
+    # One seed for all workers, so that the colours match across frames
+    seed = int(np.random.default_rng().integers(2**32))
+    chunks = [
+        range(i, min(i + CHUNK, len(traces))) for i in range(0, len(traces), CHUNK)
+    ]
+    encoder = _Encoder(path, fps)
+    with tempfile.TemporaryDirectory() as folder:
+        sources = (
+            _share(traces, pathlib.Path(folder) / "traces.npy"),
+            None
+            if times is None
+            else _share(times, pathlib.Path(folder) / "times.npy"),
+        )
+        settings = (sources, names, simulation_constants, seed, trace)
+        # Only a few chunks are in flight at a time, which bounds the memory used by
+        # frames that are drawn but not yet written
+        pending: collections.deque[Future[tuple[tuple[int, int], list[bytes]]]] = (
+            collections.deque()
+        )
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(settings,)
+            ) as pool:
+                for frames in chunks:
+                    pending.append(pool.submit(_render, frames))
+                    if len(pending) > 2 * workers:
+                        _write(pending.popleft(), encoder)
+                while pending:
+                    _write(pending.popleft(), encoder)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            encoder.abort()
+            raise
+    encoder.close()
+
+
+def _share(array: np.ndarray, path: pathlib.Path) -> _Source:
+    """Find a file the workers can map an array from, writing it there if needed."""
+    if isinstance(array, np.memmap) and not isinstance(array.base, np.ndarray):
+        # A whole file mapped as is, not a view of one, such as the samples of a
+        # trajectory file
+        return str(array.filename), array.offset, array.shape, array.dtype.str
+    copy = np.lib.format.open_memmap(path, "w+", np.float64, np.shape(array))
+    copy[:] = array
+    copy.flush()
+    return str(path), copy.offset, copy.shape, copy.dtype.str
+
+
+class _Encoder:
+    """Write raw RGBA frames of a fixed size to a video file.
+
+    The file is only created with the first frame, which sets the size of the video.
+    """
+
+    def __init__(self, path: pathlib.Path, fps: int) -> None:
+        self.path = path
+        self.fps = fps
+        self.size = (0, 0)
+        self._gif: IO[bytes] | None = None
+        self._ffmpeg: subprocess.Popen[bytes] | None = None
+
+    def _open(self, size: tuple[int, int]) -> None:
+        """Start the video file, with frames of the given width and height."""
+        self.size = size
+        path = self.path
+        if path.suffix == ".mp4":
+            import matplotlib as mpl  # noqa: PLC0415
+
+            width, height = size
+            self._ffmpeg = subprocess.Popen(  # noqa: S603
+                [
+                    mpl.rcParams["animation.ffmpeg_path"],
+                    "-y",
+                    "-loglevel",
+                    "error",
+                    "-f",
+                    "rawvideo",
+                    "-pix_fmt",
+                    "rgba",
+                    "-s",
+                    f"{width}x{height}",
+                    "-r",
+                    str(self.fps),
+                    "-i",
+                    "-",
+                    "-vcodec",
+                    "libx264",
+                    "-pix_fmt",
+                    "yuv420p",
+                    str(path),
+                ],
+                stdin=subprocess.PIPE,
+            )
+        else:
+            self._gif = path.open("wb")
+
+    def write(self, frame: bytes, size: tuple[int, int]) -> None:
+        """Add one frame to the end of the video.
+
+        Parameters
+        ----------
+        frame : bytes
+            The RGBA pixels of the frame.
+        size : tuple[int, int]
+            The width and height of the frame, the same for every frame.
+
+        Raises
+        ------
+        RuntimeError
+            If ffmpeg stopped before all frames were written.
+        """
+        if self._ffmpeg is None and self._gif is None:
+            self._open(size)
+        if self._ffmpeg is not None and self._ffmpeg.stdin is not None:
+            try:
+                self._ffmpeg.stdin.write(frame)
+            except BrokenPipeError:
+                self._wait()
+                raise
+        elif self._gif is not None:
+            from PIL import GifImagePlugin, Image  # noqa: PLC0415
+
+            image = (
+                Image.frombuffer("RGBA", self.size, frame)
+                .convert("RGB")
+                .convert("P", palette=Image.Palette.ADAPTIVE)
+            )
+            if not self._gif.tell():
+                header, _ = GifImagePlugin.getheader(image, info={"loop": 0})
+                self._gif.write(b"".join(header))
+            # Each frame has its own palette, like when Pillow saves all frames at once
+            self._gif.writelines(
+                GifImagePlugin.getdata(
+                    image, duration=1000 / self.fps, include_color_table=True
+                )
+            )
+
+    def close(self) -> None:
+        """Finish the video file.
+
+        Raises
+        ------
+        RuntimeError
+            If ffmpeg failed to encode the video.
+        """
+        if self._ffmpeg is not None:
+            self._wait()
+        elif self._gif is not None:
+            # The trailer of the file
+            self._gif.write(b";")
+            self._gif.close()
+
+    def abort(self) -> None:
+        """Stop ffmpeg or close the gif, and leave the video unfinished."""
+        if self._ffmpeg is not None:
+            if self._ffmpeg.stdin is not None:
+                with contextlib.suppress(BrokenPipeError):
+                    self._ffmpeg.stdin.close()
+            self._ffmpeg.kill()
+            self._ffmpeg.wait()
+        elif self._gif is not None:
+            self._gif.close()
+
+    def _wait(self) -> None:
+        """Let ffmpeg finish, and raise if it failed."""
+        assert self._ffmpeg is not None  # noqa: S101
+        if self._ffmpeg.stdin is not None:
+            with contextlib.suppress(BrokenPipeError):
+                self._ffmpeg.stdin.close()
+        code = self._ffmpeg.wait()
+        if code != 0:
+            msg = f"ffmpeg failed to encode '{self.path}', with exit code {code}."
+            raise RuntimeError(msg)
+
+
+def _write(
+    future: Future[tuple[tuple[int, int], list[bytes]]], encoder: _Encoder
+) -> None:
+    """Pass a drawn chunk of frames on to the encoder."""
+    size, frames = future.result()
+    for frame in frames:
+        encoder.write(frame, size)
+
+
+def _init_worker(
+    settings: tuple[
+        tuple[_Source, _Source | None], list[str], SimulationConstants, int, bool
+    ],
+) -> None:
+    """Create the figure a worker process draws its frames in.
+
+    The positions and times are mapped from their files, not loaded.
+    """
+    import matplotlib as mpl  # noqa: PLC0415
+
+    mpl.use("Agg")
+    from plan_a_trip_to_mars.misc.animate import AnimatedScatter  # noqa: PLC0415
+
+    (traces, times), names, simulation_constants, seed, trace = settings
+    # The frames are drawn by hand, so the animation itself never runs
+    warnings.filterwarnings("ignore", "Animation was deleted", UserWarning)
+    anim = AnimatedScatter(
+        _map(traces),
+        names,
+        simulation_constants,
+        None if times is None else _map(times),
+        seed,
+    )
+    anim.show_trace = trace
+    anim.setup_plot()
+    _worker["anim"] = anim
+
+
+def _render(frames: range) -> tuple[tuple[int, int], list[bytes]]:
+    """Draw a run of frames, and give back their size and RGBA pixels."""
+    anim = _worker["anim"]
+    canvas = anim.fig.canvas
+    images = []
+    for idx in frames:
+        anim.draw(anim.frame(idx), idx)
+        canvas.draw()
+        images.append(bytes(canvas.buffer_rgba()))
+    return canvas.get_width_height(physical=True), images
+
+
+def _map(source: _Source) -> np.ndarray:
+    """Map an array read-only from the file it was shared in."""
+    filename, offset, shape, dtype = source
+    return np.memmap(filename, dtype, "r", offset, shape)
@@ -21,10 +21,12 @@ function.
 from __future__ import annotations
 
 from math import cos, hypot, radians, sin
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Self, overload
+
+import numpy as np
 
 if TYPE_CHECKING:
-    from collections.abc import Iterator
+    from collections.abc import Iterable, Iterator
 
 
 class ReturnZeroError(ZeroDivisionError):
@@ -45,6 +47,8 @@ class Vector2D[T]:
     :param y: Second component for the vector.
     """
 
+    __slots__ = ("x", "y")
+
     def __init__(self, x: float, y: float) -> None:
         self.x = x
         self.y = y
@@ -80,14 +84,33 @@ class Vector2D[T]:
         """
         return Vector2D(self.x - b.x, self.y - b.y)
 
+    def __iadd__(self, b: Vector2D) -> Self:
+        """In-place vector addition.
+
+        :returns: This vector, after adding b to it.
+        """
+        self.x += b.x
+        self.y += b.y
+        return self
+
+    def __isub__(self, b: Vector2D) -> Self:
+        """In-place vector subtraction.
+
+        :returns: This vector, after subtracting b from it.
+        """
+        self.x -= b.x
+        self.y -= b.y
+        return self
+
     def __eq__(self, other: object) -> bool:
         """Vector equality.
 
         :returns: True if both components of this vector are equal to those of b.
         """
-        if hasattr(other, "x") and hasattr(other, "y"):
+        if isinstance(other, Vector2D):
             return self.x == other.x and self.y == other.y
-        return False
+        # Lets a Vector2DArray compare itself with this vector
+        return NotImplemented
 
     def __mul__(self, b: float) -> Vector2D:
         """Vector multiplication by a scalar.
@@ -101,6 +124,16 @@ class Vector2D[T]:
             msg = f"Right value must be castable to float, was {b}"
             raise ValueError(msg) from e
 
+    def __imul__(self, b: float) -> Self:
+        """In-place vector multiplication by a scalar.
+
+        :param: Any value that can be coerced into a float.
+        :returns: This vector, after scaling it by b.
+        """
+        self.x *= b
+        self.y *= b
+        return self
+
     def __truediv__(self, b: float) -> Vector2D:
         """Vector division by a scalar.
 
@@ -113,12 +146,23 @@ class Vector2D[T]:
             msg = f"Right value must be castable to float, was {b}"
             raise ValueError(msg) from e
 
+    def __itruediv__(self, b: float) -> Self:
+        """In-place vector division by a scalar.
+
+        :param: Any value that can be coerced into a float.
+        :returns: This vector, after dividing it by b.
+        """
+        self.x /= b
+        self.y /= b
+        return self
+
     def __iter__(self) -> Iterator:
         """Return a generator function used to iterate over components of vector.
 
         :returns: Iterator over components.
         """
-        yield from self.__dict__.values()
+        yield self.x
+        yield self.y
 
     def __rmul__(self, b: float) -> Vector2D:
         """Vector multiplication."""
@@ -160,13 +204,213 @@ class Vector2D[T]:
         """
         return round(self.x), round(self.y)
 
-    def rotate(self, theta: float) -> Vector2D:
+    def rotate(self, theta: float, ndigits: int | None = None) -> Vector2D:
         """Vector rotation.
 
         :param theta: The angle of rotation in degrees.
+        :param ndigits: If given, the components are rounded to this many decimals.
         :returns: A new vector which is the same length, but rotated by theta.
         """
         cos_theta, sin_theta = cos(radians(theta)), sin(radians(theta))
-        newx = round(self.x * cos_theta - self.y * sin_theta, 6)
-        newy = round(self.x * sin_theta + self.y * cos_theta, 6)
+        newx = self.x * cos_theta - self.y * sin_theta
+        newy = self.x * sin_theta + self.y * cos_theta
+        if ndigits is not None:
+            newx, newy = round(newx, ndigits), round(newy, ndigits)
         return Vector2D(newx, newy)
+
+
+class Vector2DArray:  # noqa: PLW1641
+    """Implements many two dimensional vectors, stored in one NumPy array.
+
+    The operators and methods are the same as for `Vector2D`, but work on every vector
+    at once. Scalars may be given as a single number, or as an array with one number
+    per vector.
+
+    :param data: The vectors, as anything that can be made into an array of shape
+        (n, 2). The array is used as is when it already has that shape and a float
+        type, so that in-place operators write through to it.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Iterable | np.ndarray) -> None:
+        self.data = np.asarray(data, dtype=float).reshape(-1, 2)
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable[Vector2D]) -> Vector2DArray:
+        """Gather single vectors into one array.
+
+        :param vectors: The vectors.
+        :returns: A new array of the vectors.
+        """
+        return cls([(v.x, v.y) for v in vectors])
+
+    @property
+    def x(self) -> np.ndarray:
+        """The first component of every vector, as a view."""
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """The second component of every vector, as a view."""
+        return self.data[:, 1]
+
+    def __repr__(self) -> str:
+        """Representation of the class when printed."""
+        return f"Vector2DArray({self.data.tolist()})"
+
+    def __len__(self) -> int:
+        """Return the number of vectors."""
+        return len(self.data)
+
+    @overload
+    def __getitem__(self, index: int) -> Vector2D: ...
+
+    @overload
+    def __getitem__(self, index: slice | np.ndarray) -> Vector2DArray: ...
+
+    def __getitem__(self, index: int | slice | np.ndarray) -> Vector2D | Vector2DArray:
+        """Get one vector as a `Vector2D`, or several as a new array."""
+        if isinstance(index, int | np.integer):
+            return Vector2D(*self.data[index].tolist())
+        return Vector2DArray(self.data[index])
+
+    def __iter__(self) -> Iterator[Vector2D]:
+        """Iterate over the vectors, each as a `Vector2D`.
+
+        :returns: Iterator over the vectors.
+        """
+        for x, y in self.data.tolist():
+            yield Vector2D(x, y)
+
+    def __eq__(self, other: object) -> bool:
+        """Vector equality.
+
+        :returns: True if every vector is equal to the one at the same place in other.
+        """
+        if isinstance(other, Vector2DArray | Vector2D):
+            return bool(np.all(self.data == _components(other)))
+        return NotImplemented
+
+    def __add__(self, b: Vector2DArray | Vector2D) -> Vector2DArray:
+        """Vector addition, of one vector or one vector each.
+
+        :returns: New array where each vector is added to b.
+        """
+        return Vector2DArray(self.data + _components(b))
+
+    def __sub__(self, b: Vector2DArray | Vector2D) -> Vector2DArray:
+        """Vector subtraction, of one vector or one vector each.
+
+        :returns: New array where b is subtracted from each vector.
+        """
+        return Vector2DArray(self.data - _components(b))
+
+    def __iadd__(self, b: Vector2DArray | Vector2D) -> Self:
+        """In-place vector addition.
+
+        :returns: This array, after adding b to it.
+        """
+        self.data += _components(b)
+        return self
+
+    def __isub__(self, b: Vector2DArray | Vector2D) -> Self:
+        """In-place vector subtraction.
+
+        :returns: This array, after subtracting b from it.
+        """
+        self.data -= _components(b)
+        return self
+
+    def __mul__(self, b: float | np.ndarray) -> Vector2DArray:
+        """Vector multiplication by a scalar, or by one scalar each.
+
+        :returns: New array where each vector is scaled by b.
+        """
+        return Vector2DArray(self.data * _scalars(b))
+
+    __rmul__ = __mul__
+
+    def __imul__(self, b: float | np.ndarray) -> Self:
+        """In-place vector multiplication by a scalar, or by one scalar each.
+
+        :returns: This array, after scaling it by b.
+        """
+        self.data *= _scalars(b)
+        return self
+
+    def __truediv__(self, b: float | np.ndarray) -> Vector2DArray:
+        """Vector division by a scalar, or by one scalar each.
+
+        :returns: New array where each vector is divided by b.
+        """
+        return Vector2DArray(self.data / _scalars(b))
+
+    def __itruediv__(self, b: float | np.ndarray) -> Self:
+        """In-place vector division by a scalar, or by one scalar each.
+
+        :returns: This array, after dividing it by b.
+        """
+        self.data /= _scalars(b)
+        return self
+
+    def __abs__(self) -> np.ndarray:
+        """Return the magnitude of every vector."""
+        return np.hypot(self.data[:, 0], self.data[:, 1])
+
+    def normalized(self) -> Vector2DArray:
+        """Return new vectors with the same directions but magnitude 1.
+
+        :returns: A new array of unit vectors with the same directions as self.
+        Throws ZeroDivisionError if any of the vectors is a zero vector.
+        """
+        m = abs(self)
+        if np.any(m == 0):
+            msg = "Attempted to normalize a zero vector, return a unit vector at zero degrees"
+            raise ReturnZeroError(msg)
+        return self / m
+
+    def copy(self) -> Vector2DArray:
+        """Return a copy of the vectors.
+
+        :returns: A new array identical to self.
+        """
+        return Vector2DArray(self.data.copy())
+
+    @property
+    def as_point(self) -> np.ndarray:
+        """The vectors rounded to integers, with shape (n, 2).
+
+        :returns: An array of the rounded components.
+        """
+        return np.round(self.data).astype(int)
+
+    def rotate(
+        self, theta: float | np.ndarray, ndigits: int | None = None
+    ) -> Vector2DArray:
+        """Vector rotation, by one angle or by one angle each.
+
+        :param theta: The angle of rotation in degrees.
+        :param ndigits: If given, the components are rounded to this many decimals.
+        :returns: A new array of vectors of the same lengths, but rotated by theta.
+        """
+        theta = np.radians(theta)
+        cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+        new = np.empty_like(self.data)
+        new[:, 0] = self.x * cos_theta - self.y * sin_theta
+        new[:, 1] = self.x * sin_theta + self.y * cos_theta
+        if ndigits is not None:
+            new = np.round(new, ndigits)
+        return Vector2DArray(new)
+
+
+def _components(b: Vector2DArray | Vector2D) -> np.ndarray:
+    """Get the components of one vector or many, ready to broadcast against (n, 2)."""
+    if isinstance(b, Vector2DArray):
+        return b.data
+    return np.array((b.x, b.y))
+
+
+def _scalars(b: float | np.ndarray) -> float | np.ndarray:
+    """Make one scalar per vector broadcast against (n, 2)."""
+    return b[:, np.newaxis] if isinstance(b, np.ndarray) and b.ndim == 1 else b
@@ -0,0 +1,208 @@
+"""Measure where the time of a simulation goes.
+
+Profiling is turned on for a single universe with `Universe.enable_profiling`, or for a
+whole run with `BigScenario.run_simulation(profile=True)`. The methods of the hot path
+are then replaced, on that instance only, by wrappers that time and count each call.
+When profiling is off, the class methods are called directly, so it costs nothing.
+
+The phases that are timed are
+
+- `force`: computing the gravitational pull, in the gravity solver.
+- `integrate`: moving the objects, apart from the time spent in `force`.
+- `kicks`: giving kicks to rockets.
+- `trace`: recording positions.
+- `user`: the observers and the `do_at_each_time_step` of the scenario.
+"""
+
+import contextlib
+import functools
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+
+PHASES = ("force", "integrate", "kicks", "trace", "user")
+
+
+@dataclass
+class SimulationStats:
+    """Container for the timers and counters of a profiled run.
+
+    Attributes
+    ----------
+    timers : dict[str, float]
+        The time spent in each phase, in seconds. The `integrate` timer includes the
+        time of the force evaluations made by the integrator.
+    force_evaluations : int
+        The number of times the gravitational pull was computed.
+    events_fired : int
+        The number of kicks given.
+    iterations : int
+        The number of iterations simulated while profiling.
+    steps : int
+        The number of integration steps taken while profiling.
+    trace_bytes : int
+        The memory allocated for the trace, in bytes.
+    wall_time : float
+        The total time of the profiled run, in seconds.
+    """
+
+    timers: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    force_evaluations: int = 0
+    events_fired: int = 0
+    iterations: int = 0
+    steps: int = 0
+    trace_bytes: int = 0
+    wall_time: float = 0.0
+
+    @property
+    def phases(self) -> dict[str, float]:
+        """The time spent in each phase, with `force` taken out of `integrate`.
+
+        Everything that was not timed is given as `other`.
+        """
+        phases = dict(self.timers)
+        phases["integrate"] -= phases["force"]
+        phases["other"] = max(0.0, self.wall_time - sum(phases.values()))
+        return phases
+
+    @property
+    def steps_per_second(self) -> float:
+        """The number of iterations simulated per second."""
+        return self.iterations / self.wall_time if self.wall_time else float("inf")
+
+    def summary(self) -> str:
+        """Describe the stats as a small table.
+
+        Returns
+        -------
+        str
+            One line per phase, followed by the counters.
+        """
+        total = self.wall_time or 1.0
+        lines = [
+            f"{name:<10} {seconds:10.4f} s {seconds / total:7.1%}"
+            for name, seconds in self.phases.items()
+        ]
+        lines.append(
+            f"{self.iterations} iterations ({self.steps} steps) in "
+            f"{self.wall_time:.3f} s, {self.steps_per_second:.0f} iterations/s"
+        )
+        lines.append(
+            f"{self.force_evaluations} force evaluations, "
+            f"{self.events_fired} kicks, {self.trace_bytes} trace bytes"
+        )
+        return "\n".join(lines)
+
+
+def timed(
+    func: Callable[..., object],
+    stats: SimulationStats,
+    phase: str,
+    counter: str | None = None,
+) -> Callable[..., object]:
+    """Wrap a function so that the time of every call is added to a phase.
+
+    Parameters
+    ----------
+    func : Callable[..., object]
+        The function, usually a bound method.
+    stats : SimulationStats
+        Where to add the time.
+    phase : str
+        The name of the timer.
+    counter : str | None
+        The name of a counter of `stats` to count the calls in.
+
+    Returns
+    -------
+    Callable[..., object]
+        The wrapped function.
+    """
+    clock = time.perf_counter
+    timers = stats.timers
+
+    @functools.wraps(func)
+    def wrapper(*args: object, **kwargs: object) -> object:
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timers[phase] += clock() - start
+            if counter is not None:
+                setattr(stats, counter, getattr(stats, counter) + 1)
+
+    return wrapper
+
+
+def instrument(
+    obj: object, stats: SimulationStats, **methods: str | tuple[str, str]
+) -> None:
+    """Replace methods of one instance with timed wrappers.
+
+    Parameters
+    ----------
+    obj : object
+        The instance.
+    stats : SimulationStats
+        Where to add the time.
+    **methods : str | tuple[str, str]
+        The phase of each method to wrap, or a tuple of the phase and a counter.
+    """
+    for name, phase in methods.items():
+        phase_name, counter = phase if isinstance(phase, tuple) else (phase, None)
+        setattr(obj, name, timed(getattr(obj, name), stats, phase_name, counter))
+
+
+def uninstrument(obj: object, *names: str) -> None:
+    """Remove the timed wrappers from an instance, so that the class methods are used.
+
+    Parameters
+    ----------
+    obj : object
+        The instance.
+    *names : str
+        The names of the wrapped methods.
+    """
+    for name in names:
+        vars(obj).pop(name, None)
+
+
+@contextlib.contextmanager
+def progress_bar(total: int, description: str) -> Iterator[Callable[[int], None]]:
+    """Show a Rich progress bar with the speed and the time left of a run.
+
+    Parameters
+    ----------
+    total : int
+        The number of iterations of the run.
+    description : str
+        The text in front of the bar.
+
+    Yields
+    ------
+    Callable[[int], None]
+        A function that sets the number of iterations done so far.
+    """
+    from rich.progress import (  # noqa: PLC0415
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        TextColumn,
+        TimeRemainingColumn,
+    )
+
+    with Progress(
+        TextColumn("{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("{task.fields[speed]:>10.0f} steps/s"),
+        TimeRemainingColumn(),
+    ) as progress:
+        task = progress.add_task(description, total=total, speed=0.0)
+
+        def update(completed: int) -> None:
+            speed = progress.tasks[0].speed or 0.0
+            progress.update(task, completed=completed, speed=speed)
+
+        yield update
+        update(total)
@@ -0,0 +1,141 @@
+"""Find the scenarios that can be run by their name, without importing them.
+
+The built-in scenarios live in `plan_a_trip_to_mars.scenarios`. Other packages can add
+their own through the entry point group `plan_a_trip_to_mars.scenarios`, for example
+with this in their `pyproject.toml`::
+
+    [project.entry-points."plan_a_trip_to_mars.scenarios"]
+    Voyager = "my_package.scenarios:Voyager"
+
+Listing the scenarios only reads names: the built-in ones are found by parsing the
+source of `plan_a_trip_to_mars.scenarios`, so that a class added there shows up in the
+menu without being registered anywhere. A scenario is imported when it is loaded, and
+instantiated by the caller when it is run, so that the menu and the command line start
+quickly.
+"""
+
+import ast
+import functools
+import importlib
+import importlib.util
+import pathlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from plan_a_trip_to_mars import scenarios
+
+GROUP = "plan_a_trip_to_mars.scenarios"
+MODULE = "plan_a_trip_to_mars.scenarios"
+
+
+@dataclass(frozen=True)
+class Entry:
+    """Container for a scenario that has not been imported yet.
+
+    Attributes
+    ----------
+    name : str
+        The name the scenario is selected by.
+    target : str
+        Where the class is, as "module:attribute".
+    """
+
+    name: str
+    target: str
+
+    def load(self) -> type["scenarios.BigScenario"]:
+        """Import the scenario class.
+
+        Returns
+        -------
+        type[scenarios.BigScenario]
+            The scenario class.
+
+        Raises
+        ------
+        ValueError
+            If the target is not a concrete scenario class.
+        """
+        import inspect  # noqa: PLC0415
+
+        from plan_a_trip_to_mars import scenarios  # noqa: PLC0415
+
+        module, _, attribute = self.target.partition(":")
+        cls = getattr(importlib.import_module(module), attribute, None)
+        if (
+            not inspect.isclass(cls)
+            or not issubclass(cls, scenarios.BigScenario)
+            or inspect.isabstract(cls)
+        ):
+            msg = f"'{self.target}' of the scenario '{self.name}' is not a scenario."
+            raise ValueError(msg)
+        return cls
+
+
+def builtin() -> list[str]:
+    """Find the names of the scenario classes in `plan_a_trip_to_mars.scenarios`.
+
+    The module is parsed, not imported. A class counts if it inherits from
+    `BigScenario`, directly or through another scenario of the module.
+
+    Returns
+    -------
+    list[str]
+        The names, in the order the classes are defined.
+    """
+    spec = importlib.util.find_spec(MODULE)
+    if spec is None or spec.origin is None:
+        return []
+    tree = ast.parse(pathlib.Path(spec.origin).read_text(encoding="utf-8"))
+    found = ["BigScenario"]
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and any(
+            isinstance(b, ast.Name) and b.id in found for b in node.bases
+        ):
+            found.append(node.name)
+    return found[1:]
+
+
+@functools.cache
+def available() -> dict[str, Entry]:
+    """List the scenarios, the built-in ones first.
+
+    A third-party scenario with the same name as a built-in one is ignored.
+
+    Returns
+    -------
+    dict[str, Entry]
+        The scenarios by name.
+    """
+    from importlib.metadata import entry_points  # noqa: PLC0415
+
+    found = {n: Entry(n, f"{MODULE}:{n}") for n in builtin()}
+    for ep in entry_points(group=GROUP):
+        found.setdefault(ep.name, Entry(ep.name, ep.value))
+    return found
+
+
+def load(name: str) -> type["scenarios.BigScenario"]:
+    """Find a scenario class by its name.
+
+    Parameters
+    ----------
+    name : str
+        The name of the scenario, for example "Mayhem".
+
+    Returns
+    -------
+    type[scenarios.BigScenario]
+        The scenario class.
+
+    Raises
+    ------
+    ValueError
+        If there is no scenario with the given name.
+    """
+    entry = available().get(name)
+    if entry is None:
+        msg = f"There is no scenario named '{name}'."
+        raise ValueError(msg)
+    return entry.load()
@@ -1,29 +1,34 @@
 """Scenarios to run in the simulation class."""
 
+import contextlib
+import dataclasses
 import pathlib
 from abc import ABC, abstractmethod
-
-import matplotlib.pyplot as plt
-from rich.console import Console
+from collections.abc import Callable
+from typing import TYPE_CHECKING
 
 import plan_a_trip_to_mars.config as cf
-import plan_a_trip_to_mars.misc.animate as ani
 import plan_a_trip_to_mars.misc.precode2 as pre
+import plan_a_trip_to_mars.profiling as prof
 import plan_a_trip_to_mars.universe as uni
+from plan_a_trip_to_mars.events import Due, Observer, first_due
+from plan_a_trip_to_mars.trajectory import TrajectoryWriter
 
-console = Console()
+if TYPE_CHECKING:
+    import plan_a_trip_to_mars.misc.animate as ani
 
 
 class BigScenario(ABC):
     """Abstract base class to create simulation scenarios."""
 
-    SIM_CONSTS = ani.SimulationConstants(
+    SIM_CONSTS = cf.SimulationConstants(
         size=3 * cf.AU, fps=24, total_time=5e4, time_scale=1, unit=""
     )
 
     def setup(self) -> None:
         """Set up the simulation scenario."""
         self.my_uni = uni.Universe()
+        self.observers: list[Observer] = []
         self.create_complete_universe()
         self._finally()
 
@@ -44,13 +49,188 @@ class BigScenario(ABC):
 
     def _finally(self) -> None:
         """Lock the universe for further changes."""
+        self.my_uni.set_trace_stride(
+            self.SIM_CONSTS.trace_stride or 1,
+            self.SIM_CONSTS.total_time,
+            self.SIM_CONSTS.trace_memory,
+        )
         self.my_uni.ready()
 
-    def run_simulation(self) -> None:
-        """Start running the simulation."""
-        for time in range(int(self.SIM_CONSTS.total_time)):
-            self.my_uni.move(time)
-            self.do_at_each_time_step(time)
+    def observe(
+        self,
+        callback: Callable[[int], None],
+        *,
+        stride: int | None = None,
+        interval: float | None = None,
+    ) -> None:
+        """Call a function every so often while the simulation runs.
+
+        Between two calls, the universe moves without calling back into Python, so a
+        callback that is only needed every n-th iteration should be registered here
+        instead of checking the time in `do_at_each_time_step`. Observers are usually
+        registered in `create_complete_universe`.
+
+        Parameters
+        ----------
+        callback : Callable[[int], None]
+            The function, called with the time step that was just simulated, like
+            `do_at_each_time_step`.
+        stride : int | None
+            Call it at every `stride`-th time step, starting with the first.
+        interval : float | None
+            Call it once every `interval` seconds of simulation time, rounded to whole
+            time steps.
+
+        Raises
+        ------
+        ValueError
+            If not exactly one of `stride` and `interval` is given.
+        """
+        if (stride is None) == (interval is None):
+            msg = "Give either a stride or an interval for the observer."
+            raise ValueError(msg)
+        self.observers.append(Observer(callback, stride, interval))
+
+    def run_simulation(
+        self,
+        out: pathlib.Path | None = None,
+        *,
+        profile: bool = False,
+        progress: bool = False,
+        checkpoint: pathlib.Path | None = None,
+        checkpoint_every: int = 10_000,
+    ) -> None:
+        """Start running the simulation.
+
+        The universe is moved in one go up to the next time step where an observer,
+        `do_at_each_time_step` if it is implemented, the progress bar or a checkpoint is
+        due. A universe that was resumed from a checkpoint with
+        `self.my_uni.load_checkpoint` carries on from the time of the checkpoint.
+        The run ends early when a terminal condition added with
+        `self.my_uni.add_condition` is met.
+
+        Parameters
+        ----------
+        out : pathlib.Path | None
+            If given, the trace is streamed to this trajectory file in chunks while the
+            simulation runs, instead of being kept in memory. It can be read back with
+            `plan_a_trip_to_mars.trajectory.Trajectory.open`. When resuming, the file
+            written before the checkpoint is appended to.
+        profile : bool
+            If True, the time spent in each part of the simulation is measured, and
+            left in `self.my_uni.stats`. See `plan_a_trip_to_mars.profiling`.
+        progress : bool
+            If True, a progress bar with the speed and the time left is shown.
+        checkpoint : pathlib.Path | None
+            If given, the state of the universe is saved to this file every
+            `checkpoint_every` iterations, and at the end of the run. Only the universe
+            is saved, so any state kept on the scenario itself must be rebuilt by
+            the observers.
+        checkpoint_every : int
+            The number of iterations between two checkpoints.
+        """
+        observers = list(self.observers)
+        if type(self).do_at_each_time_step is not BigScenario.do_at_each_time_step:
+            observers.insert(0, Observer(self.do_at_each_time_step, stride=1))
+        if profile:
+            stats = self.my_uni.enable_profiling()
+            observers = [
+                dataclasses.replace(o, callback=prof.timed(o.callback, stats, "user"))
+                for o in observers
+            ]
+        save = (checkpoint, checkpoint_every) if checkpoint is not None else None
+        try:
+            if out is None:
+                self._run_loop(observers, progress=progress, save=save)
+            else:
+                self._run_streamed(out, observers, progress=progress, save=save)
+        finally:
+            if profile:
+                self.my_uni.disable_profiling()
+
+    def _run_streamed(
+        self,
+        out: pathlib.Path,
+        observers: list[Observer],
+        *,
+        progress: bool,
+        save: tuple[pathlib.Path, int] | None,
+    ) -> None:
+        """Run the simulation while writing the trace to a trajectory file."""
+        my_uni = self.my_uni
+        if my_uni.trace.size:
+            # Resumed from a checkpoint, so keep what was written up to it
+            writer = TrajectoryWriter.append(out, my_uni.trace.written)
+        else:
+            writer = TrajectoryWriter(
+                out,
+                [obj.name for obj in my_uni.objects],
+                my_uni.mass,
+                my_uni.spi,
+                my_uni.trace.stride,
+            )
+        with writer:
+            my_uni.trace.stream_to(writer)
+            try:
+                self._run_loop(observers, progress=progress, save=save)
+            finally:
+                my_uni.trace.flush()
+
+    def _run_loop(
+        self,
+        observers: list[Observer],
+        *,
+        progress: bool = False,
+        save: tuple[pathlib.Path, int] | None = None,
+    ) -> None:
+        """Move the universe through every time step of the simulation."""
+        my_uni = self.my_uni
+        start = int(my_uni.time)
+        total = int(self.SIM_CONSTS.total_time)
+        schedule = [
+            Due(
+                first_due(start, o.every(my_uni.spi), o.offset),
+                o.every(my_uni.spi),
+                o.callback,
+            )
+            for o in observers
+        ]
+        with (
+            prof.progress_bar(total, type(self).__name__)
+            if progress
+            else contextlib.nullcontext()
+        ) as update:
+            if update is not None:
+                # Only update the progress bar a thousand times, to keep its cost down
+                every = max(1, total // 1000)
+                schedule.append(
+                    Due(first_due(start, every), every, lambda t: update(t + 1))
+                )
+            if save is not None:
+                path, every = save
+                schedule.append(
+                    Due(
+                        first_due(start, every, every - 1),
+                        every,
+                        lambda _: my_uni.save_checkpoint(path),
+                    )
+                )
+            time = start
+            while time < total:
+                due = min(min((e.step for e in schedule), default=total), total - 1)
+                my_uni.step_many(due + 1 - time)
+                if my_uni.time < due + 1:
+                    # Stopped early by a terminal condition, or interrupted
+                    break
+                for entry in schedule:
+                    if entry.step == due:
+                        entry.callback(due)
+                        entry.step += entry.every
+                if my_uni.stopped is not None:
+                    break
+                time = due + 1
+        if save is not None:
+            my_uni.save_checkpoint(save[0])
 
     def do_at_each_time_step(self, time: int) -> None:  # noqa: B027
         """Any logic that should be done every time step of the simulation.
@@ -59,34 +239,127 @@ class BigScenario(ABC):
         that cannot be determined before the simulation is done goes here. For example,
         if you try to answer a question using your simulation, the checks needed to
         obtain the answer from the simulation must be implemented here.
+
+        Calling back into Python at every time step is slow. If the logic is only needed
+        every so often, register it with `observe` instead.
         """
 
-    def play_animation(self, save: tuple[bool, str], *, trace: bool) -> None:
-        """Re-create the simulation by animating the trace of the objects."""
-        # Now that the for loop is finished, the whole simulation is also finished. But
-        # instead of animating every step, let us speed things up by keeping only every
-        # n-th item from the trace lists.
-        n = self.SIM_CONSTS.fps
-        for obj in self.my_uni.objects:
-            obj.trace = obj.trace[0::n]
+    def create_animation(self, *, trace: bool) -> "ani.AnimatedScatter":
+        """Create an animation of the trace of the objects.
+
+        Matplotlib is only imported here, so that scenarios can be simulated without it.
+
+        Parameters
+        ----------
+        trace : bool
+            Whether the trace of each object should be drawn.
+
+        Returns
+        -------
+        ani.AnimatedScatter
+            The animation, ready to be shown or saved.
+        """
+        import plan_a_trip_to_mars.misc.animate as ani  # noqa: PLC0415
+
+        # Now that the for loop is finished, the whole simulation is also finished. Only
+        # every n-th position was recorded, where n is the trace stride, so that the
+        # animation does not have to draw every step.
+        recorder = self.my_uni.trace
         a = ani.AnimatedScatter(
-            self.my_uni.objects,
+            recorder.data,
+            [obj.name for obj in self.my_uni.objects],
             self.SIM_CONSTS,
+            times=recorder.times * self.my_uni.spi,
         )
         a.show_trace = trace
+        return a
+
+    def play_animation(self, save: tuple[bool, str], *, trace: bool) -> None:
+        """Re-create the simulation by animating the trace of the objects."""
+        import matplotlib.pyplot as plt  # noqa: PLC0415
+
+        # Keep a reference, or the animation is garbage collected before it is shown
+        self._animation = self.create_animation(trace=trace)
         if save[0]:
-            name = f"animation.{save[1]}"
-            with console.status(f"[bold yellow]Saving as {name}...", spinner="point"):
-                data_path = pathlib.Path("data")
-                data_path.mkdir(parents=True, exist_ok=True)
-                a.ani.save(data_path / name, fps=48)
+            self._save_to_data(save[1], trace=trace)
         plt.show()
 
+    def play_live(
+        self, save: tuple[bool, str], *, trace: bool, every: int | None = None
+    ) -> None:
+        """Run the simulation while it is animated, instead of before.
+
+        The simulation runs in a background thread and the animation follows it, see
+        `plan_a_trip_to_mars.live`. Closing the window stops the simulation. The run is
+        saved afterwards, as far as it got.
+
+        Parameters
+        ----------
+        save : tuple[bool, str]
+            Whether to save the animation, and the format to save it in.
+        trace : bool
+            Whether the trace of each object should be drawn.
+        every : int | None
+            The number of iterations between two frames. Defaults to the trace stride.
+        """
+        import matplotlib.pyplot as plt  # noqa: PLC0415
+
+        import plan_a_trip_to_mars.misc.animate as ani  # noqa: PLC0415
+        from plan_a_trip_to_mars import live  # noqa: PLC0415
+
+        feed = live.LiveFeed(self, every)
+        self._animation = ani.LiveScatter(feed, self.SIM_CONSTS)
+        self._animation.show_trace = trace
+        feed.start()
+        try:
+            plt.show()
+        finally:
+            feed.close()
+        if save[0]:
+            self._save_to_data(save[1], trace=trace)
+
+    def _save_to_data(self, fmt: str, *, trace: bool) -> None:
+        """Save the animation in the `data` folder, with a spinner while it saves."""
+        from rich.console import Console  # noqa: PLC0415
+
+        name = f"animation.{fmt}"
+        with Console().status(f"[bold yellow]Saving as {name}...", spinner="point"):
+            data_path = pathlib.Path("data")
+            data_path.mkdir(parents=True, exist_ok=True)
+            self.save_animation(data_path / name, trace=trace)
+
+    def save_animation(
+        self, path: pathlib.Path, *, trace: bool, workers: int | None = None
+    ) -> None:
+        """Save the animation as mp4 or gif, drawing the frames in parallel.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Where to save the animation.
+        trace : bool
+            Whether the trace of each object should be drawn.
+        workers : int | None
+            The number of processes that draw frames. Defaults to the number of CPUs.
+        """
+        from plan_a_trip_to_mars.misc import export  # noqa: PLC0415
+
+        recorder = self.my_uni.trace
+        export.save_animation(
+            path,
+            recorder.data,
+            [obj.name for obj in self.my_uni.objects],
+            self.SIM_CONSTS,
+            times=recorder.times * self.my_uni.spi,
+            trace=trace,
+            workers=workers,
+        )
+
 
 class Simpel(BigScenario):
     """Simulation demonstrating a simple universe with two objects."""
 
-    SIM_CONSTS = ani.SimulationConstants(
+    SIM_CONSTS = cf.SimulationConstants(
         size=3e3, total_time=50 * 60 * 24, time_scale=60, unit=" mins"
     )
 
@@ -104,7 +377,7 @@ class Simpel(BigScenario):
 class Mayhem(BigScenario):
     """Simulation demonstrating many objects and how they perturb each other."""
 
-    SIM_CONSTS = ani.SimulationConstants(size=5 * cf.AU, total_time=3e4)
+    SIM_CONSTS = cf.SimulationConstants(size=5 * cf.AU, total_time=3e4)
 
     def create_complete_universe(self) -> None:
         """Absolute mayhem."""
@@ -146,7 +419,7 @@ class Mayhem(BigScenario):
 class Jerk(BigScenario):
     """Simulation demonstrating an object that gets a lot of kicks."""
 
-    SIM_CONSTS = ani.SimulationConstants(total_time=1e3, size=5e3, fps=1)
+    SIM_CONSTS = cf.SimulationConstants(total_time=1e3, size=5e3, fps=1)
 
     def create_complete_universe(self) -> None:
         """Create the universe."""
@@ -178,9 +451,9 @@ class Jerk(BigScenario):
             uni.Kicker(180, 50, 961, static=True),
         ]
         bounce.add_kick_event(*jerks)
+        # Print the velocity every 10 time units
+        self.observe(self.print_speed, stride=10)
 
-    def do_at_each_time_step(self, time: int) -> None:
-        """Run a simple demonstration of doing some work at every time step."""
-        # Print velocity every 10 time units
-        if not time % 10:
-            print(abs(self.my_uni.objects[0].vel))
+    def print_speed(self, time: int) -> None:  # noqa: ARG002
+        """Run a simple demonstration of doing some work every few time steps."""
+        print(abs(self.my_uni.objects[0].vel))
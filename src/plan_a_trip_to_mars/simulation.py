@@ -1,26 +1,27 @@
 """The script where we program what the simulated universe should look like."""
 
 import contextlib
-import inspect
 import sys
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
-from returns.maybe import Maybe, Nothing, Some
-from rich.console import Console
-from rich.prompt import Confirm, Prompt
-from rich.table import Table
+from plan_a_trip_to_mars import registry
 
-from plan_a_trip_to_mars import scenarios
+if TYPE_CHECKING:
+    from returns.maybe import Maybe
 
-console = Console()
+    from plan_a_trip_to_mars import scenarios
 
 
 @dataclass
 class Scenario:
-    """Container for a simulation scenario."""
+    """Container for a simulation scenario.
+
+    The scenario is only imported and instantiated once it is selected.
+    """
 
     name: str
-    sim: scenarios.BigScenario
+    entry: registry.Entry
 
 
 class Sim:
@@ -28,20 +29,26 @@ class Sim:
 
     Decide which scenario to run, if and in what format it should be saved and whether
     to show the trace or not.
+
+    Rich and the scenarios are imported when the menu is made, not when this module is.
     """
 
     def __init__(self) -> None:
+        from rich.console import Console  # noqa: PLC0415
+
+        self.console = Console()
         self.save: bool = False
         self.save_as: str = "mp4"
         self.trace: bool = True
         self.suppress_prints: bool = False
+        self.live: bool = False
         self._set_simulation_menu()
 
     def _set_simulation_menu(self) -> None:
+        from rich.table import Table  # noqa: PLC0415
+
         self.scenarios: list[Scenario] = [
-            Scenario(name=n, sim=c())
-            for n, c in inspect.getmembers(scenarios, inspect.isclass)
-            if c.__module__ == "plan_a_trip_to_mars.scenarios" and n != "BigScenario"
+            Scenario(name=n, entry=e) for n, e in registry.available().items()
         ]
         self.options = [str(i) for i, _ in enumerate(self.scenarios, start=1)]
         table = Table(box=None)
@@ -56,8 +63,11 @@ class Sim:
     def loop(self) -> None:
         """Run the simulation as an infinite loop."""
         while True:
-            with console.screen():
+            with self.console.screen():
                 self.setup()
+            if self.live:
+                self.play_live()
+                continue
             if self.suppress_prints:
                 with contextlib.redirect_stdout(None):
                     self.run_simulation()
@@ -67,40 +77,61 @@ class Sim:
 
     def setup(self) -> None:
         """Set up a new simulation."""
+        from returns.maybe import Maybe, Some  # noqa: PLC0415
+
         match self.menu():
             case Maybe.empty:
-                console.print("Thank you for playing. Bye!")
+                self.console.print("Thank you for playing. Bye!")
                 sys.exit()
             case Some(scene):
                 self.scenario = scene
-        console.print(f"Running {self.scenario.name}:")
-        self.scenario.sim.setup()
+        self.console.print(f"Running {self.scenario.name}:")
+        self.sim: scenarios.BigScenario = self.scenario.entry.load()()
+        self.sim.setup()
 
     def run_simulation(self) -> None:
         """Run the simulation."""
-        self.scenario.sim.run_simulation()
+        self.sim.run_simulation(progress=True)
 
     def play_animation(self) -> None:
         """Re-create the simulation by animating the trace of the objects."""
-        self.scenario.sim.play_animation((self.save, self.save_as), trace=self.trace)
+        self.sim.play_animation((self.save, self.save_as), trace=self.trace)
+
+    def play_live(self) -> None:
+        """Animate the simulation while it runs."""
+        with (
+            contextlib.redirect_stdout(None)
+            if self.suppress_prints
+            else contextlib.nullcontext()
+        ):
+            self.sim.play_live((self.save, self.save_as), trace=self.trace)
 
     def _adjust_settings(self) -> None:
+        from rich.prompt import Confirm  # noqa: PLC0415
+
         self.trace = Confirm.ask("Do you want to plot the trace of each object?")
         self.suppress_prints = Confirm.ask(
             "Would you like to override the printing done by simulation scenarios?"
         )
+        self.live = Confirm.ask(
+            "Do you want to watch the simulation while it runs, instead of after?"
+        )
         self.save = Confirm.ask("Do you want to save the animation?")
 
     def _selection_menu(self) -> str:
-        console.print(self.menu_items, markup=True)
+        from rich.prompt import Prompt  # noqa: PLC0415
+
+        self.console.print(self.menu_items, markup=True)
         return Prompt.ask(
             "Choose simulation or option from the list above by typing in the"
             " corresponding character: ",
             choices=["q", "s", *self.options],
         )
 
-    def menu(self) -> Maybe[Scenario]:
+    def menu(self) -> "Maybe[Scenario]":
         """List all available simulations."""
+        from returns.maybe import Nothing, Some  # noqa: PLC0415
+
         while (ans := self._selection_menu()) not in ["q", *self.options]:
             match ans:
                 case "s":
@@ -0,0 +1,342 @@
+"""Run many variants of a scenario in parallel and collect their results.
+
+A variant is a set of overrides of the class attributes of a scenario. A scenario that
+should be swept therefore exposes the values to vary, like the speed or time of a kick,
+as class attributes that `create_complete_universe` reads::
+
+    class Transfer(BigScenario):
+        KICK = uni.Kicker(angle=0, speed=2945, time=0)
+
+        def create_complete_universe(self) -> None:
+            ...
+            rocket.add_kick_event(self.KICK)
+
+
+    result = sweep(
+        Transfer,
+        grid(KICK=[uni.Kicker(0, v, 0) for v in np.linspace(2800, 3100, 64)]),
+        metrics=[ClosestApproach("Rocket", "Mars")],
+    )
+
+The variants are spread over a pool of processes. Each worker writes its metrics, and
+optionally its trajectories, straight into arrays in shared memory, so that nothing but
+the index of the variant is sent back to the main process. A worker attaches to the
+shared memory for each variant and lets go of it again, and only the main process
+removes it.
+"""
+
+import contextlib
+import dataclasses
+import itertools
+import math
+import os
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any
+
+import numpy as np
+
+from plan_a_trip_to_mars.scenarios import BigScenario
+
+type Variant = dict[str, Any]
+type Metric = Callable[[BigScenario], float]
+
+# The settings of the sweep and the names of its shared memory, set once in each worker
+_worker: dict[str, Any] = {}
+
+
+@dataclass
+class ClosestApproach:
+    """Metric giving the shortest recorded distance between two objects.
+
+    Attributes
+    ----------
+    a : str
+        Name of the first object.
+    b : str
+        Name of the second object.
+    """
+
+    a: str
+    b: str
+
+    @property
+    def name(self) -> str:
+        """The name of the metric."""
+        return f"closest_approach({self.a}, {self.b})"
+
+    def __call__(self, sim: BigScenario) -> float:
+        """Find the closest approach in a finished simulation.
+
+        Parameters
+        ----------
+        sim : BigScenario
+            The scenario after it has been run.
+
+        Returns
+        -------
+        float
+            The distance in meters, sampled at the trace stride.
+        """
+        names = [obj.name for obj in sim.my_uni.objects]
+        data = sim.my_uni.trace.data
+        diff = data[:, names.index(self.a)] - data[:, names.index(self.b)]
+        return float(np.hypot(diff[:, 0], diff[:, 1]).min())
+
+
+@dataclass
+class SweepResult:
+    """Container for the outcome of a sweep.
+
+    Attributes
+    ----------
+    variants : list[Variant]
+        The overrides of each variant.
+    metric_names : list[str]
+        The name of each metric.
+    metrics : np.ndarray
+        The value of each metric for each variant, shape (variants, metrics).
+    traces : np.ndarray | None
+        The recorded positions of each variant, shape (variants, samples, N, 2), if
+        they were kept.
+    """
+
+    variants: list[Variant]
+    metric_names: list[str]
+    metrics: np.ndarray
+    traces: np.ndarray | None = None
+
+    def best(self, metric: int | str = 0, *, minimize: bool = True) -> Variant:
+        """Find the variant with the lowest (or highest) value of a metric.
+
+        Parameters
+        ----------
+        metric : int | str
+            The index or name of the metric.
+        minimize : bool
+            If False, the variant with the highest value is picked instead.
+
+        Returns
+        -------
+        Variant
+            The overrides of the best variant.
+        """
+        column = self.metric_names.index(metric) if isinstance(metric, str) else metric
+        values = self.metrics[:, column]
+        return self.variants[
+            int(np.nanargmin(values) if minimize else np.nanargmax(values))
+        ]
+
+
+def grid(**axes: Iterable[Any]) -> list[Variant]:
+    """Create every combination of the given values.
+
+    Parameters
+    ----------
+    **axes : Iterable[Any]
+        The values to try for each class attribute.
+
+    Returns
+    -------
+    list[Variant]
+        One variant per combination.
+    """
+    keys = list(axes)
+    return [
+        dict(zip(keys, values, strict=True))
+        for values in itertools.product(*axes.values())
+    ]
+
+
+def random_sample(
+    n: int, seed: int | None = None, **ranges: tuple[float, float]
+) -> list[Variant]:
+    """Draw variants with values uniformly distributed within the given ranges.
+
+    Parameters
+    ----------
+    n : int
+        The number of variants.
+    seed : int | None
+        Seed of the random number generator.
+    **ranges : tuple[float, float]
+        The lowest and highest value of each class attribute.
+
+    Returns
+    -------
+    list[Variant]
+        The variants.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {k: rng.uniform(lo, hi, n) for k, (lo, hi) in ranges.items()}
+    return [{k: float(v[i]) for k, v in columns.items()} for i in range(n)]
+
+
+def make_variant(
+    cls: type[BigScenario], variant: Variant, steps: float | None = None
+) -> BigScenario:
+    """Create and set up a scenario with the given overrides.
+
+    Parameters
+    ----------
+    cls : type[BigScenario]
+        The scenario class.
+    variant : Variant
+        Values of the class attributes to override.
+    steps : float | None
+        The number of iterations to simulate, if different from the scenario.
+
+    Returns
+    -------
+    BigScenario
+        The scenario, ready to run.
+
+    Raises
+    ------
+    AttributeError
+        If the scenario has no class attribute by the name of an override.
+    """
+    sim = cls()
+    for key, value in variant.items():
+        if not hasattr(cls, key):
+            msg = f"The scenario {cls.__name__} has no attribute '{key}' to override."
+            raise AttributeError(msg)
+        setattr(sim, key, value)
+    if steps is not None:
+        sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=steps)
+    sim.setup()
+    return sim
+
+
+def sweep(  # noqa: PLR0913
+    cls: type[BigScenario],
+    variants: Sequence[Variant],
+    metrics: Sequence[Metric] = (),
+    *,
+    steps: float | None = None,
+    keep_traces: bool = False,
+    workers: int | None = None,
+) -> SweepResult:
+    """Run every variant of a scenario in a pool of processes.
+
+    Parameters
+    ----------
+    cls : type[BigScenario]
+        The scenario class.
+    variants : Sequence[Variant]
+        The overrides of each run, for example from `grid` or `random_sample`.
+    metrics : Sequence[Metric]
+        Functions that compute a number from a finished scenario.
+    steps : float | None
+        The number of iterations to simulate, if different from the scenario.
+    keep_traces : bool
+        If True, the recorded positions of every variant are kept as well.
+    workers : int | None
+        The number of processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    SweepResult
+        The metrics, and optionally the traces, of every variant.
+
+    Raises
+    ------
+    ValueError
+        If there are no variants.
+    """
+    variants = list(variants)
+    if not variants:
+        msg = "There are no variants to sweep over. Give at least one, such as {}."
+        raise ValueError(msg)
+    names = [getattr(m, "name", getattr(m, "__name__", repr(m))) for m in metrics]
+    # Set up one variant to find the size of the trajectories
+    probe = make_variant(cls, variants[0], steps)
+    n_samples = math.ceil(int(probe.SIM_CONSTS.total_time) / probe.my_uni.trace.stride)
+    shapes: dict[str, tuple[int, ...]] = {
+        "metrics": (len(variants), len(metrics)),
+        "traces": (len(variants), n_samples, len(probe.my_uni.objects), 2)
+        if keep_traces
+        else (0,),
+    }
+    blocks = {
+        key: shared_memory.SharedMemory(create=True, size=max(8, 8 * math.prod(shape)))
+        for key, shape in shapes.items()
+    }
+    try:
+        arrays = {
+            key: np.ndarray(shape, buffer=blocks[key].buf)
+            for key, shape in shapes.items()
+        }
+        arrays["metrics"][:] = np.nan
+        workers = workers or os.cpu_count() or 1
+        settings = (cls, variants, list(metrics), steps)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(settings, {k: (b.name, shapes[k]) for k, b in blocks.items()}),
+        ) as pool:
+            chunksize = max(1, len(variants) // (4 * workers))
+            for _ in pool.map(_run_variant, range(len(variants)), chunksize=chunksize):
+                pass
+        result = SweepResult(
+            variants=variants,
+            metric_names=names,
+            metrics=arrays["metrics"].copy(),
+            traces=arrays["traces"].copy() if keep_traces else None,
+        )
+        del arrays
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+    return result
+
+
+def _init_worker(
+    settings: tuple[type[BigScenario], list[Variant], list[Metric], float | None],
+    blocks: dict[str, tuple[str, tuple[int, ...]]],
+) -> None:
+    """Give a worker process the settings and shared memory of the sweep."""
+    _worker["settings"] = settings
+    _worker["blocks"] = blocks
+
+
+def _run_variant(index: int) -> int:
+    """Run one variant and write its results into shared memory."""
+    cls, variants, metrics, steps = _worker["settings"]
+    sim = make_variant(cls, variants[index], steps)
+    with contextlib.redirect_stdout(None):
+        sim.run_simulation()
+    values = [m(sim) for m in metrics]
+    blocks = {
+        key: shared_memory.SharedMemory(name=name)
+        for key, (name, _) in _worker["blocks"].items()
+    }
+    try:
+        _store(index, values, sim.my_uni.trace.data, blocks)
+    finally:
+        for block in blocks.values():
+            block.close()
+    return index
+
+
+def _store(
+    index: int,
+    values: list[float],
+    data: np.ndarray,
+    blocks: dict[str, shared_memory.SharedMemory],
+) -> None:
+    """Write the results of a variant into the shared arrays.
+
+    The arrays are only used within this function, so that the memory can be closed
+    as soon as it returns.
+    """
+    arrays = {
+        key: np.ndarray(shape, buffer=blocks[key].buf)
+        for key, (_, shape) in _worker["blocks"].items()
+    }
+    arrays["metrics"][index] = values
+    if arrays["traces"].ndim > 1:
+        arrays["traces"][index, : len(data)] = data[: arrays["traces"].shape[1]]
@@ -0,0 +1,353 @@
+"""Recording of the paths the objects of a universe take during a simulation."""
+
+import math
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from plan_a_trip_to_mars.trajectory import TrajectoryWriter
+
+# The number of samples kept in memory between two writes to a trajectory file
+CHUNK = 1024
+
+
+class TraceRecorder:
+    """Store the positions of all objects in one preallocated array.
+
+    A sample of every position is taken once every `stride` iterations, and kept at full
+    precision. The buffer is sized up front from the expected length of the run, and
+    only grows (by doubling) if the run turns out to be longer.
+
+    With `stream_to`, the samples are instead written to a trajectory file in chunks,
+    and the buffer only ever holds one chunk.
+
+    Parameters
+    ----------
+    n_objects : int | tuple[int, ...]
+        The number of objects in the universe. A tuple gives the shape of the objects,
+        for example (members, objects) for an ensemble of universes.
+    stride : int
+        The number of iterations between two samples.
+    total_time : float | None
+        The expected number of iterations of the run, used to size the buffer.
+    """
+
+    def __init__(
+        self,
+        n_objects: int | tuple[int, ...],
+        stride: int = 1,
+        total_time: float | None = None,
+    ) -> None:
+        if stride < 1:
+            msg = f"The trace stride must be a positive integer, was {stride}."
+            raise ValueError(msg)
+        self.stride = stride
+        capacity = 1024 if total_time is None else math.ceil(total_time / stride) + 1
+        shape = (n_objects,) if isinstance(n_objects, int) else n_objects
+        self._buffer = np.empty((capacity, *shape, 2))
+        self._sink: TrajectoryWriter | None = None
+        # The number of samples that are already written to the sink
+        self._written = 0
+        self.size = 0
+
+    def stream_to(self, writer: "TrajectoryWriter", chunk: int = CHUNK) -> None:
+        """Write the samples to a trajectory file instead of keeping them in memory.
+
+        Parameters
+        ----------
+        writer : TrajectoryWriter
+            The file to write to. Any samples recorded so far are written first.
+        chunk : int
+            The number of samples to keep in memory between two writes.
+        """
+        self._sink = writer
+        self.flush()
+        self._buffer = np.empty((chunk, *self._buffer.shape[1:]))
+
+    @property
+    def streaming(self) -> bool:
+        """Whether the samples are written to a trajectory file."""
+        return self._sink is not None
+
+    @property
+    def written(self) -> int:
+        """The number of samples that are already in the trajectory file."""
+        return self._written
+
+    def restore(self, size: int, samples: np.ndarray | None = None) -> None:
+        """Carry on recording after the given number of samples.
+
+        This is used to resume a run from a checkpoint.
+
+        Parameters
+        ----------
+        size : int
+            The number of samples recorded before the checkpoint.
+        samples : np.ndarray | None
+            The samples themselves. When None, they are already in the trajectory file
+            that the recorder will stream to.
+        """
+        if samples is None:
+            self._written = size
+        else:
+            capacity = max(len(self._buffer), size + 1)
+            self._buffer = np.empty((capacity, *self._buffer.shape[1:]))
+            self._buffer[:size] = samples[:size]
+            self._written = 0
+        self.size = size
+
+    def flush(self) -> None:
+        """Write the samples that are only kept in memory to the trajectory file."""
+        if self._sink is not None and self.size > self._written:
+            self._sink.write(self._buffer[: self.size - self._written])
+            self._written = self.size
+
+    def record(self, time: float, pos: np.ndarray) -> None:
+        """Take a sample of the positions, if the time is on the stride.
+
+        Parameters
+        ----------
+        time : float
+            The current time of the universe, in iterations.
+        pos : np.ndarray
+            The positions of all objects, shape (N, 2) or (..., N, 2).
+        """
+        if time % self.stride:
+            return
+        if self.size - self._written == len(self._buffer):
+            if self._sink is None:
+                self._buffer = np.concatenate(
+                    [self._buffer, np.empty_like(self._buffer)]
+                )
+            else:
+                self.flush()
+        self._buffer[self.size - self._written] = pos
+        self.size += 1
+
+    @property
+    def data(self) -> np.ndarray:
+        """A view of all samples so far, with shape (samples, ..., N, 2).
+
+        When the samples are streamed to a file, this is a read-only memory map of it.
+        """
+        if self._sink is None:
+            return self._buffer[: self.size]
+        self.flush()
+        return self._sink.read().traces
+
+    @property
+    def times(self) -> np.ndarray:
+        """The time of each sample, in iterations."""
+        return np.arange(self.size) * self.stride
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes allocated in memory for the samples."""
+        return self._buffer.nbytes
+
+    def body(self, index: int) -> np.ndarray:
+        """Get a view of the samples of a single object.
+
+        Parameters
+        ----------
+        index : int
+            The position of the object in the universe.
+
+        Returns
+        -------
+        np.ndarray
+            The path of the object, with shape (samples, 2).
+        """
+        return self.data[:, ..., index, :]
+
+
+class TracePyramid:
+    """Keep the recent positions at full resolution, and older ones ever coarser.
+
+    The samples are kept in `levels` ring buffers of `window` samples each. The first
+    holds the last samples, one every `stride` iterations. Each next level keeps one in
+    every `factor` samples of the level below, so it reaches `factor` times as far back
+    at `factor` times lower resolution. The last level is never overwritten: when it is
+    full, it only keeps one in every `factor` of its samples, so that it always reaches
+    back to the start of the run. All memory is set aside up front, and never grows,
+    however long the run is.
+
+    It records like `TraceRecorder`, and `data` gives the samples of all levels merged,
+    oldest first, each from the finest level that still has it.
+
+    Parameters
+    ----------
+    n_objects : int
+        The number of objects in the universe.
+    stride : int
+        The number of iterations between two samples of the finest level.
+    max_bytes : int
+        The memory the samples may take, in bytes.
+    levels : int
+        The number of levels.
+    factor : int
+        How much coarser each level is than the one below.
+    """
+
+    def __init__(
+        self,
+        n_objects: int,
+        stride: int = 1,
+        max_bytes: int = 2**26,
+        levels: int = 4,
+        factor: int = 4,
+    ) -> None:
+        if stride < 1 or factor < 2 or levels < 1:  # noqa: PLR2004
+            msg = (
+                "The trace stride and the number of levels must be positive, and the "
+                f"factor at least two. Got {stride}, {levels} and {factor}."
+            )
+            raise ValueError(msg)
+        # A sample is a time and the positions of all objects
+        window = max_bytes // (levels * 8 * (1 + 2 * n_objects))
+        if window < 2 * factor:
+            msg = (
+                f"{max_bytes} bytes are too few to keep a trace of {n_objects} objects."
+            )
+            raise ValueError(msg)
+        self.stride = stride
+        self.factor = factor
+        self._buffer = np.empty((levels, window, n_objects, 2))
+        self._times = np.empty((levels, window))
+        # The number of samples each level has been given, and the number of samples of
+        # the finest level between two samples of the last level
+        self._count = np.zeros(levels, dtype=int)
+        self._top = factor ** (levels - 1)
+
+    @property
+    def levels(self) -> int:
+        """The number of levels."""
+        return len(self._buffer)
+
+    @property
+    def window(self) -> int:
+        """The number of samples of each level."""
+        return self._buffer.shape[1]
+
+    @property
+    def streaming(self) -> bool:
+        """Whether the samples are written to a trajectory file, which they never are."""
+        return False
+
+    @property
+    def written(self) -> int:
+        """The number of samples that are already in a trajectory file."""
+        return 0
+
+    def stream_to(self, writer: "TrajectoryWriter", chunk: int = CHUNK) -> None:  # noqa: ARG002
+        """Refuse to write the samples to a trajectory file.
+
+        Raises
+        ------
+        ValueError
+            Always, since a streamed trace is already bounded in memory.
+        """
+        msg = (
+            "A trace with a memory cap can not be streamed to a file, and needs no "
+            "streaming to stay small."
+        )
+        raise ValueError(msg)
+
+    def flush(self) -> None:
+        """Do nothing, since all samples are kept in memory."""
+
+    def record(self, time: float, pos: np.ndarray) -> None:
+        """Take a sample of the positions, if the time is on the stride.
+
+        Parameters
+        ----------
+        time : float
+            The current time of the universe, in iterations.
+        pos : np.ndarray
+            The positions of all objects, shape (N, 2).
+        """
+        if time % self.stride:
+            return
+        k = time // self.stride
+        for level in range(self.levels - 1):
+            if k % self.factor**level:
+                return
+            self._push(level, time, pos)
+        if k % self._top == 0:
+            top = self.levels - 1
+            if self._count[top] == self.window:
+                # Keep every `factor`-th sample, and carry on at that resolution
+                self._top *= self.factor
+                keep = self._times[top] // self.stride % self._top == 0
+                n = int(keep.sum())
+                self._times[top, :n] = self._times[top, keep]
+                self._buffer[top, :n] = self._buffer[top, keep]
+                self._count[top] = n
+            if k % self._top == 0:
+                self._push(top, time, pos)
+
+    def _push(self, level: int, time: float, pos: np.ndarray) -> None:
+        """Add a sample to a level, overwriting its oldest when it is a full ring."""
+        i = self._count[level] % self.window
+        self._times[level, i] = time
+        self._buffer[level, i] = pos
+        self._count[level] += 1
+
+    def _merged(self) -> list[tuple[int, np.ndarray]]:
+        """Find the samples of each level that no finer level has.
+
+        Returns
+        -------
+        list[tuple[int, np.ndarray]]
+            Each level with the positions of its samples in its ring buffer, oldest
+            first, from the coarsest level to the finest.
+        """
+        parts = []
+        start = np.inf
+        for level in range(self.levels):
+            count, window = int(self._count[level]), self.window
+            idx = np.arange(min(count, window))
+            if count > window:
+                idx = (idx + count) % window
+            if len(idx):
+                oldest = self._times[level, idx[0]]
+                idx = idx[self._times[level, idx] < start]
+                start = min(start, oldest)
+            parts.append((level, idx))
+        return parts[::-1]
+
+    @property
+    def data(self) -> np.ndarray:
+        """A copy of the samples of all levels, shape (samples, N, 2), oldest first."""
+        return np.concatenate([self._buffer[lvl, idx] for lvl, idx in self._merged()])
+
+    @property
+    def times(self) -> np.ndarray:
+        """The time of each sample of `data`, in iterations."""
+        return np.concatenate([self._times[lvl, idx] for lvl, idx in self._merged()])
+
+    @property
+    def size(self) -> int:
+        """The number of samples kept."""
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes allocated in memory for the samples and their times."""
+        return self._buffer.nbytes + self._times.nbytes
+
+    def body(self, index: int) -> np.ndarray:
+        """Get the samples of a single object.
+
+        Parameters
+        ----------
+        index : int
+            The position of the object in the universe.
+
+        Returns
+        -------
+        np.ndarray
+            The path of the object, with shape (samples, 2).
+        """
+        return self.data[:, index, :]
@@ -0,0 +1,255 @@
+"""Stream the recorded positions of a run to disk, and read them back lazily.
+
+A trajectory file starts with a small header, followed by the samples of the positions
+as raw little-endian floats::
+
+    magic        8 bytes    b"MARSTRJ" and a format version
+    length       4 bytes    the length of the header, as an unsigned integer
+    header       JSON       names, masses, spi, stride and the shape of one sample
+    padding                 up to a multiple of 64 bytes
+    samples      float64    shape (samples, N, 2)
+
+The number of samples is not stored, but follows from the size of the file. Samples are
+appended in chunks while the simulation runs, so that a long run never has to keep all
+of its positions in memory, and a run that crashes keeps everything up to the last
+chunk that was written.
+"""
+
+import contextlib
+import json
+import math
+import pathlib
+import struct
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Self
+
+import numpy as np
+
+MAGIC = b"MARSTRJ\x01"
+ALIGN = 64
+DTYPE = np.dtype("<f8")
+SUFFIX = ".trj"
+
+
+@dataclass
+class Trajectory:
+    """A recorded run, with its samples mapped lazily from a file.
+
+    Attributes
+    ----------
+    names : list[str]
+        The name of each of the N objects.
+    masses : np.ndarray
+        The mass of each object.
+    spi : float
+        The number of seconds per iteration of the run.
+    stride : int
+        The number of iterations between two samples.
+    traces : np.ndarray
+        The positions of all objects, shape (samples, N, 2). This is a read-only
+        memory map, so only the samples that are used are read from disk.
+    """
+
+    names: list[str]
+    masses: np.ndarray
+    spi: float
+    stride: int
+    traces: np.ndarray
+
+    @classmethod
+    def open(cls, path: str | pathlib.Path) -> Self:
+        """Open a trajectory file without reading its samples.
+
+        Parameters
+        ----------
+        path : str | pathlib.Path
+            The trajectory file.
+
+        Returns
+        -------
+        Self
+            The trajectory.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a trajectory file.
+        """
+        with pathlib.Path(path).open("rb") as f:
+            header, offset = _read_header(f)
+        shape = tuple(header["shape"])
+        sample_bytes = math.prod(shape) * DTYPE.itemsize
+        n_samples = (pathlib.Path(path).stat().st_size - offset) // sample_bytes
+        traces = (
+            np.memmap(path, DTYPE, "r", offset, (n_samples, *shape))
+            if n_samples
+            else np.empty((0, *shape))
+        )
+        return cls(
+            names=header["names"],
+            masses=np.array(header["masses"]),
+            spi=header["spi"],
+            stride=header["stride"],
+            traces=traces,
+        )
+
+    @property
+    def times(self) -> np.ndarray:
+        """The time of each sample, in seconds."""
+        return np.arange(len(self.traces)) * self.stride * self.spi
+
+    def body(self, name: str) -> np.ndarray:
+        """Get the path of a single object.
+
+        Parameters
+        ----------
+        name : str
+            The name of the object.
+
+        Returns
+        -------
+        np.ndarray
+            The positions of the object, shape (samples, 2).
+        """
+        return self.traces[:, self.names.index(name)]
+
+
+class TrajectoryWriter:
+    """Append samples of the positions to a trajectory file.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Where to write the trajectory. An existing file is overwritten.
+    names : list[str]
+        The name of each of the N objects.
+    masses : np.ndarray
+        The mass of each object.
+    spi : float
+        The number of seconds per iteration of the run.
+    stride : int
+        The number of iterations between two samples.
+    file : BinaryIO | None
+        The trajectory file at `path` with this header, already open, to carry on
+        writing after its samples. By default, the file is created and the header is
+        written to it.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        path: str | pathlib.Path,
+        names: list[str],
+        masses: np.ndarray,
+        spi: float,
+        stride: int,
+        *,
+        file: BinaryIO | None = None,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        if file is None:
+            file = self._create(names, masses, spi, stride)
+        self._file: BinaryIO = file
+
+    def _create(
+        self, names: list[str], masses: np.ndarray, spi: float, stride: int
+    ) -> BinaryIO:
+        """Create the file, and write the header to it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        header: dict[str, Any] = {
+            "names": list(names),
+            "masses": [float(m) for m in masses],
+            "spi": float(spi),
+            "stride": int(stride),
+            "shape": [len(names), 2],
+        }
+        raw = json.dumps(header).encode()
+        with contextlib.ExitStack() as stack:
+            f = stack.enter_context(self.path.open("wb"))
+            f.write(MAGIC + struct.pack("<I", len(raw)) + raw)
+            f.write(bytes(_data_offset(len(raw)) - f.tell()))
+            f.flush()
+            stack.pop_all()
+        return f
+
+    @classmethod
+    def append(cls, path: str | pathlib.Path, size: int) -> Self:
+        """Carry on writing to an existing trajectory file.
+
+        Any samples after the first `size` are thrown away, so that a run resumed from
+        a checkpoint continues exactly where the checkpoint was made.
+
+        Parameters
+        ----------
+        path : str | pathlib.Path
+            The trajectory file.
+        size : int
+            The number of samples to keep.
+
+        Returns
+        -------
+        Self
+            The writer, positioned after the kept samples.
+        """
+        with contextlib.ExitStack() as stack:
+            # The file is closed again if it can not be read or cut short
+            f = stack.enter_context(pathlib.Path(path).open("r+b"))
+            header, offset = _read_header(f)
+            sample_bytes = math.prod(header["shape"]) * DTYPE.itemsize
+            f.truncate(offset + size * sample_bytes)
+            f.seek(0, 2)
+            stack.pop_all()
+        return cls(
+            path,
+            header["names"],
+            np.array(header["masses"]),
+            header["spi"],
+            header["stride"],
+            file=f,
+        )
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append a chunk of samples to the file.
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            The positions, shape (samples, N, 2).
+        """
+        self._file.write(np.ascontiguousarray(samples, DTYPE).tobytes())
+        self._file.flush()
+
+    def read(self) -> Trajectory:
+        """Open what has been written so far.
+
+        Returns
+        -------
+        Trajectory
+            The trajectory, with the samples mapped from the file.
+        """
+        return Trajectory.open(self.path)
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        """Use the writer as a context manager that closes the file."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Close the file."""
+        self.close()
+
+
+def _read_header(f: BinaryIO) -> tuple[dict[str, Any], int]:
+    """Read the header of a trajectory file, and find where its samples start."""
+    if f.read(len(MAGIC)) != MAGIC:
+        msg = f"'{f.name}' is not a trajectory file."
+        raise ValueError(msg)
+    (length,) = struct.unpack("<I", f.read(4))
+    return json.loads(f.read(length)), _data_offset(length)
+
+
+def _data_offset(header_length: int) -> int:
+    """Find where the samples start, after the header and its padding."""
+    return -(-(len(MAGIC) + 4 + header_length) // ALIGN) * ALIGN
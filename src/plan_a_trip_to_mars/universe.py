@@ -1,10 +1,31 @@
 """Implementation of classes for objects that can move in a 2D space."""
 
+import dataclasses
+import math
+import pathlib
 from abc import abstractmethod
 from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, overload
 
+import numpy as np
+
+import plan_a_trip_to_mars.ephemeris as ephem
+import plan_a_trip_to_mars.gravity as grav
+import plan_a_trip_to_mars.integrators as integ
+import plan_a_trip_to_mars.kepler as kep
 import plan_a_trip_to_mars.misc.precode2 as pre
+import plan_a_trip_to_mars.profiling as prof
+from plan_a_trip_to_mars.collisions import Collider, Collision
 from plan_a_trip_to_mars.config import G
+from plan_a_trip_to_mars.detection import Condition, Crossing, Detector
+from plan_a_trip_to_mars.events import EventScheduler
+from plan_a_trip_to_mars.traces import TracePyramid, TraceRecorder
+
+# Default fraction of the shortest free-fall time used as the adaptive step length
+DEFAULT_ETA = 0.02
+# The shortest adaptive step, in iterations, so that a collision cannot stall the run
+MIN_STEP = 1e-9
 
 
 @dataclass
@@ -44,6 +65,42 @@ class Kicker:
     static: bool = False
 
 
+class _StateView:
+    """Descriptor exposing one row of a state array in the universe as a vector.
+
+    Before the universe is ready, the vector is stored on the object itself. Once the
+    object is bound to a universe, reading the attribute builds a vector from the row
+    in the universe array with the same name, and assigning to it writes straight back
+    into that row.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        self.private = f"_{name}"
+
+    @overload
+    def __get__(self, obj: None, objtype: type | None = None) -> "_StateView": ...
+
+    @overload
+    def __get__(self, obj: "Base", objtype: type | None = None) -> pre.Vector2D: ...
+
+    def __get__(
+        self, obj: "Base | None", objtype: type | None = None
+    ) -> "pre.Vector2D | _StateView":
+        if obj is None:
+            return self
+        if obj._universe is None:  # noqa: SLF001
+            return getattr(obj, self.private)
+        row = getattr(obj._universe, self.name)[obj._index]  # noqa: SLF001
+        return pre.Vector2D(*row.tolist())
+
+    def __set__(self, obj: "Base", value: pre.Vector2D) -> None:
+        if obj._universe is None:  # noqa: SLF001
+            setattr(obj, self.private, value)
+        else:
+            getattr(obj._universe, self.name)[obj._index] = value.x, value.y  # noqa: SLF001
+
+
 class Base:
     """Abstract baseclass that every moving object in the universe inherit from.
 
@@ -59,34 +116,63 @@ class Base:
         The velocity vector of the object
     acc : pre.Vector2D | None
         The acceleration vector of the object
+    radius : float
+        The radius of the object, in meters, used when collisions are turned on with
+        `Universe.set_collisions`. Objects without a radius are points.
+
+    Notes
+    -----
+    When the universe the object belongs to is made ready, the position, velocity and
+    acceleration are moved into the arrays of the universe. The attributes `pos`,
+    `vel` and `acc` then become views into those arrays, so that reading them always
+    gives the current state and assigning to them updates the simulation. Likewise,
+    `trace` becomes a view of the object's samples in the trace recorder of the
+    universe.
     """
 
-    def __init__(
+    pos = _StateView()
+    vel = _StateView()
+    acc = _StateView()
+
+    def __init__(  # noqa: PLR0913
         self,
         name: str,
         mass: float,
         pos: pre.Vector2D | None = None,
         vel: pre.Vector2D | None = None,
         acc: pre.Vector2D | None = None,
+        *,
+        radius: float = 0.0,
     ) -> None:
         self.spi: int = 1
         self.name = name
         self.mass = mass
-        self.trace: list[tuple[float, float]] = []
+        self.radius = radius
+        self._trace: list[tuple[float, float]] = []
+        self._universe: Universe | None = None
+        self._index: int = 0
         self.pos_init = pos or pre.Vector2D(0, 0)
         self.vel_init = vel or pre.Vector2D(0, 0)
         self.acc_init = acc or pre.Vector2D(0, 0)
         self.reset_movement()
 
+    @property
+    def trace(self) -> np.ndarray:
+        """The positions the object has been at, with shape (samples, 2)."""
+        if self._universe is None:
+            return np.array(self._trace, dtype=float).reshape(-1, 2)
+        return self._universe.trace.body(self._index)
+
     def reset_movement(self) -> None:
         """Reset the position, velocity and acceleration to the initial values."""
-        self.pos = self.pos_init
+        # A copy, since the in-place operators of the vector would change it
+        self.pos = self.pos_init.copy()
         self.vel = self.vel_init * self.spi
         self.acc = self.acc_init * self.spi**2
 
     def move(self) -> None:
         """Move the objects in the universe."""
-        self.trace.append(self.pos.as_point)
+        self._trace.append(self.pos.as_point)
         self.vel += self.acc * self.spi**2
         self.pos += self.vel
 
@@ -122,40 +208,72 @@ class Rocket(Flyer):
         The velocity vector of the object
     acc : pre.Vector2D | None
         The acceleration vector of the object
+    test_particle : bool
+        If True, the rocket is pulled by the other objects, but does not pull on them.
+        Its mass is then only used for the energy. Defaults to False.
+    radius : float
+        The radius of the rocket, in meters, used to find collisions.
     """
 
-    def __init__(
+    def __init__(  # noqa: PLR0913
         self,
         name: str,
         mass: float,
         pos: pre.Vector2D | None = None,
         vel: pre.Vector2D | None = None,
         acc: pre.Vector2D | None = None,
+        *,
+        test_particle: bool = False,
+        radius: float = 0.0,
     ) -> None:
-        Flyer.__init__(self, name=name, mass=mass, pos=pos, vel=vel, acc=acc)
+        Flyer.__init__(
+            self, name=name, mass=mass, pos=pos, vel=vel, acc=acc, radius=radius
+        )
+        self.test_particle = test_particle
         self.kick_list: list[Kicker] = []
+        self._kick_times: set[int] = set()
 
     def add_kick_event(self, *kick: Kicker) -> None:
         """Add an instant change of the velocity vector at any time during the simulation.
 
+        The events may be given in any order. Once the universe is ready, the events are
+        handed over to the event scheduler of the universe, and any event added later on
+        goes straight to it.
+
         Parameters
         ----------
         *kick : Kicker
             Any number of Kicker container objects.
         """
-        seen = {k.time for k in self.kick_list}
-        unique = []
         for obj in kick:
-            if obj.time not in seen:
-                unique.append(obj)
-                seen.add(obj.time)
-            else:
+            if obj.time in self._kick_times:
                 print(
                     f"WARNING: Several kick events cannot be set to the same time. Skipping the event {obj}."
                 )
-        self.kick_list = self.kick_list + unique
+                continue
+            self._kick_times.add(obj.time)
+            if self._universe is None:
+                self.kick_list.append(obj)
+            else:
+                self._universe.events.push(obj.time, (self, obj))
 
     def kick(self, time: int) -> None:
+        """Give the rocket every kick from its own list that is due at the given time.
+
+        This is only needed for a rocket that is moved on its own. Within a universe, the
+        kicks are handed out by the event scheduler of the universe.
+
+        Parameters
+        ----------
+        time : int
+            The simulation time at which the kick should take effect.
+        """
+        due = [k for k in self.kick_list if k.time == time]
+        for the_kick in due:
+            self.kick_list.remove(the_kick)
+            self.apply_kick(the_kick)
+
+    def apply_kick(self, the_kick: Kicker) -> None:
         """Kicking the rocket object will completely reset its velocity.
 
         No matter what the previous velocity was like, the direction of its velocity will
@@ -164,35 +282,76 @@ class Rocket(Flyer):
 
         Parameters
         ----------
-        time : int
-            The simulation time at which the kick should take effect.
+        the_kick : Kicker
+            The kick to give the rocket.
         """
-        if len(self.kick_list) == 0:
-            pass
-        elif time == self.kick_list[0].time:
-            # pop removes the last element of the list and returns it. Giving the 0
-            # argument (or in general any int 'n') removes the 0-th (n-th) element and
-            # returns it.
-            the_kick = self.kick_list.pop(0)
-            try:
-                self.vel.normalized()
-            except ZeroDivisionError:
-                direction: pre.Vector2D = pre.Vector2D(1, 0)
-            else:
-                direction = pre.Vector2D(1, 0) if the_kick.static else self.vel
-            if the_kick.multiply:
-                delta_v = direction.normalized() * self.spi
-                delta_v = delta_v.rotate(the_kick.angle)
-                self.vel = self.vel.rotate(the_kick.angle)
-                self.vel *= the_kick.speed
-            else:
-                delta_v = the_kick.speed * direction.normalized() * self.spi
-                delta_v = delta_v.rotate(the_kick.angle)
-                self.vel += delta_v
+        try:
+            self.vel.normalized()
+        except ZeroDivisionError:
+            direction: pre.Vector2D = pre.Vector2D(1, 0)
+        else:
+            direction = pre.Vector2D(1, 0) if the_kick.static else self.vel
+        if the_kick.multiply:
+            delta_v = direction.normalized() * self.spi
+            delta_v = delta_v.rotate(the_kick.angle)
+            self.vel = self.vel.rotate(the_kick.angle)
+            self.vel *= the_kick.speed
+        else:
+            delta_v = the_kick.speed * direction.normalized() * self.spi
+            delta_v = delta_v.rotate(the_kick.angle)
+            self.vel += delta_v
 
 
 class Planet(Static):
-    """Class for stars, planets and moons."""
+    """Class for stars, planets and moons.
+
+    Parameters
+    ----------
+    name : str
+        Name the object
+    mass : float
+        Give the object some mass
+    pos : pre.Vector2D | None
+        The position vector of the object with respect to the origin (0, 0)
+    vel : pre.Vector2D | None
+        The velocity vector of the object
+    acc : pre.Vector2D | None
+        The acceleration vector of the object
+    rails : bool | str
+        Put the planet on rails, so that it is not integrated, but moves on a path
+        that is known in advance. It still pulls on the other objects, but nothing
+        pulls on it. If True, the planet moves in a straight line with its initial
+        velocity, which suits a star that should stay put. If the name of another
+        planet on rails, it moves on the Kepler orbit around that planet through its
+        initial position and velocity relative to it. Defaults to False.
+    orbit : kep.Orbit | None
+        The elements of the orbit around the planet named by `rails`, instead of the
+        initial position and velocity.
+    radius : float
+        The radius of the planet, in meters, used to find collisions. See the radii in
+        `plan_a_trip_to_mars.config`, such as `R_earth`.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        mass: float,
+        pos: pre.Vector2D | None = None,
+        vel: pre.Vector2D | None = None,
+        acc: pre.Vector2D | None = None,
+        *,
+        rails: bool | str = False,
+        orbit: kep.Orbit | None = None,
+        radius: float = 0.0,
+    ) -> None:
+        if orbit is not None and not isinstance(rails, str):
+            msg = f"The orbit of '{name}' needs the name of its centre as `rails`."
+            raise ValueError(msg)
+        Static.__init__(
+            self, name=name, mass=mass, pos=pos, vel=vel, acc=acc, radius=radius
+        )
+        self.rails = rails
+        self.orbit = orbit
 
 
 class Universe:
@@ -203,18 +362,123 @@ class Universe:
     be done / can only be done when it is False. For example it would make no sense
     adding more objects to the universe after the simulation have started.
 
+    Once the universe is ready, the state of every object is kept in contiguous NumPy
+    arrays, and the objects themselves only act as views into these.
+
     Parameters
     ----------
     spi : int | None
         Set the 'seconds-per-iteration'. Defaults to one. This can also be set at a
         later point using the method 'set_spi()'.
+    solver : str
+        How the gravitational pull is computed. Either "direct", which sums over all
+        pairs of objects, or "barnes-hut", which approximates distant groups of objects
+        by their centre of mass. Defaults to "direct". This can also be set at a later
+        point using the method 'set_solver()'.
+    theta : float
+        The opening angle of the Barnes-Hut solver. Smaller is more accurate, larger is
+        faster. Defaults to 0.5.
+    integrator : str
+        The scheme used to move the objects forward in time. One of "euler" (first
+        order semi-implicit Euler), "leapfrog", "verlet" (both second order and
+        symplectic), "yoshida4" (fourth order and symplectic) or "rk4" (classic fourth
+        order Runge-Kutta). Defaults to "euler". Higher order schemes allow a much
+        larger 'spi' for the same accuracy. This can also be set at a later point using
+        the method 'set_integrator()'.
+    adaptive : bool
+        If True, every iteration is split into as many smaller steps as needed to follow
+        close encounters accurately. The length of each step is a fraction `eta` of the
+        shortest free-fall time of any pair of objects. With this on, 'spi' only sets
+        how often the objects are observed, so it can be chosen large enough for the
+        quiet parts of the run. Defaults to False. This can also be set at a later point
+        using the method 'set_adaptive()', which also lets you tune `eta`.
+
+    Attributes
+    ----------
+    pos : np.ndarray
+        Positions of all objects, shape (N, 2), in meters. Any test particles added
+        with `add_particles` follow the objects, as M more rows.
+    vel : np.ndarray
+        Velocities of all objects, shape (N, 2), in meters per iteration.
+    acc : np.ndarray
+        Gravitational accelerations of all objects, shape (N, 2), in meters per second
+        squared.
+    mass : np.ndarray
+        Masses of all objects, shape (N,). Test particles have no mass.
+    time : float
+        The number of iterations simulated so far.
+    steps : int
+        The number of integration steps taken so far. Without adaptive steps, this is
+        the same as `time`.
+    trace : TraceRecorder | TracePyramid
+        The positions of all objects, sampled as the simulation runs.
+    events : EventScheduler
+        The kick events of all rockets that have not happened yet. A kick at time `t`
+        is given at the end of iteration `t`.
+    stats : prof.SimulationStats | None
+        The timers and counters of the work done while profiling is enabled.
+    detector : Detector
+        The conditions added with `add_condition`, and the events found so far.
+    collider : Collider | None
+        The collision detection turned on with `set_collisions`, if any.
     """
 
-    def __init__(self, spi: int | None = None) -> None:
+    def __init__(
+        self,
+        spi: int | None = None,
+        solver: str = "direct",
+        theta: float = 0.5,
+        integrator: str = "euler",
+        *,
+        adaptive: bool = False,
+    ) -> None:
         self.objects: list[Planet | Rocket] = []
         self.objects_app = self.objects.append
         self._start: bool = False
         self._spi: int = 1 if spi is None else spi
+        self._solver = grav.get_solver(solver, theta)
+        self._solver_name = solver
+        self._theta = theta
+        self._direct = solver == "direct"
+        self._integrator = integ.get_integrator(integrator)
+        self._integrator_name = integrator
+        self._rails: kep.Rails | ephem.Ephemeris | None = None
+        self._ephemeris: tuple[pathlib.Path, float | None] | None = None
+        self._railed: np.ndarray = np.zeros(0, dtype=int)
+        self._free: np.ndarray = np.zeros(0, dtype=int)
+        self._h: float = 1.0
+        self._particles: list[tuple[np.ndarray, np.ndarray]] = []
+        # The masses that pull on the other objects, and the objects that have one
+        self._pull: np.ndarray = np.zeros(0)
+        self._sources: np.ndarray = np.zeros(0, dtype=int)
+        self._massless = False
+        self._eta: float | None = DEFAULT_ETA if adaptive else None
+        self.events: EventScheduler[tuple[Rocket, Kicker]] = EventScheduler()
+        self.detector = Detector()
+        self.collider: Collider | None = None
+        self.time: float = 0.0
+        self.steps: int = 0
+        self._interrupted = False
+        self._trace_stride: int = 1
+        self._total_time: float | None = None
+        self._trace_memory: int | None = None
+        self.trace: TraceRecorder | TracePyramid = TraceRecorder(0)
+        self.pos: np.ndarray = np.zeros((0, 2))
+        self.vel: np.ndarray = np.zeros((0, 2))
+        self.acc: np.ndarray = np.zeros((0, 2))
+        self.mass: np.ndarray = np.zeros(0)
+        self.stats: prof.SimulationStats | None = None
+        self._profile_start: tuple[float, float, int] = (0.0, 0.0, 0)
+
+    @property
+    def spi(self) -> int:
+        """The number of seconds that passes per iteration."""
+        return self._spi
+
+    @property
+    def integrator(self) -> integ.Integrator:
+        """The scheme used to move the objects forward in time."""
+        return self._integrator
 
     def set_spi(self, spi: int) -> None:
         """Set the 'seconds-per-iteration' value.
@@ -231,6 +495,426 @@ class Universe:
                 "The simulation of the universe already started. Not re-setting the spi."
             )
 
+    @property
+    def crossings(self) -> list[Crossing]:
+        """The events of the added conditions found so far, in the order they happened."""
+        return self.detector.crossings
+
+    @property
+    def stopped(self) -> Crossing | None:
+        """The terminal event that stopped the simulation, if any.
+
+        Once stopped, moving the universe does nothing. Set `detector.stopped` to None
+        to carry on.
+        """
+        return self.detector.stopped
+
+    def interrupt(self) -> None:
+        """Stop a run that is in progress at the end of the current iteration.
+
+        This may be called from another thread, for example when the window that shows
+        the run is closed. Once interrupted, moving the universe does nothing.
+        """
+        self._interrupted = True
+
+    def _halted(self) -> bool:
+        """Tell whether the run was stopped, by a terminal event or from another thread.
+
+        A method rather than an inline check, so that type checkers do not take the
+        state to be unchanged by the iterations in between.
+        """
+        return self.detector.stopped is not None or self._interrupted
+
+    def add_condition(self, *conditions: Condition) -> None:
+        """Look for events that depend on the state of the universe while it moves.
+
+        See `plan_a_trip_to_mars.detection` for the conditions. They can be added
+        before or after the universe is ready.
+
+        Parameters
+        ----------
+        *conditions : Condition
+            The events to look for.
+        """
+        if self._start:
+            names = [obj.name for obj in self.objects]
+            for cond in conditions:
+                cond.bind(names)
+        self.detector.conditions.extend(conditions)
+
+    @property
+    def collisions(self) -> list[Collision]:
+        """The collisions found so far, in the order they happened."""
+        return [] if self.collider is None else self.collider.collisions
+
+    def set_collisions(self, policy: str = "stop", restitution: float = 1.0) -> None:
+        """Look for collisions between the objects that have a radius.
+
+        Two objects collide when they come closer than the sum of their radii. See
+        `plan_a_trip_to_mars.collisions`. Test particles have no radius, but can hit
+        the objects that have one.
+
+        Parameters
+        ----------
+        policy : str
+            What to do at a collision. "stop" stops the simulation, like a terminal
+            event, "merge" makes one object of the two, and "bounce" makes them bounce
+            off each other.
+        restitution : float
+            The fraction of the speed along the line between the objects that is kept
+            when they bounce.
+        """
+        self.collider = Collider(policy, restitution)
+        if self._start:
+            self.collider.bind(self._radii())
+
+    def _bind_watchers(self) -> None:
+        """Tell the event conditions and the collider about the objects."""
+        names = [obj.name for obj in self.objects]
+        for cond in self.detector.conditions:
+            cond.bind(names)
+        if self.collider is not None:
+            self.collider.bind(self._radii())
+
+    def _radii(self) -> np.ndarray:
+        """Give the radius of every object, and zero for every test particle."""
+        radius = np.zeros(len(self.pos))
+        radius[: len(self.objects)] = [obj.radius for obj in self.objects]
+        return radius
+
+    def set_trace_stride(
+        self,
+        stride: int,
+        total_time: float | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        """Set how often the positions of the objects are recorded.
+
+        Parameters
+        ----------
+        stride : int
+            The number of iterations between two samples of the trace.
+        total_time : float | None
+            The number of iterations the simulation is expected to run. When given, the
+            memory for the whole trace is set aside up front.
+        max_bytes : int | None
+            The most memory the trace may take, in bytes. The recent samples are then
+            kept at full resolution and older ones ever coarser, see `TracePyramid`.
+            By default, every sample is kept.
+        """
+        if not self._start:
+            self._trace_stride = stride
+            self._total_time = total_time
+            self._trace_memory = max_bytes
+        else:
+            print(
+                "The simulation of the universe already started. Not re-setting the "
+                "trace stride."
+            )
+
+    def set_solver(self, solver: str, theta: float = 0.5) -> None:
+        """Set how the gravitational pull between the objects is computed.
+
+        Parameters
+        ----------
+        solver : str
+            Either "direct" or "barnes-hut".
+        theta : float
+            The opening angle of the Barnes-Hut solver.
+        """
+        self._solver = grav.get_solver(solver, theta)
+        self._solver_name = solver
+        self._theta = theta
+        self._direct = solver == "direct"
+
+    def set_integrator(self, integrator: str) -> None:
+        """Set the scheme used to move the objects forward in time.
+
+        Parameters
+        ----------
+        integrator : str
+            One of "euler", "leapfrog", "verlet", "yoshida4" or "rk4".
+        """
+        self._integrator = integ.get_integrator(integrator)
+        self._integrator_name = integrator
+
+    def set_adaptive(self, eta: float | None = DEFAULT_ETA) -> None:
+        """Turn adaptive steps within each iteration on or off.
+
+        Parameters
+        ----------
+        eta : float | None
+            The fraction of the shortest free-fall time used as step length, or None to
+            use a fixed step of one iteration.
+        """
+        self._eta = eta
+
+    def set_ephemeris(
+        self, directory: pathlib.Path, iterations: float | None = None
+    ) -> None:
+        """Move the planets along paths that are cached on disk, and shared between runs.
+
+        When the universe is made ready, the planets are simulated on their own and
+        their paths are stored in `directory`, unless a table of the same planets in
+        the same universe is already there. The planets are then put on rails along
+        the table, so that only the rockets are integrated, and the rockets no longer
+        pull on the planets. See `plan_a_trip_to_mars.ephemeris`.
+
+        Parameters
+        ----------
+        directory : pathlib.Path
+            Where to keep the tables.
+        iterations : float | None
+            The number of iterations to tabulate. Defaults to the expected length of
+            the run, as given to `set_trace_stride`.
+        """
+        if not self._start:
+            self._ephemeris = (directory, iterations)
+        else:
+            print(
+                "The simulation of the universe already started. Not setting the "
+                "ephemeris."
+            )
+
+    def enable_profiling(self) -> prof.SimulationStats:
+        """Time and count the work done while the universe moves.
+
+        The universe must be ready. The force evaluations, integration steps, kicks and
+        trace recording are then timed until `disable_profiling` is called. See
+        `plan_a_trip_to_mars.profiling`.
+
+        Returns
+        -------
+        prof.SimulationStats
+            The stats, which are updated as the universe moves.
+
+        Raises
+        ------
+        ValueError
+            If the universe is not ready.
+        """
+        if not self._start:
+            msg = "Please initialise the universe by calling the 'ready()' method."
+            raise ValueError(msg)
+        self.stats = stats = prof.SimulationStats()
+        prof.instrument(
+            self,
+            stats,
+            _accelerate=("force", "force_evaluations"),
+            _advance="integrate",
+        )
+        prof.instrument(self.trace, stats, record="trace")
+        for obj in self.objects:
+            if isinstance(obj, Rocket):
+                prof.instrument(obj, stats, apply_kick=("kicks", "events_fired"))
+        self._profile_start = (perf_counter(), self.time, self.steps)
+        return stats
+
+    def disable_profiling(self) -> prof.SimulationStats:
+        """Stop timing the work done while the universe moves.
+
+        Returns
+        -------
+        prof.SimulationStats
+            The final stats.
+
+        Raises
+        ------
+        ValueError
+            If profiling was never enabled.
+        """
+        stats = self.stats
+        if stats is None:
+            msg = "Profiling is not enabled. Call 'enable_profiling()' first."
+            raise ValueError(msg)
+        prof.uninstrument(self, "_accelerate", "_advance")
+        prof.uninstrument(self.trace, "record")
+        for obj in self.objects:
+            prof.uninstrument(obj, "apply_kick")
+        start, start_time, start_steps = self._profile_start
+        stats.wall_time = perf_counter() - start
+        stats.iterations = int(self.time - start_time)
+        stats.steps = self.steps - start_steps
+        stats.trace_bytes = self.trace.nbytes
+        return stats
+
+    def save_checkpoint(self, path: pathlib.Path) -> None:
+        """Write the full state of the universe to a file, to resume the run later.
+
+        The state is the position, velocity, acceleration and mass of every object,
+        which of them pull on the others, the clock, the kicks that have not happened
+        yet, the objects merged by collisions, and how far the trace has come. A trace that is kept in memory is saved with it, while a trace that is
+        streamed to a file is flushed, and only its length is saved. The file is
+        replaced in one go, so a run that stops while saving keeps the last
+        checkpoint.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Where to write the checkpoint, as a NumPy `.npz` file.
+
+        Raises
+        ------
+        ValueError
+            If the trace has a memory cap, since its levels can not be restored.
+        """
+        if self._trace_memory is not None:
+            msg = "A run with a memory cap on the trace can not be checkpointed."
+            raise ValueError(msg)
+        self.trace.flush()
+        pending = self.events.pending()
+        kicks = [k for _, (_, k) in pending]
+        collider = self.collider or Collider()
+        state: dict[str, Any] = {
+            "names": np.array([obj.name for obj in self.objects]),
+            "pos": self.pos,
+            "vel": self.vel,
+            "acc": self.acc,
+            "mass": self.mass,
+            "pull": self._pull,
+            "radius": collider.radius,
+            "alive": collider.alive,
+            "host": collider.host,
+            "spi": self._spi,
+            "time": self.time,
+            "steps": self.steps,
+            "event_time": np.array([t for t, _ in pending], dtype=float),
+            "event_object": np.array(
+                [self.objects.index(r) for _, (r, _) in pending], dtype=int
+            ),
+            "event_kick": np.array(
+                [(k.angle, k.speed, k.time) for k in kicks], dtype=float
+            ).reshape(-1, 3),
+            "event_flags": np.array(
+                [(k.multiply, k.static) for k in kicks], dtype=bool
+            ).reshape(-1, 2),
+            "trace_stride": self.trace.stride,
+            "trace_size": self.trace.size,
+            "trace_streamed": self.trace.streaming,
+            "trace": np.empty(0) if self.trace.streaming else self.trace.data,
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.partial")
+        with partial.open("wb") as f:
+            np.savez(f, **state)
+        partial.replace(path)
+
+    def load_checkpoint(self, path: pathlib.Path) -> None:
+        """Set the state of the universe to the one saved in a checkpoint.
+
+        The universe must be made ready first, with the same objects as the universe
+        the checkpoint was saved from, usually by setting up the same scenario again.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            The checkpoint, written by `save_checkpoint`.
+
+        Raises
+        ------
+        ValueError
+            If the universe is not ready, if its trace has a memory cap, or if it does
+            not match the checkpoint.
+        """
+        if not self._start:
+            msg = "Please initialise the universe by calling the 'ready()' method."
+            raise ValueError(msg)
+        if self._trace_memory is not None:
+            msg = "A run with a memory cap on the trace can not be resumed."
+            raise ValueError(msg)
+        assert isinstance(self.trace, TraceRecorder)  # noqa: S101
+        collider = self.collider or Collider()
+        with np.load(path) as state:
+            if (
+                state["names"].tolist() != [obj.name for obj in self.objects]
+                or int(state["trace_stride"]) != self.trace.stride
+                or state["pos"].shape != self.pos.shape
+                or len(state["alive"]) != len(collider.alive)
+            ):
+                msg = f"The checkpoint '{path}' was saved from a different universe."
+                raise ValueError(msg)
+            self.pos[:] = state["pos"]
+            self.vel[:] = state["vel"]
+            self.acc[:] = state["acc"]
+            self.mass[:] = state["mass"]
+            self._pull[:] = state["pull"]
+            self._sources = np.flatnonzero(self._pull)
+            self._massless = len(self._sources) < len(self._pull)
+            collider.radius[:] = state["radius"]
+            collider.alive[:] = state["alive"]
+            collider.host[:] = state["host"]
+            self._spi = int(state["spi"])
+            for i, obj in enumerate(self.objects):
+                obj.spi = self._spi
+                obj.mass = float(self.mass[i])
+                if self.collider is not None:
+                    obj.radius = float(collider.radius[i])
+            self.time = float(state["time"])
+            self.steps = int(state["steps"])
+            self.events = EventScheduler()
+            for t, i, (angle, speed, kick_time), (multiply, static) in zip(
+                state["event_time"].tolist(),
+                state["event_object"].tolist(),
+                state["event_kick"].tolist(),
+                state["event_flags"].tolist(),
+                strict=True,
+            ):
+                kick = Kicker(angle, speed, int(kick_time), multiply, static)
+                self.events.push(t, (self.objects[i], kick))
+            self.trace.restore(
+                int(state["trace_size"]),
+                None if state["trace_streamed"] else state["trace"],
+            )
+
+    def energy(self) -> float:
+        """Compute the total energy of the universe.
+
+        This is the sum of the kinetic energy of all objects and the gravitational
+        potential energy between them. It should stay constant, and how much it changes
+        over a run is a good measure of the error of the integrator.
+
+        Returns
+        -------
+        float
+            The total energy, in joule.
+
+        Raises
+        ------
+        ValueError
+            If the universe is not ready yet.
+        """
+        if not self._start:
+            msg = "Please initialise the universe by calling the 'ready()' method."
+            raise ValueError(msg)
+        speed2 = np.einsum("ij,ij->i", self.vel, self.vel) / self._spi**2
+        kinetic = 0.5 * float(self.mass @ speed2)
+        # Bodies without mass add nothing to the potential energy
+        massive = self.mass > 0
+        return kinetic + grav.potential_energy(self.pos[massive], self.mass[massive])
+
+    def force_error(self) -> grav.ForceError:
+        """Compare the force from the chosen solver to the direct sum over all pairs.
+
+        The comparison is made for the current state of the universe, and is useful to
+        decide on an opening angle for the Barnes-Hut solver.
+
+        Returns
+        -------
+        grav.ForceError
+            The relative error of the acceleration of the objects.
+
+        Raises
+        ------
+        ValueError
+            If the universe is not ready yet.
+        """
+        if not self._start:
+            msg = "Please initialise the universe by calling the 'ready()' method."
+            raise ValueError(msg)
+        return grav.force_error(
+            self._solver(self.pos, self.mass), grav.direct_sum(self.pos, self.mass)
+        )
+
     def add_object(self, *obj: Planet | Rocket) -> None:
         """Add any number of objects to the universe as an unordered list of arguments.
 
@@ -246,11 +930,39 @@ class Universe:
         else:
             print("You already called the 'ready()' method. Skipping adding objects.")
 
+    def add_particles(self, pos: np.ndarray, vel: np.ndarray | None = None) -> None:
+        """Add a swarm of massless test particles, such as a debris cloud.
+
+        The particles are pulled by the objects, but do not pull on anything. They are
+        kept only as rows of the state arrays, after the objects, so the memory and time
+        they take grow linearly with their number. They are not recorded in the trace,
+        and do not count when choosing adaptive steps.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            The positions of the particles, shape (M, 2), in meters.
+        vel : np.ndarray | None
+            The velocities of the particles, shape (M, 2), in meters per second.
+            Defaults to zero.
+        """
+        if self._start:
+            print("You already called the 'ready()' method. Skipping adding particles.")
+            return
+        pos = np.asarray(pos, dtype=float).reshape(-1, 2)
+        vel = np.zeros_like(pos) if vel is None else np.asarray(vel, dtype=float)
+        self._particles.append((pos, vel.reshape(-1, 2)))
+
+    @property
+    def particles(self) -> np.ndarray:
+        """The positions of the test particles, shape (M, 2), as a view."""
+        return self.pos[len(self.objects) :]
+
     def ready(self) -> None:
         """Let the universe know you are done modifying it, and ready to simulate.
 
-        Sets the hidden attribute _start to True and updates all objects with the
-        current 'spi' value.
+        Sets the hidden attribute _start to True, updates all objects with the current
+        'spi' value and packs their state into the arrays of the universe.
         """
         if not self.objects:
             msg = (
@@ -263,6 +975,210 @@ class Universe:
         for obj in self.objects:
             obj.spi = self._spi
             obj.reset_movement()
+        self.pos = np.array([(o.pos.x, o.pos.y) for o in self.objects], dtype=float)
+        self.vel = np.array([(o.vel.x, o.vel.y) for o in self.objects], dtype=float)
+        self.acc = np.zeros_like(self.pos)
+        self.mass = np.array([o.mass for o in self.objects], dtype=float)
+        pull = [
+            0.0 if isinstance(o, Rocket) and o.test_particle else o.mass
+            for o in self.objects
+        ]
+        if self._particles:
+            self.pos = np.concatenate([self.pos, *(p for p, _ in self._particles)])
+            self.vel = np.concatenate(
+                [self.vel, *(v * self._spi for _, v in self._particles)]
+            )
+            self.acc = np.zeros_like(self.pos)
+            self.mass = np.concatenate([self.mass, np.zeros(len(self.pos) - len(pull))])
+            self._particles = []
+        self._pull = np.zeros_like(self.mass)
+        self._pull[: len(pull)] = pull
+        self._sources = np.flatnonzero(self._pull)
+        self._massless = len(self._sources) < len(self._pull)
+        for i, obj in enumerate(self.objects):
+            obj._universe = self  # noqa: SLF001
+            obj._index = i  # noqa: SLF001
+        # The universe takes over the kick events of all rockets
+        for obj in self.objects:
+            if isinstance(obj, Rocket):
+                for k in obj.kick_list:
+                    self.events.push(k.time, (obj, k))
+                obj.kick_list = []
+        self.trace = (
+            TraceRecorder(len(self.objects), self._trace_stride, self._total_time)
+            if self._trace_memory is None
+            else TracePyramid(len(self.objects), self._trace_stride, self._trace_memory)
+        )
+        self._bind_watchers()
+        if self._ephemeris is None:
+            self._build_rails()
+        else:
+            self._use_ephemeris(*self._ephemeris)
+
+    def _use_ephemeris(self, directory: pathlib.Path, iterations: float | None) -> None:
+        """Put the planets on the cached table of their paths, making it if needed.
+
+        Raises
+        ------
+        ValueError
+            If the number of iterations to tabulate is not known.
+        """
+        planets = [
+            (i, obj) for i, obj in enumerate(self.objects) if isinstance(obj, Planet)
+        ]
+        if not planets:
+            return
+        span = iterations if iterations is not None else self._total_time
+        if span is None:
+            msg = "Give the number of iterations the ephemeris should cover."
+            raise ValueError(msg)
+        description = {
+            "spi": self._spi,
+            "solver": self._solver_name,
+            "theta": self._theta,
+            "integrator": self._integrator_name,
+            "eta": self._eta,
+            "planets": [
+                {
+                    "name": p.name,
+                    "mass": p.mass,
+                    "pos": self.pos[i].tolist(),
+                    "vel": (self.vel[i] / self._spi).tolist(),
+                    "rails": p.rails,
+                    "orbit": None if p.orbit is None else dataclasses.asdict(p.orbit),
+                }
+                for i, p in planets
+            ],
+        }
+        path = directory / f"{ephem.key(description)}{ephem.SUFFIX}"
+        table = ephem.load(path)
+        if table is None or len(table) <= span:
+            ephem.save(path, self._tabulate([p for _, p in planets], math.ceil(span)))
+            table = ephem.load(path)
+        assert table is not None  # noqa: S101
+        self._railed = np.array([i for i, _ in planets])
+        self._free = np.setdiff1d(np.arange(len(self.pos)), self._railed)
+        self._rails = ephem.Ephemeris(table, self._spi)
+        self._place_rails(self.time)
+
+    def _tabulate(self, planets: list[Planet], iterations: int) -> np.ndarray:
+        """Simulate the planets on their own, and tabulate their paths.
+
+        Parameters
+        ----------
+        planets : list[Planet]
+            The planets.
+        iterations : int
+            The number of iterations to simulate.
+
+        Returns
+        -------
+        np.ndarray
+            The position, velocity and acceleration of each planet at every iteration,
+            shape (iterations + 1, K, 3, 2), in SI units.
+        """
+        alone = Universe(
+            self._spi, self._solver_name, self._theta, self._integrator_name
+        )
+        alone.set_adaptive(self._eta)
+        alone.add_object(
+            *(
+                Planet(
+                    p.name,
+                    p.mass,
+                    p.pos_init.copy(),
+                    p.vel_init.copy(),
+                    rails=p.rails,
+                    orbit=p.orbit,
+                )
+                for p in planets
+            )
+        )
+        alone.set_trace_stride(iterations + 1)
+        alone.ready()
+        table = np.empty((iterations + 1, len(planets), 3, 2))
+        for i in range(iterations + 1):
+            table[i, :, 0] = alone.pos
+            table[i, :, 1] = alone.vel / self._spi
+            if i < iterations:
+                alone.step_many(1)
+        table[:, :, 2] = np.gradient(table[:, :, 1], self._spi, axis=0)
+        return table
+
+    def _build_rails(self) -> None:
+        """Put the planets on rails that asked for it, and place them at the start.
+
+        Raises
+        ------
+        ValueError
+            If the centre of an orbit is unknown or not on rails itself.
+        """
+        planets = {
+            i: obj
+            for i, obj in enumerate(self.objects)
+            if isinstance(obj, Planet) and obj.rails is not False
+        }
+        if not planets:
+            return
+        names = [obj.name for obj in self.objects]
+        centre_of = {i: p.rails for i, p in planets.items() if isinstance(p.rails, str)}
+        # A centre must be placed before the planets orbiting it
+        order: list[int] = []
+        pending = list(planets)
+        while pending:
+            placed = [
+                i
+                for i in pending
+                if i not in centre_of
+                or (centre_of[i] in names and names.index(centre_of[i]) in order)
+            ]
+            if not placed:
+                msg = (
+                    "The centre of each planet on rails must be another planet on "
+                    f"rails, which is not the case for {[names[i] for i in pending]}."
+                )
+                raise ValueError(msg)
+            order.extend(placed)
+            pending = [i for i in pending if i not in placed]
+        orbits: list[kep.Orbit | None] = []
+        centres: list[int] = []
+        mu = np.zeros(len(order))
+        vel_si = self.vel / self._spi
+        for k, i in enumerate(order):
+            centre = planets[i].rails
+            if not isinstance(centre, str):
+                orbits.append(None)
+                centres.append(-1)
+                continue
+            c = names.index(centre)
+            mu[k] = G * (self.mass[c] + self.mass[i])
+            orbits.append(
+                planets[i].orbit
+                or kep.Orbit.from_state(
+                    self.pos[i] - self.pos[c], vel_si[i] - vel_si[c], mu[k]
+                )
+            )
+            centres.append(order.index(c))
+        self._railed = np.array(order)
+        self._free = np.setdiff1d(np.arange(len(self.pos)), self._railed)
+        self._rails = kep.Rails(
+            orbits, centres, np.where(mu > 0, mu, 1.0), self.pos[order], vel_si[order]
+        )
+        self._place_rails(self.time)
+
+    def _place_rails(self, time: float) -> None:
+        """Move the planets on rails to where they are at the given time.
+
+        Parameters
+        ----------
+        time : float
+            The time, in iterations.
+        """
+        assert self._rails is not None  # noqa: S101
+        pos, vel = self._rails.state(time * self._spi)
+        self.pos[self._railed] = pos
+        self.vel[self._railed] = vel * self._spi
+        self.acc[self._railed] = 0
 
     def move(self, time: int) -> None:
         """Update all objects in the universe.
@@ -270,46 +1186,290 @@ class Universe:
         Calling this method moves the universe one time step forward. The position,
         velocity and acceleration vectors of each object are updated depending on all
         other objects.
+
+        Parameters
+        ----------
+        time : int
+            The current simulation time. The universe keeps its own clock in the `time`
+            attribute, which decides when kick events happen, so this must match it.
         """
         if not self._start:
             msg = "Please initialise the universe by calling the 'ready()' method."
             raise ValueError(msg)
-        # We first update the new acceleration of each object based on a snapshot in time
-        for obj in self.objects:
-            self._calculate_force(obj)
+        self._run(time + 1)
 
-        # Let us now update the movement of each object with the gravitational pull it
-        # gets from all the other objects
-        for obj in self.objects:
-            obj.move()
-            if isinstance(obj, Rocket):
-                obj.kick(time)
+    def step_many(self, n: int) -> None:
+        """Move the universe `n` time steps forward in one go.
+
+        This does the same as calling `move` for each of the time steps, but without
+        calling back into Python in between. Kicks, the trace and the conditions are all
+        handled on the way.
+
+        Parameters
+        ----------
+        n : int
+            The number of time steps to move.
+        """
+        if not self._start:
+            msg = "Please initialise the universe by calling the 'ready()' method."
+            raise ValueError(msg)
+        self._run(int(self.time) + n)
 
-    def _calculate_force(self, obj: Planet | Rocket) -> None:
-        """Calculate the sum of forces on each object.
+    def _run(self, stop: int) -> None:
+        """Move the universe forward to the start of iteration `stop`.
 
-        Updates the gravitational force a given object feels from all other objects in the
-        universe.
+        The integration runs without interruption up to the next kick event, which is
+        then given before carrying on towards the next one. If conditions were added,
+        the state at the start of every iteration is handed to the detector, and the
+        run ends early when a terminal event is found. The state before the kicks is
+        handed over too, so that no kick is given after a terminal event.
 
-        Should be called only from within this class.
+        Parameters
+        ----------
+        stop : int
+            The iteration to stop at.
+        """
+        detector = self.detector
+        detect = bool(detector.conditions)
+        if self._halted():
+            return
+        # Views of the objects, without the test particles
+        n = len(self.objects)
+        pos, vel = self.pos[:n], self.vel[:n]
+        while self.time < stop:
+            # A kick at time t is given at the end of iteration t
+            chunk_end = min(stop, self.events.next_time() + 1)
+            while self.time < chunk_end:
+                if detect and detector.push(self.time, pos, vel):
+                    return
+                self.trace.record(self.time, pos)
+                # Let the integrator update the movement of each object with the
+                # gravitational pull it gets from all the other objects
+                self._advance(self.time + 1)
+                if self._halted():
+                    # Stopped by a collision, or from another thread
+                    return
+            if detect and detector.push(self.time, pos, vel):
+                return
+            for rocket, the_kick in self.events.pop_due(self.time - 1):
+                rocket.apply_kick(the_kick)
+        if detect:
+            detector.push(self.time, pos, vel)
+            detector.check()
+
+    def _advance(self, until: float) -> None:
+        """Integrate up to the given time, landing exactly on it.
 
         Parameters
         ----------
-        obj : Planet | Rocket
-            Adds the object to the list of object. Can be either a Planet object or a
-            Rocket object.
+        until : float
+            The time to stop at, in iterations.
+        """
+        while self.time < until:
+            h = until - self.time
+            if self._eta is not None:
+                h = min(h, max(self._step_size(), MIN_STEP))
+            before = None if self.collider is None else self.pos.copy()
+            if self._rails is None:
+                self._integrator.step(self.pos, self.vel, self._accelerate, h)
+            else:
+                self._step_free(h)
+            self.steps += 1
+            if before is not None:
+                self._collide(before, h)
+            # Snap to the target on the last step to avoid round-off drift in the clock
+            self.time = until if h == until - self.time else self.time + h
+            if self.detector.stopped is not None:
+                return
+
+    def _collide(self, before: np.ndarray, h: float) -> None:
+        """Find the collisions during the last step, and act on them.
+
+        The objects that collide are put back where they touched, given their new
+        velocity, and moved in a straight line for the rest of the step.
+
+        Parameters
+        ----------
+        before : np.ndarray
+            The positions of all objects at the start of the step.
+        h : float
+            The length of the step, in iterations.
+        """
+        collider = self.collider
+        assert collider is not None  # noqa: S101
+        railed = set(self._railed.tolist())
+        n = len(self.objects)
+        for s, i, j in collider.find(before, self.pos):
+            if not (collider.alive[i] and collider.alive[j]) or {i, j} <= railed:
+                continue
+            at = before[[i, j]] + s * (self.pos[[i, j]] - before[[i, j]])
+            names = [
+                self.objects[k].name if k < n else f"particle {k - n}" for k in (i, j)
+            ]
+            collider.collisions.append(
+                Collision(names[0], names[1], self.time + s * h, at, collider.policy)
+            )
+            if collider.policy == "stop":
+                self.detector.stopped = Crossing(
+                    f"collision of {names[0]} and {names[1]}",
+                    self.time + s * h,
+                    before[:n] + s * (self.pos[:n] - before[:n]),
+                    self.vel[:n].copy(),
+                    terminal=True,
+                )
+                self.detector.crossings.append(self.detector.stopped)
+                return
+            rest = (1 - s) * h
+            if collider.policy == "merge":
+                self._merge(i, j, at, rest, railed)
+            else:
+                self._bounce(i, j, at, rest, railed)
+        # The merged objects ride along with the object they were merged into
+        riders = np.flatnonzero(collider.host >= 0)
+        self.pos[riders] = self.pos[collider.host[riders]]
+        self.vel[riders] = self.vel[collider.host[riders]]
+
+    def _merge(
+        self, i: int, j: int, at: np.ndarray, rest: float, railed: set[int]
+    ) -> None:
+        """Make one object of two that collided, keeping their mass and momentum.
+
+        The heavier object, or the one on rails, is kept, and the other one rides along
+        with it from then on.
+        """
+        collider = self.collider
+        assert collider is not None  # noqa: S101
+        if i in railed or (j not in railed and self.mass[i] >= self.mass[j]):
+            keep, gone, at_keep, at_gone = i, j, at[0], at[1]
+        else:
+            keep, gone, at_keep, at_gone = j, i, at[1], at[0]
+        m1, m2 = self.mass[keep], self.mass[gone]
+        total = m1 + m2
+        if keep not in railed and total > 0:
+            vel = (m1 * self.vel[keep] + m2 * self.vel[gone]) / total
+            self.vel[keep] = vel
+            self.pos[keep] = (m1 * at_keep + m2 * at_gone) / total + vel * rest
+        self.mass[keep], self.mass[gone] = total, 0.0
+        self._pull[keep], self._pull[gone] = self._pull[keep] + self._pull[gone], 0.0
+        self._sources = np.flatnonzero(self._pull)
+        self._massless = True
+        radius = collider.radius
+        radius[keep] = np.cbrt(radius[keep] ** 3 + radius[gone] ** 3)
+        radius[gone] = 0.0
+        collider.alive[gone] = False
+        collider.host[collider.host == gone] = keep
+        collider.host[gone] = keep
+        for k in (keep, gone):
+            if k < len(self.objects):
+                self.objects[k].mass = float(self.mass[k])
+                self.objects[k].radius = float(radius[k])
+
+    def _bounce(
+        self, i: int, j: int, at: np.ndarray, rest: float, railed: set[int]
+    ) -> None:
+        """Make two objects that collided bounce off each other.
+
+        A planet on rails does not move, as if it were infinitely heavy.
+        """
+        collider = self.collider
+        assert collider is not None  # noqa: S101
+        normal = at[1] - at[0]
+        dist = np.hypot(*normal)
+        approach = float((self.vel[j] - self.vel[i]) @ normal) / dist if dist else 0.0
+        if approach >= 0:
+            # Already moving apart
+            return
+        m1, m2 = self.mass[i], self.mass[j]
+        if i in railed:
+            share = (0.0, 1.0)
+        elif j in railed:
+            share = (1.0, 0.0)
+        else:
+            share = (m2 / (m1 + m2), m1 / (m1 + m2)) if m1 + m2 > 0 else (0.5, 0.5)
+        kick = (1 + collider.restitution) * approach * normal / dist
+        self.vel[i] += share[0] * kick
+        self.vel[j] -= share[1] * kick
+        for k, p in ((i, at[0]), (j, at[1])):
+            if k not in railed:
+                self.pos[k] = p + self.vel[k] * rest
+
+    def _step_free(self, h: float) -> None:
+        """Integrate the objects that are not on rails, and move the rest along them.
+
+        Parameters
+        ----------
+        h : float
+            The length of the step, in iterations.
         """
-        # Starts with a net force of zero
-        net_force: pre.Vector2D = pre.Vector2D(0, 0)
+        free = self._free
+        if len(free):
+            pos, vel = self.pos[free], self.vel[free]
+            self._h = h
+            self._integrator.step(pos, vel, self._accelerate, h)
+            self.pos[free], self.vel[free] = pos, vel
+        self._place_rails(self.time + h)
 
-        # The list comprehension picks out all objects from self.objects that is not the
-        # one objects we are looking at
-        for o in [y for y in self.objects if y is not obj]:
-            # Find the distance vector between one of the other objects and calculate the
-            # gravitational pull it get from this
-            distance_vec = o.pos - obj.pos
-            gravity = G * (obj.mass * o.mass) / (abs(distance_vec) ** 2)
-            # Add the gravitational pull from this one object to the net sum of all forces
-            net_force += gravity * distance_vec.normalized()
+    def _step_size(self) -> float:
+        """Find the adaptive step length from the closest encounter in the universe.
 
-        obj.acc = net_force / obj.mass
+        Returns
+        -------
+        float
+            The step length in iterations.
+        """
+        assert self._eta is not None  # noqa: S101
+        n = len(self.objects)
+        pos, mass = self.pos[:n], self.mass[:n]
+        if self.collider is not None:
+            # The merged objects sit on top of the object they were merged into
+            alive = self.collider.alive[:n]
+            pos, mass = pos[alive], mass[alive]
+        return self._eta * grav.free_fall_time(pos, mass) / self._spi
+
+    def _accelerate(self, pos: np.ndarray, frac: float = 0.0) -> np.ndarray:
+        """Calculate the gravitational acceleration of every object.
+
+        Updates the acceleration each object gets from the gravitational pull of all
+        other objects in the universe, when they are at the given positions.
+
+        Should be called only from within this class.
+
+        Parameters
+        ----------
+        pos : np.ndarray
+            The positions of all objects and test particles, or of only those that are
+            not on rails if there are planets on rails.
+        frac : float
+            The time within the current step, as a fraction of the step. The planets
+            on rails are placed where they are at that time.
+
+        Returns
+        -------
+        np.ndarray
+            The acceleration in meters per iteration squared, as used by the integrator.
+        """
+        if self._rails is None and not self._massless:
+            self.acc = self._solver(pos, self.mass)
+            return self.acc * self._spi**2
+        if self._rails is None:
+            stage = pos
+        else:
+            stage = np.empty_like(self.pos)
+            stage[self._free] = pos
+            stage[self._railed] = self._rails.state(
+                (self.time + frac * self._h) * self._spi
+            )[0]
+        if self._direct:
+            # Only the objects with a mass pull, so sum over those alone
+            src = self._sources
+            block = max(512, 2**18 // max(1, len(src)))
+            acc = grav.field(pos, stage[src], self._pull[src], block)
+        else:
+            acc = self._solver(stage, self._pull)
+            if self._rails is not None:
+                acc = acc[self._free]
+        if self._rails is None:
+            self.acc = acc
+        else:
+            self.acc[self._free] = acc
+        return acc * self._spi**2
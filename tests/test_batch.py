@@ -0,0 +1,52 @@
+"""Tests for running scenarios without any interaction."""
+
+import pathlib
+import subprocess
+import sys
+
+import numpy as np
+
+from plan_a_trip_to_mars import batch
+
+HEADLESS = """
+import sys
+from plan_a_trip_to_mars.__main__ import main
+main(sys.argv[1:])
+assert "matplotlib" not in sys.modules, "matplotlib was imported"
+"""
+
+
+def test_run_without_rendering(tmp_path: pathlib.Path) -> None:
+    """Several scenarios should run in a process pool without importing matplotlib."""
+    out = tmp_path / "run.npz"
+    args = ["run", "Jerk", "Simpel", "--steps", "100", "--out", str(out)]
+    subprocess.run(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            HEADLESS,
+            *args,
+            "--no-render",
+            "--jobs",
+            "2",
+            "--quiet",
+        ],
+        check=True,
+    )
+    with np.load(tmp_path / "run_Simpel.npz") as run:
+        assert run["traces"].shape == (5, 2, 2)  # noqa: S101
+        assert list(run["names"]) == ["Stone", "Rock"]  # noqa: S101
+        assert run["iterations"] == 100  # noqa: S101, PLR2004
+    with np.load(tmp_path / "run_Jerk.npz") as run:
+        assert run["traces"].shape == (100, 1, 2)  # noqa: S101
+
+
+def test_resumed_runs_count_their_own_iterations(tmp_path: pathlib.Path) -> None:
+    """The speed of a resumed run should only count the iterations it simulated."""
+    out = tmp_path / "run.npz"
+    first = batch.run_scenario("Simpel", out, 100, quiet=True, checkpoint_every=50)
+    assert first.iterations == 100  # noqa: S101, PLR2004
+    resumed = batch.run_scenario("Simpel", out, 150, quiet=True, resume=True)
+    # The last checkpoint was made at the end of the first run
+    assert resumed.iterations == 150 - 100  # noqa: S101
+    assert resumed.steps == resumed.iterations  # noqa: S101
@@ -0,0 +1,28 @@
+"""Tests for the benchmarks."""
+
+from plan_a_trip_to_mars import bench
+
+
+def test_scaling_results() -> None:
+    """Every solver and size should give a positive speed."""
+    results = bench.bench_scaling(sizes=(2, 20), min_time=0)
+    assert [r.name for r in results] == [  # noqa: S101
+        "steps_per_second/direct/N=2",
+        "steps_per_second/direct/N=20",
+        "steps_per_second/barnes-hut/N=2",
+        "steps_per_second/barnes-hut/N=20",
+    ]
+    assert all(r.value > 0 for r in results)  # noqa: S101
+
+
+def test_compare_with_baseline() -> None:
+    """Only results that got worse than the tolerance should be regressions."""
+    results = [
+        bench.Result("speed", 70, "steps/s"),
+        bench.Result("memory", 130, "B/step", higher_is_better=False),
+        bench.Result("new", 1, "steps/s"),
+    ]
+    baseline = {"speed": {"value": 100}, "memory": {"value": 100}}
+    assert len(bench.compare(results, baseline, tolerance=0.4)) == 0  # noqa: S101
+    regressions = bench.compare(results, baseline, tolerance=0.2)
+    assert [r.split(":")[0] for r in regressions] == ["speed", "memory"]  # noqa: S101
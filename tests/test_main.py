@@ -1,8 +1,54 @@
 """Tests for the main module."""
 
+import json
+import subprocess
+import sys
+
+import pytest
+
 import plan_a_trip_to_mars.__main__ as m
+import plan_a_trip_to_mars.registry as reg
+import plan_a_trip_to_mars.scenarios as s
+
+# Importing the entry points must not load any of these, which make startup slow
+STARTUP = """
+import json, sys
+import plan_a_trip_to_mars, plan_a_trip_to_mars.__main__, plan_a_trip_to_mars.simulation
+heavy = ("matplotlib", "numpy", "rich", "returns", "importlib.metadata")
+print(json.dumps([name for name in heavy if name in sys.modules]))
+"""
 
 
 def test_main_function() -> None:
     """Dummy test for the main function."""
     assert m.main() is None  # noqa: S101
+
+
+def test_startup_skips_heavy_imports() -> None:
+    """The entry points should import without the heavy dependencies."""
+    loaded = json.loads(
+        subprocess.run(  # noqa: S603
+            [sys.executable, "-c", STARTUP],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+    )
+    assert loaded == [], loaded  # noqa: S101
+
+
+def test_registry_lists_the_builtin_scenarios() -> None:
+    """Every scenario class should be listed, and only loaded when asked for."""
+    concrete = {
+        n
+        for n, c in vars(s).items()
+        if isinstance(c, type)
+        and issubclass(c, s.BigScenario)
+        and c is not s.BigScenario
+    }
+    assert set(reg.builtin()) == concrete  # noqa: S101
+    assert list(reg.available())[:3] == ["Simpel", "Mayhem", "Jerk"]  # noqa: S101
+    assert reg.load("Mayhem") is s.Mayhem  # noqa: S101
+    for bad in ("Nope", "BigScenario"):
+        with pytest.raises(ValueError, match=bad):
+            reg.load(bad)
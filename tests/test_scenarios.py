@@ -1,8 +1,19 @@
 """Tests for the implemented scenarios."""
 
+import contextlib
+import dataclasses
 import inspect
+import io
+import pathlib
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
 
 import plan_a_trip_to_mars.scenarios as s
+from plan_a_trip_to_mars.live import LiveFeed
+from plan_a_trip_to_mars.misc.animate import LiveScatter
+from plan_a_trip_to_mars.trajectory import Trajectory, TrajectoryWriter
 
 
 def test_instantiate() -> None:
@@ -13,5 +24,187 @@ def test_instantiate() -> None:
             assert issubclass(c, s.BigScenario)  # noqa: S101
 
 
+def test_stream_trajectory(tmp_path: pathlib.Path) -> None:
+    """A run streamed to a file should read back like the one kept in memory."""
+    sims = []
+    for _ in range(2):
+        sim = s.Mayhem()
+        # Enough samples to be written in several chunks
+        sim.SIM_CONSTS = dataclasses.replace(
+            sim.SIM_CONSTS, total_time=3000, trace_stride=1
+        )
+        sim.setup()
+        sims.append(sim)
+    with contextlib.redirect_stdout(None):
+        sims[0].run_simulation()
+        sims[1].run_simulation(tmp_path / "run.trj")
+    run = Trajectory.open(tmp_path / "run.trj")
+    np.testing.assert_array_equal(run.traces, sims[0].my_uni.trace.data)
+    np.testing.assert_array_equal(run.masses, sims[0].my_uni.mass)
+    assert run.names == [obj.name for obj in sims[0].my_uni.objects]  # noqa: S101
+    assert sims[1].my_uni.trace.nbytes < sims[0].my_uni.trace.nbytes  # noqa: S101
+
+    # Carrying on keeps the header, and refuses files that are not trajectories
+    with TrajectoryWriter.append(tmp_path / "run.trj", 10) as writer:
+        assert writer.read().names == run.names  # noqa: S101
+        assert len(writer.read().traces) == 10  # noqa: S101, PLR2004
+    (tmp_path / "other.trj").write_bytes(b"not a trajectory")
+    with pytest.raises(ValueError, match="not a trajectory file"):
+        TrajectoryWriter.append(tmp_path / "other.trj", 0)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_save_animation_in_parallel(tmp_path: pathlib.Path, *, stream: bool) -> None:
+    """Frames drawn by several processes should be saved in order.
+
+    A run streamed to a trajectory file is mapped from that file by the workers.
+    """
+    sim = s.Jerk()
+    sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=8)
+    sim.setup()
+    with contextlib.redirect_stdout(None):
+        sim.run_simulation(tmp_path / "jerk.trj" if stream else None)
+    sim.save_animation(tmp_path / "jerk.gif", trace=True, workers=2)
+    with Image.open(tmp_path / "jerk.gif") as gif:
+        frames = sum(1 for _ in ImageSequence.Iterator(gif))
+    assert frames == sim.my_uni.trace.size  # noqa: S101
+
+
+def test_profile_run() -> None:
+    """Profiling should count the work done, and leave nothing behind afterwards."""
+    sim = s.Jerk()
+    sim.setup()
+    with contextlib.redirect_stdout(None):
+        sim.run_simulation(profile=True)
+    stats = sim.my_uni.stats
+    assert stats is not None  # noqa: S101
+    assert stats.iterations == stats.force_evaluations == 1000  # noqa: S101, PLR2004
+    assert stats.events_fired == 23  # noqa: S101, PLR2004
+    assert all(t >= 0 for t in stats.phases.values())  # noqa: S101
+    assert "_accelerate" not in vars(sim.my_uni)  # noqa: S101
+    assert "do_at_each_time_step" not in vars(sim)  # noqa: S101
+
+
+def _resumed_jerk(tmp_path: pathlib.Path, out: pathlib.Path | None) -> s.BigScenario:
+    """Run `Jerk` halfway with a checkpoint, and finish it in a new scenario."""
+    first = s.Jerk()
+    first.SIM_CONSTS = dataclasses.replace(first.SIM_CONSTS, total_time=450)
+    first.setup()
+    second = s.Jerk()
+    second.setup()
+    with contextlib.redirect_stdout(None):
+        first.run_simulation(
+            out, checkpoint=tmp_path / "ckpt.npz", checkpoint_every=100
+        )
+        second.my_uni.load_checkpoint(tmp_path / "ckpt.npz")
+        second.run_simulation(out)
+    return second
+
+
+def test_resume_from_checkpoint(tmp_path: pathlib.Path) -> None:
+    """A run resumed from a checkpoint should end exactly like an uninterrupted one."""
+    full = s.Jerk()
+    full.setup()
+    with contextlib.redirect_stdout(None):
+        full.run_simulation()
+    resumed = _resumed_jerk(tmp_path, None)
+    np.testing.assert_array_equal(resumed.my_uni.trace.data, full.my_uni.trace.data)
+    np.testing.assert_array_equal(resumed.my_uni.vel, full.my_uni.vel)
+    assert resumed.my_uni.steps == full.my_uni.steps  # noqa: S101
+    streamed = _resumed_jerk(tmp_path, tmp_path / "run.trj")
+    run = Trajectory.open(tmp_path / "run.trj")
+    np.testing.assert_array_equal(run.traces, full.my_uni.trace.data)
+    np.testing.assert_array_equal(streamed.my_uni.pos, full.my_uni.pos)
+
+
+def test_observers_are_called_on_their_stride() -> None:
+    """Observers should be called at their own time steps, between bulk steps."""
+    sim = s.Simpel()
+    sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=100)
+    sim.setup()
+    strided: list[int] = []
+    timed: list[int] = []
+    sim.observe(strided.append, stride=30)
+    sim.observe(timed.append, interval=45 * sim.my_uni.spi)
+    sim.run_simulation()
+    assert strided == [0, 30, 60, 90]  # noqa: S101
+    assert timed == [0, 45, 90]  # noqa: S101
+    assert sim.my_uni.time == 100  # noqa: S101, PLR2004
+
+    jerk = s.Jerk()
+    jerk.setup()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        jerk.run_simulation()
+    assert len(out.getvalue().splitlines()) == 100  # noqa: S101, PLR2004
+
+
+def test_live_feed_follows_the_run() -> None:
+    """The live frames should be the samples of the trace, and stop when closed."""
+    sim = s.Mayhem()
+    sim.SIM_CONSTS = dataclasses.replace(
+        sim.SIM_CONSTS, total_time=1000, trace_stride=10
+    )
+    sim.setup()
+    feed = LiveFeed(sim, maxsize=4)
+    scatter = LiveScatter(feed, sim.SIM_CONSTS)
+    scatter.show_trace = True
+    scatter.max_points = 8
+    feed.start()
+    scatter.setup_plot()
+    while not feed.finished:
+        scatter.update(0)
+        # The traces are drawn with a bounded number of points, however long the run
+        assert len(np.asarray(scatter.lines[0].get_xdata())) <= 9  # noqa: S101, PLR2004
+    feed.close()
+    # The trace is recorded at the start of each iteration, so it has no final state
+    trace = sim.my_uni.trace
+    np.testing.assert_array_equal(feed.samples[:-1], trace.data)
+    np.testing.assert_array_equal(feed.times[:-1], trace.times * sim.my_uni.spi)
+    np.testing.assert_array_equal(feed.samples[-1], sim.my_uni.pos)
+
+    # Closing stops the run at once, even while the queue has room
+    sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, total_time=10**6)
+    sim.setup()
+    feed = LiveFeed(sim, maxsize=10**6)
+    feed.start()
+    feed.pull(block=True)
+    feed.close()
+    assert sim.my_uni.time < sim.SIM_CONSTS.total_time  # noqa: S101
+
+
+def test_traces_are_drawn_at_the_level_of_detail_of_the_zoom() -> None:
+    """A capped trace should be animated with a bounded number of points.
+
+    The further zoomed out, the fewer points. Each level of the trace is drawn with at
+    most `max_points` points.
+    """
+    sim = s.Mayhem()
+    sim.SIM_CONSTS = dataclasses.replace(
+        sim.SIM_CONSTS, total_time=20000, trace_stride=1, trace_memory=2**18
+    )
+    sim.setup()
+    with contextlib.redirect_stdout(None):
+        sim.run_simulation()
+    assert sim.my_uni.trace.nbytes <= 2**18  # noqa: S101
+    points = []
+    for size in (sim.SIM_CONSTS.size, 10 * sim.SIM_CONSTS.size):
+        sim.SIM_CONSTS = dataclasses.replace(sim.SIM_CONSTS, size=size)
+        anim = sim.create_animation(trace=True)
+        anim.setup_plot()
+        last = sim.my_uni.trace.size - 1
+        anim.draw(anim.frame(last), last)
+        points.append(len(np.asarray(anim.lines[0].get_xdata())))
+    assert points[1] < points[0] < sim.my_uni.trace.size  # noqa: S101
+
+    # The samples fall into a level for each power of two of the time between them
+    levels = len(np.unique(np.frexp(np.diff(anim.times))[1]))
+    anim.max_points = 16
+    anim.setup_plot()
+    anim.draw(anim.frame(last), last)
+    drawn = len(np.asarray(anim.lines[0].get_xdata()))
+    assert drawn <= anim.max_points * levels < points[1]  # noqa: S101
+
+
 if __name__ == "__main__":
     test_instantiate()
@@ -0,0 +1,90 @@
+"""Tests for running many variants of a scenario."""
+
+import numpy as np
+import pytest
+
+import plan_a_trip_to_mars.config as cf
+import plan_a_trip_to_mars.misc.precode2 as pre
+import plan_a_trip_to_mars.universe as uni
+from plan_a_trip_to_mars import sweep
+from plan_a_trip_to_mars.ensemble import Ensemble, batched_field
+from plan_a_trip_to_mars.scenarios import BigScenario
+
+
+class Shot(BigScenario):
+    """A rocket kicked towards a target that barely pulls on it."""
+
+    SIM_CONSTS = cf.SimulationConstants(total_time=10, fps=1)
+    KICK = uni.Kicker(angle=0, speed=10, time=0, static=True)
+
+    def create_complete_universe(self) -> None:
+        """Place the rocket and its target."""
+        rocket = uni.Rocket("Rocket", 1)
+        target = uni.Planet("Target", 1, pos=pre.Vector2D(100, 0))
+        self.my_uni.add_object(rocket, target)
+        rocket.add_kick_event(self.KICK)
+
+
+def test_sweep_over_kicks() -> None:
+    """Every variant should be run, with its metrics and traces in the result."""
+    variants = sweep.grid(
+        KICK=[uni.Kicker(0, v, 0, static=True) for v in (10, 12.5, 15)]
+    )
+    result = sweep.sweep(
+        Shot,
+        variants,
+        metrics=[sweep.ClosestApproach("Rocket", "Target")],
+        keep_traces=True,
+        workers=2,
+    )
+    np.testing.assert_allclose(result.metrics[:, 0], [20, 0, 5], atol=1e-6)
+    assert result.best("closest_approach(Rocket, Target)")["KICK"].speed == 12.5  # noqa: S101, PLR2004
+    assert result.traces is not None  # noqa: S101
+    assert result.traces.shape == (3, 10, 2, 2)  # noqa: S101
+    with pytest.raises(ValueError, match="no variants"):
+        sweep.sweep(Shot, [])
+
+
+def test_ensemble_matches_single_runs() -> None:
+    """Members of an ensemble should move like universes that are run on their own."""
+    variants = sweep.grid(
+        KICK=[uni.Kicker(a, v, t) for a, v, t in ((0, 10, 0), (30, 5, 2), (90, 1, 4))]
+    )
+    ens = Ensemble.from_scenario(Shot, variants)
+    ens.run(10)
+    for m, variant in enumerate(variants):
+        sim = sweep.make_variant(Shot, variant)
+        sim.my_uni.move(9)
+        np.testing.assert_allclose(ens.member_trace(m), sim.my_uni.trace.data)
+
+
+def _orbit(*, rails: bool = False) -> uni.Universe:
+    my_uni = uni.Universe(spi=3600)
+    my_uni.add_object(
+        uni.Planet("Sun", cf.M_sun, rails=rails),
+        uni.Rocket(
+            "Rocket",
+            cf.M_sun,
+            pos=pre.Vector2D(cf.AU, 0),
+            vel=pre.Vector2D(0, cf.V_earth),
+            test_particle=True,
+        ),
+    )
+    my_uni.ready()
+    return my_uni
+
+
+def test_ensemble_keeps_test_particles() -> None:
+    """Test particles should not pull in an ensemble, and rails are refused."""
+    ens = Ensemble([_orbit(), _orbit()])
+    ens.run(50)
+    single = _orbit()
+    single.step_many(50)
+    np.testing.assert_allclose(ens.member_trace(1), single.trace.data)
+    with pytest.raises(ValueError, match="rails"):
+        Ensemble([_orbit(rails=True)])
+    # Test particles at the same place feel the same, finite pull
+    pos = np.array([[[0, 0], [cf.AU, 0], [cf.AU, 0]]], dtype=float)
+    acc = batched_field(pos, pos[:, :1], np.array([[cf.M_sun]]))
+    assert np.isfinite(acc).all()  # noqa: S101
+    np.testing.assert_array_equal(acc[0, 1], acc[0, 2])
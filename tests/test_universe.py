@@ -0,0 +1,442 @@
+"""Tests for the universe and the objects moving in it."""
+
+import contextlib
+import io
+import pathlib
+
+import numpy as np
+import pytest
+
+import plan_a_trip_to_mars.detection as det
+import plan_a_trip_to_mars.gravity as grav
+import plan_a_trip_to_mars.misc.precode2 as pre
+import plan_a_trip_to_mars.scenarios as s
+import plan_a_trip_to_mars.universe as uni
+from plan_a_trip_to_mars.collisions import SpatialHash
+from plan_a_trip_to_mars.config import AU, G, V_earth
+from plan_a_trip_to_mars.traces import TracePyramid
+
+
+def _make_universe(
+    spi: int = 3600, integrator: str = "euler", trace_memory: int | None = None
+) -> uni.Universe:
+    my_uni = uni.Universe(spi=spi, integrator=integrator)
+    my_uni.set_trace_stride(2, max_bytes=trace_memory)
+    my_uni.add_object(
+        uni.Planet("Sun", 2e30),
+        uni.Planet(
+            "Earth", 6e24, pos=pre.Vector2D(AU, 0), vel=pre.Vector2D(0, V_earth)
+        ),
+        uni.Rocket(
+            "Rocket", 1e3, pos=pre.Vector2D(0, AU), vel=pre.Vector2D(-V_earth, 0)
+        ),
+    )
+    my_uni.ready()
+    return my_uni
+
+
+@pytest.mark.parametrize("n", [3, 20])
+def test_pairwise_acceleration_matches_pair_loop(n: int) -> None:
+    """The force sum, for few or many bodies, should agree with a plain pair loop."""
+    rng = np.random.default_rng(42)
+    pos = rng.normal(scale=AU, size=(n, 2))
+    mass = rng.uniform(1e20, 1e30, size=n)
+    expected = np.zeros_like(pos)
+    for i in range(len(pos)):
+        for j in range(len(pos)):
+            if i != j:
+                d = pos[j] - pos[i]
+                expected[i] += G * mass[j] * d / np.hypot(*d) ** 3
+    np.testing.assert_allclose(
+        grav.direct_sum(pos, mass, block=7), expected, rtol=1e-10
+    )
+
+
+def test_objects_are_views_into_the_universe() -> None:
+    """Reading and writing object vectors should go through the universe arrays."""
+    my_uni = _make_universe()
+    earth = my_uni.objects[1]
+    assert earth.vel == pre.Vector2D(0, V_earth * 3600)  # noqa: S101
+    my_uni.move(0)
+    assert earth.pos == pre.Vector2D(*my_uni.pos[1])  # noqa: S101
+    earth.vel = pre.Vector2D(1, 2)
+    assert tuple(my_uni.vel[1]) == (1, 2)  # noqa: S101
+
+
+def test_barnes_hut_converges_to_direct_sum() -> None:
+    """The Barnes-Hut error should shrink with the opening angle, and vanish at zero."""
+    rng = np.random.default_rng(1)
+    pos = rng.normal(scale=AU, size=(500, 2))
+    mass = rng.uniform(1e20, 1e30, size=500)
+    exact = grav.direct_sum(pos, mass)
+    errors = [
+        grav.force_error(grav.barnes_hut(pos, mass, theta), exact).rms
+        for theta in (1.0, 0.5, 0.0)
+    ]
+    assert errors[0] > errors[1]  # noqa: S101
+    assert errors[2] < 1e-10  # noqa: S101, PLR2004
+
+
+def test_higher_order_integrators_conserve_energy() -> None:
+    """Symplectic and higher order schemes should beat Euler on the energy error."""
+    errors = {}
+    for integrator in ("euler", "leapfrog", "verlet", "yoshida4", "rk4"):
+        my_uni = _make_universe(spi=86400, integrator=integrator)
+        e0 = my_uni.energy()
+        for time in range(365):
+            my_uni.move(time)
+        errors[integrator] = abs(my_uni.energy() / e0 - 1)
+    for integrator in ("leapfrog", "verlet", "yoshida4", "rk4"):
+        assert errors[integrator] < errors["euler"] / 100  # noqa: S101
+
+
+@pytest.mark.parametrize("integrator", ["leapfrog", "verlet", "yoshida4", "rk4"])
+def test_kicks_with_any_integrator(integrator: str) -> None:
+    """A rocket alone in space should follow the same kicked path with every scheme."""
+    traces = []
+    for name in ("euler", integrator):
+        jerk = s.Jerk()
+        jerk.setup()
+        jerk.my_uni.set_integrator(name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            jerk.run_simulation()
+        traces.append(jerk.my_uni.objects[0].trace)
+    np.testing.assert_allclose(traces[0], traces[1], atol=1e-6)
+
+
+def test_adaptive_steps_follow_close_encounters() -> None:
+    """Adaptive steps should keep a close binary accurate at a coarse 'spi'."""
+    errors = []
+    for adaptive in (False, True):
+        my_uni = uni.Universe(spi=600, integrator="yoshida4", adaptive=adaptive)
+        my_uni.add_object(
+            uni.Planet(
+                "Stone", 1e14, pos=pre.Vector2D(1e3, -1e3), vel=pre.Vector2D(0, 0.55)
+            ),
+            uni.Planet(
+                "Rock", 1e14, pos=pre.Vector2D(-1e3, -1e3), vel=pre.Vector2D(0, -0.5)
+            ),
+        )
+        my_uni.ready()
+        e0 = my_uni.energy()
+        iterations = 36
+        for time in range(iterations):
+            my_uni.move(time)
+        assert my_uni.time == iterations  # noqa: S101
+        errors.append(abs(my_uni.energy() / e0 - 1))
+    assert errors[0] > 1e-1  # noqa: S101, PLR2004
+    assert errors[1] < 1e-3  # noqa: S101, PLR2004
+
+
+def test_trace_is_sampled_on_the_stride() -> None:
+    """Every `stride` iteration should be recorded at full precision."""
+    my_uni = uni.Universe(spi=3600)
+    earth = uni.Planet(
+        "Earth", 6e24, pos=pre.Vector2D(AU + 0.25, 0), vel=pre.Vector2D(0, V_earth)
+    )
+    my_uni.add_object(uni.Planet("Sun", 2e30), earth)
+    my_uni.set_trace_stride(4, total_time=10)
+    my_uni.ready()
+    positions = []
+    for time in range(10):
+        positions.append(my_uni.pos.copy())
+        my_uni.move(time)
+    np.testing.assert_array_equal(my_uni.trace.times, [0, 4, 8])
+    np.testing.assert_array_equal(earth.trace, np.array(positions)[::4, 1])
+    assert earth.trace[0, 0] == AU + 0.25  # noqa: S101
+
+
+def test_trace_pyramid_keeps_memory_bounded() -> None:
+    """A capped trace should keep the recent samples and ever coarser older ones."""
+    # Room for four levels of 50 samples of three objects
+    full, capped = _make_universe(), _make_universe(trace_memory=4 * 8 * 7 * 50)
+    assert isinstance(capped.trace, TracePyramid)  # noqa: S101
+    assert capped.trace.window == 50  # noqa: S101, PLR2004
+    full.step_many(5000)
+    capped.step_many(5000)
+    times = capped.trace.times
+    assert capped.trace.nbytes <= 4 * 8 * 7 * 50  # noqa: S101
+    assert times[0] == 0  # noqa: S101
+    assert np.all(np.diff(times) > 0)  # noqa: S101
+    # The last window is at full resolution
+    np.testing.assert_array_equal(times[-50:], full.trace.times[-50:])
+    kept = np.isin(full.trace.times, times)
+    np.testing.assert_array_equal(capped.trace.data, full.trace.data[kept])
+
+
+def test_kick_events_in_any_order() -> None:
+    """Kicks should happen at their time no matter the order they were added in."""
+    kicks = [uni.Kicker(90, 10, 3, static=True), uni.Kicker(0, 5, 7, static=True)]
+    traces = []
+    for order in (kicks, kicks[::-1]):
+        my_uni = uni.Universe()
+        rocket = uni.Rocket("Rocket", 1e3)
+        my_uni.add_object(rocket)
+        rocket.add_kick_event(order[0])
+        my_uni.ready()
+        # Events can also be added once the simulation is running
+        rocket.add_kick_event(order[1])
+        for time in range(10):
+            my_uni.move(time)
+        traces.append(rocket.trace)
+    np.testing.assert_allclose(traces[0], traces[1])
+    # The last sample is from the start of iteration 9, and a kick at time t is given
+    # at the end of iteration t
+    np.testing.assert_allclose(traces[0][-1], [5 * 1, 10 * 5])
+    assert len(my_uni.events) == 0  # noqa: S101
+
+
+def test_conditions_find_and_stop_at_events() -> None:
+    """Events should be located between iterations, and terminal ones stop the run."""
+    r, v = AU, 0.8 * np.sqrt(G * 2e30 / AU)
+    a = 1 / (2 / r - v**2 / (G * 2e30))
+    half_period = np.pi * np.sqrt(a**3 / (G * 2e30)) / 3600
+    my_uni = uni.Universe(spi=3600, integrator="yoshida4")
+    my_uni.add_object(
+        uni.Planet("Sun", 2e30),
+        uni.Rocket("Rocket", 1, pos=pre.Vector2D(r, 0), vel=pre.Vector2D(0, v)),
+    )
+    my_uni.add_condition(
+        det.RadialVelocity("Rocket", "Sun", direction=1, name="periapsis"),
+        det.Distance("Rocket", "Sun", a, name="inside"),
+    )
+    my_uni.ready()
+    for t in range(int(half_period) + 2):
+        my_uni.move(t)
+    names = [c.name for c in my_uni.crossings]
+    assert names == ["inside", "periapsis"]  # noqa: S101
+    assert my_uni.crossings[1].time == pytest.approx(half_period, rel=1e-5)  # noqa: S101
+    rp = np.hypot(*my_uni.crossings[1].pos[1])
+    assert rp == pytest.approx(2 * a - r, rel=1e-5)  # noqa: S101
+
+    my_uni.add_condition(det.Distance("Rocket", "Sun", a, terminal=True))
+    for t in range(int(my_uni.time), int(4 * half_period)):
+        my_uni.move(t)
+    stop = my_uni.crossings[0].time + 2 * half_period
+    assert my_uni.stopped is not None  # noqa: S101
+    assert my_uni.stopped.time == pytest.approx(stop, rel=1e-5)  # noqa: S101
+    assert my_uni.time == np.ceil(my_uni.stopped.time)  # noqa: S101
+
+
+def test_step_many_stops_at_terminal_events() -> None:
+    """Moving many steps at once should stop right after a terminal event too."""
+    r, v = AU, 0.8 * np.sqrt(G * 2e30 / AU)
+    a = 1 / (2 / r - v**2 / (G * 2e30))
+    half_period = np.pi * np.sqrt(a**3 / (G * 2e30)) / 3600
+    my_uni = uni.Universe(spi=3600, integrator="yoshida4")
+    rocket = uni.Rocket("Rocket", 1, pos=pre.Vector2D(r, 0), vel=pre.Vector2D(0, v))
+    my_uni.add_object(uni.Planet("Sun", 2e30), rocket)
+    my_uni.add_condition(det.Distance("Rocket", "Sun", a, terminal=True))
+    my_uni.ready()
+    my_uni.step_many(int(half_period))
+    assert my_uni.stopped is not None  # noqa: S101
+    end = int(np.ceil(my_uni.stopped.time))
+    assert my_uni.time == end  # noqa: S101
+    assert my_uni.trace.times[-1] == end - 1  # noqa: S101
+
+    # A kick at the end of the iteration of the event is already after it
+    my_uni = uni.Universe(spi=3600, integrator="yoshida4")
+    rocket = uni.Rocket("Rocket", 1, pos=pre.Vector2D(r, 0), vel=pre.Vector2D(0, v))
+    rocket.add_kick_event(uni.Kicker(90, 100, end - 1), uni.Kicker(90, 100, end + 10))
+    my_uni.add_object(uni.Planet("Sun", 2e30), rocket)
+    my_uni.add_condition(det.Distance("Rocket", "Sun", a, terminal=True))
+    my_uni.ready()
+    my_uni.step_many(int(half_period))
+    assert my_uni.time == end  # noqa: S101
+    assert len(my_uni.events) == 2  # noqa: S101, PLR2004
+
+
+def test_step_many_matches_move() -> None:
+    """Moving many steps at once should give the same state as one step at a time."""
+    one, many = _make_universe(), _make_universe()
+    for my_uni in (one, many):
+        rocket = my_uni.objects[2]
+        assert isinstance(rocket, uni.Rocket)  # noqa: S101
+        rocket.add_kick_event(uni.Kicker(90, 100, 40))
+    for time in range(100):
+        one.move(time)
+    many.step_many(100)
+    np.testing.assert_array_equal(many.pos, one.pos)
+    np.testing.assert_array_equal(many.trace.data, one.trace.data)
+
+
+def _sun_and_earth(spi: int, *, rails: bool) -> uni.Universe:
+    my_uni = uni.Universe(spi=spi, integrator="rk4")
+    my_uni.add_object(
+        uni.Planet("Sun", 2e30, rails=rails),
+        uni.Planet(
+            "Earth",
+            6e24,
+            pos=pre.Vector2D(AU, 0),
+            vel=pre.Vector2D(0, 0.9 * V_earth),
+            rails="Sun" if rails else False,
+        ),
+        uni.Rocket("Rocket", 1, pos=pre.Vector2D(0, AU), vel=pre.Vector2D(-V_earth, 0)),
+    )
+    my_uni.ready()
+    return my_uni
+
+
+def test_planets_on_rails_follow_kepler_orbits() -> None:
+    """Planets on rails should be exact for any step, and still pull on rockets."""
+    hourly, daily = _sun_and_earth(3600, rails=True), _sun_and_earth(86400, rails=True)
+    integrated = _sun_and_earth(3600, rails=False)
+    hourly.step_many(24 * 100)
+    daily.step_many(100)
+    integrated.step_many(24 * 100)
+    np.testing.assert_allclose(daily.pos[:2], hourly.pos[:2], rtol=0, atol=1e-3)
+    np.testing.assert_allclose(
+        hourly.pos[1] - hourly.pos[0],
+        integrated.pos[1] - integrated.pos[0],
+        rtol=0,
+        atol=1e-7 * AU,
+    )
+    # The rocket only feels that the Sun on rails does not wobble
+    np.testing.assert_allclose(hourly.pos[2], integrated.pos[2], rtol=1e-3)
+    assert tuple(hourly.pos[0]) == (0, 0)  # noqa: S101
+
+
+def test_test_particles_are_pulled_but_do_not_pull() -> None:
+    """A swarm of particles should move like single massless rockets."""
+    rng = np.random.default_rng(3)
+    angle = rng.uniform(0, 2 * np.pi, 500)
+    radius = rng.uniform(0.5, 2, 500) * AU
+    pos = np.column_stack([np.cos(angle), np.sin(angle)]) * radius[:, np.newaxis]
+    vel = np.column_stack([-np.sin(angle), np.cos(angle)]) * np.sqrt(
+        G * 2e30 / radius[:, np.newaxis]
+    )
+    my_uni = uni.Universe(spi=3600, integrator="leapfrog")
+    my_uni.add_object(
+        uni.Planet("Sun", 2e30),
+        uni.Rocket(
+            "Rocket",
+            1e30,
+            pos=pre.Vector2D(*pos[0]),
+            vel=pre.Vector2D(*vel[0]),
+            test_particle=True,
+        ),
+    )
+    my_uni.add_particles(pos, vel)
+    my_uni.ready()
+    my_uni.step_many(24 * 30)
+    assert my_uni.particles.shape == (500, 2)  # noqa: S101
+    assert tuple(my_uni.pos[0]) == (0, 0)  # noqa: S101
+    np.testing.assert_array_equal(my_uni.particles[0], my_uni.pos[1])
+    np.testing.assert_allclose(np.hypot(*my_uni.particles.T), radius, rtol=1e-4)
+    assert my_uni.trace.data.shape[1:] == (2, 2)  # noqa: S101
+
+
+def _cached(tmp_path: pathlib.Path | None, integrator: str) -> uni.Universe:
+    my_uni = uni.Universe(spi=3600, integrator=integrator)
+    my_uni.add_object(
+        uni.Planet("Sun", 2e30),
+        uni.Planet(
+            "Earth", 6e24, pos=pre.Vector2D(AU, 0), vel=pre.Vector2D(0, V_earth)
+        ),
+        uni.Rocket(
+            "Rocket",
+            1e3,
+            pos=pre.Vector2D(0, AU),
+            vel=pre.Vector2D(-V_earth, 0),
+            test_particle=True,
+        ),
+    )
+    if tmp_path is not None:
+        my_uni.set_ephemeris(tmp_path, 24 * 50)
+    my_uni.ready()
+    my_uni.step_many(24 * 50)
+    return my_uni
+
+
+@pytest.mark.parametrize("integrator", ["euler", "rk4"])
+def test_ephemeris_is_cached_between_runs(
+    tmp_path: pathlib.Path, integrator: str
+) -> None:
+    """Rockets moving past cached planets should move as if the planets were integrated."""
+    plain = _cached(None, integrator)
+    first = _cached(tmp_path, integrator)
+    (table,) = tmp_path.iterdir()
+    written = table.stat().st_mtime_ns
+    second = _cached(tmp_path, integrator)
+    assert table.stat().st_mtime_ns == written  # noqa: S101
+    np.testing.assert_array_equal(second.pos, first.pos)
+    np.testing.assert_allclose(first.pos, plain.pos, rtol=1e-12)
+
+
+def _crash(policy: str, speed: float = 3e6, mass: float = 6e24) -> uni.Universe:
+    my_uni = uni.Universe(spi=3600)
+    my_uni.add_object(
+        uni.Planet("Earth", 6e24, pos=pre.Vector2D(0, 0), radius=6.4e6),
+        uni.Rocket(
+            "Rocket",
+            mass,
+            pos=pre.Vector2D(-2e10, 0),
+            vel=pre.Vector2D(speed, 0),
+            radius=6.4e6,
+        ),
+    )
+    my_uni.set_collisions(policy)
+    my_uni.ready()
+    return my_uni
+
+
+def test_spatial_hash_finds_the_close_pairs() -> None:
+    """The hash should find every pair within reach that a plain pair loop finds."""
+    rng = np.random.default_rng(1)
+    pos = rng.uniform(-1e3, 1e3, size=(300, 2))
+    reach = 50
+    first, second = SpatialHash().pairs(pos, reach, np.arange(300))
+    found = set(zip(first.tolist(), second.tolist(), strict=True))
+    dist = np.hypot(*(pos[:, np.newaxis] - pos).T)
+    expected = set(zip(*np.nonzero((dist < reach) & (dist > 0)), strict=True))
+    assert expected <= found  # noqa: S101
+
+
+def test_fast_collision_within_a_step_stops_the_run() -> None:
+    """A rocket passing through a planet between two steps should still hit it."""
+    my_uni = _crash("stop", speed=5e4)
+    my_uni.step_many(1000)
+    (hit,) = my_uni.collisions
+    assert my_uni.stopped is not None  # noqa: S101
+    assert (hit.a, hit.b) == ("Earth", "Rocket")  # noqa: S101
+    # The rocket moves 1.8e5 km per iteration, so it jumps over the Earth in one step
+    assert hit.time == pytest.approx(my_uni.stopped.time)  # noqa: S101
+    assert np.hypot(*(hit.pos[1] - hit.pos[0])) == pytest.approx(1.28e7)  # noqa: S101
+
+
+def test_merge_keeps_mass_and_momentum() -> None:
+    """Merged objects should keep the sum of their masses and momenta."""
+    my_uni = _crash("merge", mass=2e24)
+    momentum = my_uni.mass @ my_uni.vel
+    my_uni.step_many(100)
+    (hit,) = my_uni.collisions
+    assert hit.policy == "merge"  # noqa: S101
+    assert my_uni.objects[0].mass == pytest.approx(8e24)  # noqa: S101
+    np.testing.assert_allclose(my_uni.mass @ my_uni.vel, momentum, rtol=1e-9)
+    np.testing.assert_array_equal(my_uni.pos[1], my_uni.pos[0])
+
+
+def test_equal_masses_swap_velocities_when_they_bounce() -> None:
+    """A head-on elastic bounce of equal masses should swap their velocities."""
+    my_uni = _crash("bounce")
+    vel = my_uni.vel.copy()
+    my_uni.step_many(100)
+    (hit,) = my_uni.collisions
+    assert hit.policy == "bounce"  # noqa: S101
+    np.testing.assert_allclose(my_uni.vel[::-1], vel, rtol=1e-5, atol=1e-5 * vel.max())
+
+
+def test_resume_after_a_merge(tmp_path: pathlib.Path) -> None:
+    """A run resumed after objects merged should end like an uninterrupted one."""
+    whole = _crash("merge", mass=2e24)
+    whole.step_many(20)
+    first = _crash("merge", mass=2e24)
+    first.step_many(10)
+    first.save_checkpoint(tmp_path / "ckpt.npz")
+    second = _crash("merge", mass=2e24)
+    second.load_checkpoint(tmp_path / "ckpt.npz")
+    second.step_many(10)
+    assert len(first.collisions) == 1  # noqa: S101
+    assert not second.collisions  # noqa: S101
+    np.testing.assert_array_equal(second.pos, whole.pos)
+    np.testing.assert_array_equal(second.mass, whole.mass)
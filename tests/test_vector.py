@@ -0,0 +1,55 @@
+"""Tests for the vector classes of the pre-code."""
+
+import math
+
+import numpy as np
+
+import plan_a_trip_to_mars.misc.precode2 as pre
+
+
+def test_in_place_operators() -> None:
+    """The in-place operators should change the vector they are used on."""
+    v: pre.Vector2D = pre.Vector2D(1, 2)
+    same = v
+    v += pre.Vector2D(1, 1)
+    v -= pre.Vector2D(0, 1)
+    v *= 3
+    v /= 2
+    assert v is same  # noqa: S101
+    assert v == pre.Vector2D(3, 3)  # noqa: S101
+    assert list(v) == [3, 3]  # noqa: S101
+
+
+def test_rotate_without_rounding() -> None:
+    """Rotations should keep full precision unless asked to round."""
+    v = pre.Vector2D(1, 0).rotate(30)
+    assert v.y == math.sin(math.radians(30))  # noqa: S101
+    assert pre.Vector2D(1, 0).rotate(30, ndigits=2) == pre.Vector2D(0.87, 0.5)  # noqa: S101
+
+
+def test_array_matches_single_vectors() -> None:
+    """Every operation on an array should match the same operation on each vector."""
+    vectors: list[pre.Vector2D] = [
+        pre.Vector2D(1, 2),
+        pre.Vector2D(-3, 0.5),
+        pre.Vector2D(0, -4),
+    ]
+    arr = pre.Vector2DArray.from_vectors(vectors)
+    other: pre.Vector2D = pre.Vector2D(0.5, -1)
+    cases = [
+        (arr + other, [v + other for v in vectors]),
+        (arr - other, [v - other for v in vectors]),
+        (2 * arr / 4, [2 * v / 4 for v in vectors]),
+        (arr.rotate(75), [v.rotate(75) for v in vectors]),
+        (arr.normalized(), [v.normalized() for v in vectors]),
+    ]
+    for result, expected in cases:
+        np.testing.assert_allclose(result.data, [tuple(v) for v in expected])
+    np.testing.assert_allclose(abs(arr), [abs(v) for v in vectors])
+    data = arr.data
+    arr *= np.array([1, 2, 3])
+    assert arr.data is data  # noqa: S101
+    assert arr[1] == pre.Vector2D(-6, 1)  # noqa: S101
+    assert arr[1:2] == pre.Vector2D(-6, 1)  # noqa: S101
+    assert pre.Vector2D(-6, 1) == arr[1:2]  # noqa: S101
+    assert pre.Vector2D(-6, 1) != arr  # noqa: S101